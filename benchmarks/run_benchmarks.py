@@ -0,0 +1,248 @@
+import argparse
+from datetime import datetime, timezone
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import yaml
+
+from benchmarks.synthetic_events import SCALES, generate_events, iter_event_batches
+from src.data_processing.preprocess_jleague import PartitionedWriter
+
+# Benchmarked metric functions: (module, function), each called on the events DataFrame
+CALCULATE_FUNCTIONS = [
+    ('possession', 'calculate_possession'),
+    ('ppda', 'calculate_ppda'),
+    ('field_tilt', 'calculate_field_tilt'),
+    ('maintain_buildup_sustain', 'calculate_maintain_buildup_sustain'),
+    ('speed_metrics', 'calculate_speed_metrics'),
+    ('passes_per_sequence', 'calculate_avg_passes_per_sequence'),
+    ('attacking_passes_per_sequence', 'calculate_avg_attacking_passes_per_sequence'),
+    ('verticality', 'calculate_avg_verticality'),
+    ('defensive_height', 'calculate_avg_defensive_height'),
+    ('average_pressure', 'calculate_avg_pressure'),
+    ('attacks', 'calculate_buildup_and_direct_attacks'),
+    ('attacks_under_10_passes', 'calculate_buildup_and_direct_attacks_under_10_passes'),
+    ('engine', 'compute_team_metrics'),
+]
+
+METRICS_MODULE = 'src.feature_engineering.metrics'
+
+# Repository root, on the path of the pipeline runs so that the src package is importable
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+# Runs a module in a fresh interpreter and writes its wall time, CPU time and peak RSS
+# (worker processes included) to a JSON report
+SCRIPT_RUNNER = """
+import json, os, resource, runpy, sys, time
+module, report = sys.argv[1], sys.argv[2]
+sys.argv = [module] + sys.argv[3:]
+start, cpu = time.perf_counter(), time.process_time()
+runpy.run_module(module, run_name='__main__', alter_sys=True)
+wall = time.perf_counter() - start
+usage, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+unit = 1 if sys.platform == 'darwin' else 1024
+json.dump({
+    'wall_seconds': wall,
+    'cpu_seconds': time.process_time() - cpu + children.ru_utime + children.ru_stime,
+    'peak_rss_mb': max(usage.ru_maxrss, children.ru_maxrss) * unit / 1e6,
+}, open(report, 'w'))
+"""
+
+
+def environment():
+    """Versions and machine of the run, stored with the results."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pyarrow': pa.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def benchmark_function(function, df, repeat):
+    """
+    Time ``function(df)`` ``repeat`` times, then trace its allocations in one more run.
+
+    Returns:
+        dict: Wall and CPU seconds of every run and the peak traced allocation in MB.
+    """
+
+    wall, cpu = [], []
+    for _ in range(repeat):
+        start, start_cpu = time.perf_counter(), time.process_time()
+        function(df)
+        wall.append(time.perf_counter() - start)
+        cpu.append(time.process_time() - start_cpu)
+
+    tracemalloc.start()
+    function(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'wall_seconds': wall, 'cpu_seconds': cpu, 'peak_traced_mb': peak / 1e6}
+
+
+def write_event_dataset(path, n_matches, seed):
+    """Write the synthetic events as a partitioned events dataset, one match week at a time."""
+    writer = None
+    n_events = 0
+
+    for batch in iter_event_batches(n_matches, seed):
+        if writer is None:
+            # Categoricals of later batches have other categories, so fix the dictionary index type
+            schema = pa.Schema.from_pandas(batch, preserve_index=False)
+            schema = pa.schema([
+                pa.field(field.name, pa.dictionary(pa.int32(), pa.string()))
+                if pa.types.is_dictionary(field.type) else field
+                for field in schema
+            ])
+            writer = PartitionedWriter(path, schema)
+        writer.write(batch)
+        n_events += len(batch)
+
+    writer.close()
+    return n_events
+
+
+def benchmark_pipeline(work_dir, events_path, repeat, script_args):
+    """
+    Run ``metrics.py`` on the events dataset ``repeat`` times, each in a fresh interpreter.
+
+    Returns:
+        dict: Wall and CPU seconds and peak RSS (MB) of every run.
+    """
+
+    config_dir = os.path.join(work_dir, 'config')
+    os.makedirs(config_dir, exist_ok=True)
+    with open(os.path.join(config_dir, 'config.yaml'), 'w') as file:
+        yaml.safe_dump({'paths': {
+            'output': events_path,
+            'metrics_output': os.path.join(work_dir, 'metrics.xlsx'),
+            'windowed_metrics_output': os.path.join(work_dir, 'windowed_metrics.xlsx'),
+        }}, file)
+
+    report_path = os.path.join(work_dir, 'report.json')
+    runs = []
+    for _ in range(repeat):
+        subprocess.run(
+            [sys.executable, '-c', SCRIPT_RUNNER, METRICS_MODULE, report_path, *script_args],
+            cwd=work_dir, check=True, stdout=subprocess.DEVNULL,
+            env={**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get('PYTHONPATH')]))}
+        )
+        with open(report_path) as file:
+            runs.append(json.load(file))
+
+    return {key: [run[key] for run in runs] for key in runs[0]}
+
+
+def summarize(record):
+    """Add the minimum and median of every list of run measurements."""
+    for key in [key for key, value in record.items() if isinstance(value, list)]:
+        record[f"{key}_min"] = min(record[key])
+        record[f"{key}_median"] = statistics.median(record[key])
+    return record
+
+
+def compare(baseline, results):
+    """Print the median wall time of every benchmark against a baseline results file."""
+    before = {(r['benchmark'], r['scale']): r['wall_seconds_median'] for r in baseline['results']}
+
+    print(f"{'benchmark':<45} {'scale':<16} {'baseline (s)':>12} {'current (s)':>12} {'speedup':>8}")
+    for record in results['results']:
+        key = (record['benchmark'], record['scale'])
+        if key in before:
+            speedup = before[key] / record['wall_seconds_median'] if record['wall_seconds_median'] > 0 else float('inf')
+            print(f"{key[0]:<45} {key[1]:<16} {before[key]:>12.4f} {record['wall_seconds_median']:>12.4f} {speedup:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile the metrics on synthetic StatsBomb-shaped events.")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=['match', 'week', 'season'],
+                        help="Dataset sizes to benchmark.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic events.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs of every benchmark.")
+    parser.add_argument("--functions", nargs="+",
+                        help="Benchmark only these functions (e.g. calculate_ppda compute_team_metrics).")
+    parser.add_argument("--max-function-scale", choices=list(SCALES), default='ten_seasons',
+                        help="Largest scale the functions are benchmarked at; the events are held in memory.")
+    parser.add_argument("--no-functions", action="store_true", help="Skip the function benchmarks.")
+    parser.add_argument("--no-pipeline", action="store_true", help="Skip the metrics.py pipeline benchmark.")
+    parser.add_argument("--pipeline-args", default="",
+                        help="Extra arguments of metrics.py, e.g. \"--workers 4\".")
+    parser.add_argument("--output", default=None,
+                        help="Results JSON file. Defaults to benchmarks/results/<commit>-<time>.json.")
+    parser.add_argument("--baseline", help="Results JSON file of an earlier run to compare against.")
+    args = parser.parse_args()
+
+    results = {'environment': environment(), 'seed': args.seed, 'repeat': args.repeat, 'results': []}
+
+    functions = [
+        (module, name) for module, name in CALCULATE_FUNCTIONS
+        if args.functions is None or name in args.functions
+    ]
+
+    for scale in args.scales:
+        n_matches = SCALES[scale]
+
+        if not args.no_functions and n_matches <= SCALES[args.max_function_scale]:
+            df = generate_events(n_matches, args.seed)
+            for module, name in functions:
+                function = getattr(importlib.import_module(f"src.feature_engineering.{module}"), name)
+                record = {'benchmark': name, 'kind': 'function', 'scale': scale,
+                          'n_matches': n_matches, 'n_events': len(df)}
+                record.update(benchmark_function(function, df, args.repeat))
+                results['results'].append(summarize(record))
+                print(f"{name:<55} {scale:<16} {record['wall_seconds_median']:.4f} s")
+            del df
+
+        if not args.no_pipeline:
+            with tempfile.TemporaryDirectory() as work_dir:
+                events_path = os.path.join(work_dir, 'events')
+                n_events = write_event_dataset(events_path, n_matches, args.seed)
+
+                record = {'benchmark': f"metrics.py {args.pipeline_args}".strip(),
+                          'kind': 'pipeline', 'scale': scale, 'n_matches': n_matches, 'n_events': n_events}
+                record.update(benchmark_pipeline(work_dir, events_path, args.repeat, args.pipeline_args.split()))
+                results['results'].append(summarize(record))
+                print(f"{record['benchmark']:<55} {scale:<16} {record['wall_seconds_median']:.4f} s")
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                              f"{results['environment']['commit'] or 'benchmark'}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"✅ Benchmark results saved to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+    main()
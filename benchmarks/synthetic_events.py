@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+
+from src.data_processing.preprocess_jleague import compact_events
+from src.feature_engineering.pitch_grid import zone_columns
+
+# League shape: a double round robin of 18 teams, 9 matches per match week
+N_TEAMS = 18
+MATCHES_PER_WEEK = N_TEAMS // 2
+MATCH_WEEKS = 2 * (N_TEAMS - 1)
+MATCHES_PER_SEASON = MATCHES_PER_WEEK * MATCH_WEEKS
+
+TEAMS = [f"Synthetic FC {i + 1:02d}" for i in range(N_TEAMS)]
+PLAYERS_PER_TEAM = 14
+COMPETITION = 'Synthetic League'
+FIRST_SEASON = 2000
+FIRST_MATCH_ID = 100_000
+
+# Named dataset sizes, in matches
+SCALES = {
+    'match': 1,
+    'week': MATCHES_PER_WEEK,
+    'season': MATCHES_PER_SEASON,
+    'ten_seasons': 10 * MATCHES_PER_SEASON,
+    'hundred_seasons': 100 * MATCHES_PER_SEASON,
+}
+
+# Event mix of a StatsBomb match; defensive events belong to the team out of possession
+EVENT_TYPES = {
+    'Pass': 0.30, 'Ball Receipt*': 0.27, 'Carry': 0.23, 'Pressure': 0.07, 'Ball Recovery': 0.025,
+    'Duel': 0.02, 'Clearance': 0.012, 'Interception': 0.008, 'Block': 0.008, 'Foul Committed': 0.007,
+    'Dribble': 0.008, 'Shot': 0.008, 'Goal Keeper': 0.008, 'Miscontrol': 0.006,
+}
+DEFENSIVE_TYPES = ['Pressure', 'Duel', 'Clearance', 'Interception', 'Block', 'Foul Committed', 'Goal Keeper']
+
+PLAY_PATTERNS = {
+    'Regular Play': 0.40, 'From Throw In': 0.22, 'From Free Kick': 0.12, 'From Goal Kick': 0.08,
+    'From Corner': 0.06, 'From Counter': 0.05, 'From Keeper': 0.04, 'From Kick Off': 0.03,
+}
+PASS_OUTCOMES = {'Incomplete': 0.7, 'Out': 0.2, 'Pass Offside': 0.05, 'Unknown': 0.05}
+DUEL_TYPES = {'Aerial Lost': 0.5, 'Tackle': 0.5}
+
+EVENTS_PER_MATCH = 3400
+MEAN_POSSESSION_EVENTS = 20
+MATCH_SECONDS = 95 * 60
+PERIOD_SECONDS = 45 * 60
+STOPPAGE_SECONDS = 2 * 60
+
+
+def fixture(match_number):
+    """
+    Season, match week and home and away team of a match of the synthetic league.
+
+    Every season is a circle-method double round robin: the second half repeats the
+    first with home and away swapped.
+
+    Args:
+        match_number (int): Position of the match, 0 is the first match of the first season.
+
+    Returns:
+        tuple: (season, match week, home team index, away team index).
+    """
+
+    season, number = divmod(match_number, MATCHES_PER_SEASON)
+    week, slot = divmod(number, MATCHES_PER_WEEK)
+
+    rotation = week % (N_TEAMS - 1)
+    rotating = list(range(1, N_TEAMS))
+    order = [0] + rotating[rotation:] + rotating[:rotation]
+
+    home, away = order[slot], order[N_TEAMS - 1 - slot]
+    if week >= N_TEAMS - 1:
+        home, away = away, home
+
+    return season, week + 1, home, away
+
+
+def _choice(rng, options, size):
+    """Draw ``size`` values from a {value: probability} mapping."""
+    values = np.array(list(options), dtype=object)
+    probabilities = np.array(list(options.values()))
+    return values[rng.choice(len(values), size=size, p=probabilities / probabilities.sum())]
+
+
+def match_events(match_number, seed=0, events_per_match=EVENTS_PER_MATCH):
+    """
+    Generate the raw events of one match, seeded by ``seed`` and the match number alone.
+
+    Args:
+        match_number (int): Position of the match in the synthetic league.
+        seed (int): Seed of the generator.
+        events_per_match (int): Mean number of events of the match.
+
+    Returns:
+        dict: Event column name to array, with the StatsBomb column names of the processed events.
+    """
+
+    rng = np.random.default_rng([seed, match_number])
+    season, match_week, home, away = fixture(match_number)
+
+    n_events = max(int(rng.normal(events_per_match, events_per_match * 0.05)), 10)
+
+    # Possessions of geometric length, the ball changes side most of the time
+    lengths = rng.geometric(1 / MEAN_POSSESSION_EVENTS, size=2 * n_events // MEAN_POSSESSION_EVENTS + 10)
+    n_possessions = int(np.searchsorted(np.cumsum(lengths), n_events)) + 1
+    lengths = lengths[:n_possessions]
+    lengths[-1] -= lengths.sum() - n_events
+
+    in_possession = np.cumsum(rng.random(n_possessions) < 0.8) % 2
+    possession = np.repeat(np.arange(1, n_possessions + 1), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    teams = np.array([home, away])
+    possession_team = teams[np.repeat(in_possession, lengths)]
+    opponent = teams[np.repeat(1 - in_possession, lengths)]
+
+    type_name = _choice(rng, EVENT_TYPES, n_events)
+    team = np.where(np.isin(type_name, DEFENSIVE_TYPES), opponent, possession_team)
+
+    # Ball position: a forward random walk within every possession
+    steps = rng.normal(3.0, 10.0, n_events)
+    walk = np.cumsum(steps)
+    x = np.clip(np.repeat(rng.uniform(0, 70, n_possessions), lengths) + walk - walk[starts], 0, 120)
+    y = rng.uniform(0, 80, n_events)
+
+    is_pass = type_name == 'Pass'
+    pass_end_x = np.where(is_pass, np.clip(x + rng.normal(8.0, 15.0, n_events), 0, 120), np.nan)
+    pass_end_y = np.where(is_pass, np.clip(y + rng.normal(0.0, 12.0, n_events), 0, 80), np.nan)
+
+    missing = rng.random(n_events) < 0.005
+    x[missing] = np.nan
+    y[missing] = np.nan
+
+    # Clock: match time in minute / second (the second half restarts at 45:00 after
+    # the first half's stoppage time), period time in the timestamp
+    elapsed = np.sort(rng.uniform(0, MATCH_SECONDS, n_events))
+    period = np.where(elapsed < PERIOD_SECONDS + STOPPAGE_SECONDS, 1, 2)
+    elapsed = np.where(period == 2, elapsed - STOPPAGE_SECONDS, elapsed)
+    period_clock = elapsed - (period - 1) * PERIOD_SECONDS
+    timestamp = [
+        f"00:{int(clock // 60):02d}:{clock % 60:06.3f}" for clock in period_clock
+    ]
+
+    outcome = np.where(is_pass & (rng.random(n_events) < 0.2), _choice(rng, PASS_OUTCOMES, n_events), None)
+    duel_type = np.where(type_name == 'Duel', _choice(rng, DUEL_TYPES, n_events), None)
+    player = rng.integers(1, PLAYERS_PER_TEAM + 1, n_events)
+
+    team_names = np.array(TEAMS, dtype=object)
+
+    return {
+        'index': np.arange(1, n_events + 1),
+        'period': period,
+        'timestamp': timestamp,
+        'minute': (elapsed // 60).astype(int),
+        'second': (elapsed % 60).astype(int),
+        'type.name': type_name,
+        'possession': possession,
+        'possession_team.name': team_names[possession_team],
+        'play_pattern.name': np.repeat(_choice(rng, PLAY_PATTERNS, n_possessions), lengths),
+        'team.name': team_names[team],
+        'player.name': [f"{team_names[t]} Player {p}" for t, p in zip(team, player)],
+        'duration': np.where(is_pass | (type_name == 'Carry'), rng.exponential(1.2, n_events), 0.0),
+        'pass.outcome.name': outcome,
+        'duel.type.name': duel_type,
+        'x': x,
+        'y': y,
+        'pass_end_x': pass_end_x,
+        'pass_end_y': pass_end_y,
+        'match_id': np.full(n_events, FIRST_MATCH_ID + match_number),
+        'home_team': np.full(n_events, TEAMS[home], dtype=object),
+        'away_team': np.full(n_events, TEAMS[away], dtype=object),
+        'match_week': np.full(n_events, match_week),
+        'competition': np.full(n_events, COMPETITION, dtype=object),
+        'season': np.full(n_events, str(FIRST_SEASON + season), dtype=object),
+    }
+
+
+def generate_events(n_matches=1, seed=0, first_match=0, events_per_match=EVENTS_PER_MATCH):
+    """
+    Generate processed events of consecutive matches of the synthetic league.
+
+    The events look like the output of the preprocessing: StatsBomb column names,
+    the compact schema and the zone IDs. Every match only depends on ``seed`` and
+    its match number, so a range of matches is the same whether it is generated at
+    once or in batches.
+
+    Args:
+        n_matches (int): Number of matches.
+        seed (int): Seed of the generator.
+        first_match (int): Match number of the first match.
+        events_per_match (int): Mean number of events per match.
+
+    Returns:
+        pd.DataFrame: Events of the matches, match by match.
+    """
+
+    matches = [match_events(number, seed, events_per_match) for number in range(first_match, first_match + n_matches)]
+    df = pd.DataFrame({column: np.concatenate([match[column] for match in matches]) for column in matches[0]})
+
+    df['x'] = df['x'].astype('float32')
+    df['y'] = df['y'].astype('float32')
+    df['pass_end_x'] = df['pass_end_x'].astype('float32')
+    df['pass_end_y'] = df['pass_end_y'].astype('float32')
+
+    for column, ids in zone_columns(df).items():
+        df[column] = ids
+
+    return compact_events(df)
+
+
+def iter_event_batches(n_matches, seed=0, matches_per_batch=MATCHES_PER_WEEK, events_per_match=EVENTS_PER_MATCH):
+    """Yield the events of ``n_matches`` matches in batches of ``matches_per_batch`` matches."""
+    for first_match in range(0, n_matches, matches_per_batch):
+        yield generate_events(min(matches_per_batch, n_matches - first_match), seed, first_match, events_per_match)
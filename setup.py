@@ -3,8 +3,7 @@ from setuptools import setup, find_packages
 setup(
     name="football_project",
     version="0.1",
-    packages=find_packages(where="src"),
-    package_dir={"": "src"},
+    packages=find_packages(include=["src", "src.*"]),
     install_requires=[
         "pandas",
         "numpy",
@@ -19,9 +18,11 @@ setup(
     python_requires=">=3.9",
     entry_points={
         "console_scripts": [
+            "run-fetch=src.data_processing.fetch_statsbomb:main",
             "run-preprocessing=src.data_processing.preprocess_jleague:main",
             "run-metrics=src.feature_engineering.metrics:main",
-            "run-visualization=src.visualization.pca_cluster:main"
+            "run-batch=src.feature_engineering.batch:main",
+            "run-visualization=src.visualization.visualize:main"
         ]
     },
     author="Aritra Majumdar",
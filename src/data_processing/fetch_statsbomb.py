@@ -0,0 +1,310 @@
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import http.client
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import yaml
+
+# StatsBomb open data, the data statsbombpy reads without credentials
+OPEN_DATA_URL = "https://raw.githubusercontent.com/statsbomb/open-data/master/data"
+
+# Transient failures retried with exponential backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def flatten(record, prefix=''):
+    """
+    Flatten nested objects into dotted keys, like ``pd.json_normalize`` (lists are kept).
+
+    ``{"type": {"id": 30, "name": "Pass"}}`` becomes ``{"type.id": 30, "type.name": "Pass"}``,
+    the layout of the preprocessing inputs.
+    """
+
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+class StatsBombFetcher:
+    """
+    Download StatsBomb match lists and events through an on-disk content cache.
+
+    Every response is stored under ``cache_dir`` at its URL path (e.g.
+    ``events/3869685.json``) with a ``.meta`` file holding its ETag and the
+    version it was fetched for. A file whose version still matches is read from
+    disk without any request, so fetching an unchanged season again makes zero
+    network requests; events are versioned by the match's ``last_updated``, so
+    only re-published matches are downloaded again. Files are written to a
+    temporary name and renamed once complete, so an interrupted fetch resumes
+    with the files it is missing.
+
+    Events are downloaded by a pool of ``workers`` threads, each keeping one
+    persistent HTTP/1.1 connection to the server.
+
+    Lookups are counted in ``stats``: ``requests`` sent, ``downloaded`` files,
+    ``not_modified`` revalidations and ``cached`` reads.
+
+    Args:
+        cache_dir (str): Directory of the content cache.
+        base_url (str): URL of the data directory, e.g. a local stand-in server in tests.
+        workers (int): Maximum number of concurrent downloads.
+        timeout (float): Socket timeout in seconds.
+        retries (int): Retries of a failed request (connection errors and ``RETRY_STATUSES``).
+    """
+
+    def __init__(self, cache_dir, base_url=OPEN_DATA_URL, workers=8, timeout=30.0, retries=3):
+        url = urlsplit(base_url)
+        if url.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL {base_url}.")
+
+        self.cache_dir = cache_dir
+        self.base_url = base_url
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.stats = Counter()
+
+        self._scheme = url.scheme
+        self._host = url.netloc
+        self._prefix = url.path.rstrip('/')
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the connections of all threads."""
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _connection(self):
+        """Persistent connection of the calling thread."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection_class = http.client.HTTPSConnection if self._scheme == 'https' else http.client.HTTPConnection
+            connection = connection_class(self._host, timeout=self.timeout)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _get(self, path, etag=None):
+        """
+        GET a path of the data directory on the thread's connection.
+
+        Returns:
+            tuple: (status, body, ETag); the body is None for 304 Not Modified.
+        """
+
+        headers = {'Accept-Encoding': 'gzip', 'Connection': 'keep-alive'}
+        if etag:
+            headers['If-None-Match'] = etag
+
+        for attempt in range(self.retries + 1):
+            connection = self._connection()
+            try:
+                self._count('requests')
+                connection.request('GET', f"{self._prefix}/{path}", headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                # Dropped keep-alive connection or network error: reconnect and retry
+                connection.close()
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status == 304:
+                    return 304, None, etag
+                if response.status == 200:
+                    if response.getheader('Content-Encoding') == 'gzip':
+                        body = gzip.decompress(body)
+                    return 200, body, response.getheader('ETag')
+                if response.status not in RETRY_STATUSES or attempt == self.retries:
+                    raise RuntimeError(f"GET {self.base_url}/{path} returned HTTP {response.status}.")
+
+            time.sleep(0.5 * 2 ** attempt)
+
+    def fetch(self, path, version=None, revalidate=False):
+        """
+        Return the cache file of a path, downloading it only when needed.
+
+        Args:
+            path (str): Path under the data directory, e.g. ``matches/43/106.json``.
+            version (str, optional): Version the cached file must have been fetched for
+                (e.g. the match's ``last_updated``), any cached version when None.
+            revalidate (bool): Ask the server whether a cached file changed (conditional
+                request with its ETag) instead of trusting the cache.
+
+        Returns:
+            str: Path of the cached file.
+        """
+
+        cache_path = os.path.join(self.cache_dir, *path.split('/'))
+        meta_path = f"{cache_path}.meta"
+
+        meta = None
+        if os.path.exists(cache_path) and os.path.exists(meta_path):
+            with open(meta_path, 'r') as file:
+                meta = json.load(file)
+            if version is not None and meta.get('version') != version:
+                meta = None
+
+        if meta is not None and not revalidate:
+            self._count('cached')
+            return cache_path
+
+        status, body, etag = self._get(path, meta.get('etag') if meta else None)
+        if status == 304:
+            self._count('not_modified')
+            return cache_path
+
+        # Complete files only: write to a temporary file, then rename
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        for target, content in [(cache_path, body), (meta_path, json.dumps({'etag': etag, 'version': version}).encode())]:
+            with open(f"{target}.part", 'wb') as file:
+                file.write(content)
+            os.replace(f"{target}.part", target)
+
+        self._count('downloaded')
+        return cache_path
+
+    def fetch_matches(self, competition_id, season_id, refresh=False):
+        """
+        Return the matches of a competition season.
+
+        Args:
+            competition_id (int): StatsBomb competition id.
+            season_id (int): StatsBomb season id.
+            refresh (bool): Revalidate the cached match list with the server.
+
+        Returns:
+            list: Match objects, as published.
+        """
+
+        with open(self.fetch(f"matches/{competition_id}/{season_id}.json", revalidate=refresh), 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def fetch_events(self, matches):
+        """
+        Fetch the events of every match concurrently.
+
+        Args:
+            matches (list): Match objects, from ``fetch_matches``.
+
+        Returns:
+            list: Cache file of the events of every match, in match order.
+        """
+
+        def fetch_match(match):
+            return self.fetch(f"events/{match['match_id']}.json", version=match.get('last_updated'))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(fetch_match, matches))
+
+
+def write_preprocessing_inputs(matches, event_files, events_path, matches_path):
+    """
+    Write the fetched matches and events in the layout read by the preprocessing.
+
+    Both files are JSON arrays of flattened records (``home_team.home_team_name``,
+    ``type.name``, ...); every event gets the ``match_id`` of its match. The events
+    are written one match at a time, so memory is bounded by the largest match.
+
+    Args:
+        matches (list): Match objects.
+        event_files (list): Cache file of the events of every match, in the same order.
+        events_path (str): Output events JSON file (``paths.events``).
+        matches_path (str): Output matches JSON file (``paths.matches``).
+
+    Returns:
+        int: Number of events written.
+    """
+
+    for path in (events_path, matches_path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    with open(matches_path, 'w', encoding='utf-8') as file:
+        json.dump([flatten(match) for match in matches], file)
+
+    n_events = 0
+    with open(events_path, 'w', encoding='utf-8') as file:
+        file.write('[')
+        for match, event_file in zip(matches, event_files):
+            with open(event_file, 'r', encoding='utf-8') as events_file:
+                events = json.load(events_file)
+            for event in events:
+                file.write(',\n' if n_events else '\n')
+                json.dump({**flatten(event), 'match_id': match['match_id']}, file)
+                n_events += 1
+        file.write('\n]\n')
+
+    return n_events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download StatsBomb matches and events into the preprocessing inputs.")
+    parser.add_argument("--competition-id", type=int, required=True, help="StatsBomb competition id.")
+    parser.add_argument("--season-id", type=int, required=True, help="StatsBomb season id.")
+    parser.add_argument("--base-url", default=OPEN_DATA_URL, help="URL of the StatsBomb data directory.")
+    parser.add_argument("--cache-dir",
+                        help="Directory of the download cache. Defaults to paths.statsbomb_cache in the config, "
+                             "or data/raw/statsbomb.")
+    parser.add_argument("--workers", type=int, default=8, help="Maximum number of concurrent downloads.")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Revalidate the cached match list with the server (conditional request).")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    # Load configuration from config.yaml
+    with open("config/config.yaml", "r") as file:
+        config = yaml.safe_load(file)
+
+    # The preprocessing inputs are written where the preprocessing reads them
+    events_path = config["paths"]["events"]
+    matches_path = config["paths"]["matches"]
+    cache_dir = args.cache_dir or config["paths"].get("statsbomb_cache", "data/raw/statsbomb")
+
+    print("🚀 Fetching StatsBomb data...")
+
+    with StatsBombFetcher(cache_dir, args.base_url, args.workers) as fetcher:
+        matches = fetcher.fetch_matches(args.competition_id, args.season_id, args.refresh)
+
+        # Matches without published events are skipped
+        matches = [match for match in matches if match.get('match_status', 'available') == 'available']
+        event_files = fetcher.fetch_events(matches)
+
+    n_events = write_preprocessing_inputs(matches, event_files, events_path, matches_path)
+
+    stats = fetcher.stats
+    print(f"🗂️ {stats['requests']} requests, {stats['downloaded']} downloaded, "
+          f"{stats['not_modified']} not modified, {stats['cached']} from cache")
+    print(f"✅ {len(matches)} matches and {n_events} events saved to {matches_path} and {events_path}")
+
+
+if __name__ == "__main__":
+    main()
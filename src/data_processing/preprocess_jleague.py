@@ -1,21 +1,49 @@
+import argparse
 import json
+import os
+import shutil
+from urllib.parse import quote
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import yaml
 
-# Load configuration from config.yaml
-with open("config/config.yaml", "r") as file:
-    config = yaml.safe_load(file)
+from src.feature_engineering.pitch_grid import ZONE_COLUMNS, PitchGrid, zone_columns
+
+# List columns holding event locations and the x / y columns extracted from them
+COORDINATE_COLUMNS = [
+    ('location', 'x', 'y'),
+    ('pass.end_location', 'pass_end_x', 'pass_end_y'),
+    ('carry.end_location', 'carry_end_x', 'carry_end_y'),
+    ('shot.end_location', 'shot_end_x', 'shot_end_y'),
+    ('goalkeeper.end_location', 'goalkeeper_end_x', 'goalkeeper_end_y'),
+]
+
+# Columns dropped from the events before saving
+UNUSED_COLUMNS = ['related_events', 'tactics.lineup']
+
+# Compact schema of the processed events, other columns keep their inferred type:
+# - repeated names are stored as categoricals (dictionary-encoded in Parquet),
+# - extracted coordinates are float32 with NaN for missing locations,
+# - clock and possession counters use small integer types,
+# - zone IDs (``pitch_grid.ZONE_COLUMNS``) are small integers.
+CATEGORICAL_COLUMNS = [
+    'team.name', 'possession_team.name', 'type.name', 'player.name', 'play_pattern.name',
+    'pass.outcome.name', 'duel.type.name', 'home_team', 'away_team'
+]
+COORDINATE_DTYPE = 'float32'
+INTEGER_COLUMNS = {'period': 'int8', 'minute': 'int16', 'second': 'int8', 'possession': 'int16'}
 
-# File paths from config
-events_path = config["paths"]["events"]
-matches_path = config["paths"]["matches"]
-output_path = config["paths"]["output"]
+# Directory levels of the partitioned events dataset (levels missing from the data are skipped)
+PARTITION_COLUMNS = ['competition', 'season', 'match_week']
 
 def load_json(file_path):
     """Load JSON file into a Pandas DataFrame."""
     with open(file_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
-    
+
     if isinstance(data, list):
         return pd.DataFrame(data)
     elif isinstance(data, dict):
@@ -23,27 +51,99 @@ def load_json(file_path):
     else:
         raise ValueError("Invalid JSON structure.")
 
+def iter_json_array(file_path, chunk_size=1 << 20):
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    The file is read in chunks of ``chunk_size`` characters, so memory is bounded
+    by the chunk size and the largest single element, not by the file size.
+    """
+    decoder = json.JSONDecoder()
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        pos = 0
+        eof = False
+        started = False
+
+        while True:
+            # Skip whitespace and separators, reading more when the buffer runs out
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    raise ValueError("Unexpected end of JSON array.")
+                buffer = f.read(chunk_size)
+                pos = 0
+                eof = len(buffer) == 0
+                continue
+
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError("Streaming ingestion expects a top-level JSON array.")
+                started = True
+                pos += 1
+                continue
+
+            if buffer[pos] == ']':
+                return
+
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+
+            if not complete:
+                # The element continues in the next chunk
+                more = f.read(chunk_size)
+                eof = len(more) == 0
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+
+            yield element
+            pos = end
+
+            # Drop consumed text so the buffer stays around one chunk
+            if pos > chunk_size:
+                buffer = buffer[pos:]
+                pos = 0
+
+def iter_json_batches(file_path, batch_size):
+    """Yield the elements of a top-level JSON array in lists of ``batch_size``."""
+    batch = []
+    for element in iter_json_array(file_path):
+        batch.append(element)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 def extract_coordinates(df, column_name, x_col, y_col):
     """Extract x and y coordinates from list columns."""
-    df[x_col] = df[column_name].apply(lambda x: x[0] if isinstance(x, list) and len(x) > 0 else None)
-    df[y_col] = df[column_name].apply(lambda x: x[1] if isinstance(x, list) and len(x) > 1 else None)
+    df[x_col] = df[column_name].apply(lambda x: x[0] if isinstance(x, list) and len(x) > 0 else None).astype(COORDINATE_DTYPE)
+    df[y_col] = df[column_name].apply(lambda x: x[1] if isinstance(x, list) and len(x) > 1 else None).astype(COORDINATE_DTYPE)
     return df
 
-def preprocess_events(events_df):
-    """Preprocess events data."""
+def preprocess_events(events_df, grid=None):
+    """Preprocess events data, ``grid`` is the ``PitchGrid`` of the zone IDs (default grid when None)."""
     # Drop unnecessary columns
-    events_df = events_df.drop(columns=['related_events', 'tactics.lineup'], errors='ignore')
+    events_df = events_df.drop(columns=UNUSED_COLUMNS, errors='ignore')
 
     # Extract coordinates
-    events_df = extract_coordinates(events_df, 'location', 'x', 'y')
-    events_df = extract_coordinates(events_df, 'pass.end_location', 'pass_end_x', 'pass_end_y')
-    events_df = extract_coordinates(events_df, 'carry.end_location', 'carry_end_x', 'carry_end_y')
-    events_df = extract_coordinates(events_df, 'shot.end_location', 'shot_end_x', 'shot_end_y')
-    events_df = extract_coordinates(events_df, 'goalkeeper.end_location', 'goalkeeper_end_x', 'goalkeeper_end_y')
+    for column_name, x_col, y_col in COORDINATE_COLUMNS:
+        events_df = extract_coordinates(events_df, column_name, x_col, y_col)
+
+    # Zone and region IDs of the start and end location
+    for column, ids in zone_columns(events_df, grid).items():
+        events_df[column] = ids
 
     # Drop original list columns
-    columns_to_drop = ['location', 'pass.end_location', 'carry.end_location',
-                       'shot.end_location', 'goalkeeper.end_location']
+    columns_to_drop = [column_name for column_name, _, _ in COORDINATE_COLUMNS]
     events_df = events_df.drop(columns=columns_to_drop, errors='ignore')
 
     return events_df
@@ -52,9 +152,13 @@ def preprocess_matches(matches_df):
     """Preprocess matches data."""
     matches_df = matches_df.rename(columns={
         'home_team.home_team_name': 'home_team',
-        'away_team.away_team_name': 'away_team'
+        'away_team.away_team_name': 'away_team',
+        'competition.competition_name': 'competition',
+        'season.season_name': 'season'
     })
-    return matches_df[['match_id', 'home_team', 'away_team', 'match_week', 'home_score', 'away_score']]
+    columns = ['match_id', 'home_team', 'away_team', 'match_week', 'home_score', 'away_score']
+    columns += [column for column in ['competition', 'season'] if column in matches_df.columns]
+    return matches_df[columns]
 
 def merge_events_matches(events_df, matches_df):
     """Merge events with match information."""
@@ -65,26 +169,265 @@ def merge_events_matches(events_df, matches_df):
     )
     return merged_df
 
+def compact_events(df):
+    """Cast the merged events to the compact schema (categoricals and small integers)."""
+    dtypes = {column: 'category' for column in CATEGORICAL_COLUMNS if column in df.columns}
+    dtypes.update({column: dtype for column, dtype in INTEGER_COLUMNS.items() if column in df.columns})
+    return df.astype(dtypes)
+
 def save_as_parquet(df, output_path):
     """Save DataFrame as Parquet file."""
     df.to_parquet(output_path, index=False, engine='pyarrow')
     print(f"✅ Processed data saved at {output_path}")
 
-if __name__ == "__main__":
+class PartitionedWriter:
+    """
+    Write events to a Hive-partitioned Parquet dataset, one row group per match.
+
+    Events go to ``competition=<name>/season=<name>/match_week=<n>/part-0.parquet``
+    under ``output_dir``, so readers can skip whole partitions and prune row groups
+    by match from their statistics. ``write`` can be called repeatedly (one call per
+    streamed batch); every partition file stays open until ``close``.
+
+    Args:
+        output_dir (str): Dataset directory, replaced if it already exists.
+        schema (pa.Schema): Arrow schema of the events, partition columns included.
+    """
+
+    def __init__(self, output_dir, schema):
+        self.output_dir = output_dir
+        self.partition_columns = [column for column in PARTITION_COLUMNS if column in schema.names]
+        self.schema = pa.schema([field for field in schema if field.name not in self.partition_columns])
+        self._writers = {}
+
+        if os.path.isdir(output_dir):
+            shutil.rmtree(output_dir)
+        elif os.path.exists(output_dir):
+            os.remove(output_dir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _writer(self, keys):
+        """Return (and open) the Parquet writer of a partition."""
+        if keys not in self._writers:
+            directory = os.path.join(self.output_dir, *[
+                f"{column}={'__HIVE_DEFAULT_PARTITION__' if pd.isna(value) else quote(str(value), safe='')}"
+                for column, value in zip(self.partition_columns, keys)
+            ])
+            os.makedirs(directory, exist_ok=True)
+            self._writers[keys] = pq.ParquetWriter(os.path.join(directory, 'part-0.parquet'), self.schema)
+        return self._writers[keys]
+
+    def write(self, df):
+        """Append events to their partitions, one row group per match."""
+        if len(self.partition_columns) == 1:
+            partitions = df.groupby(self.partition_columns[0], sort=False, dropna=False)
+        elif self.partition_columns:
+            partitions = df.groupby(self.partition_columns, sort=False, dropna=False)
+        else:
+            partitions = [((), df)]
+
+        for keys, partition_df in partitions:
+            keys = keys if isinstance(keys, tuple) else (keys,)
+
+            # Stable sort keeps the matches in order of appearance and the events in order
+            codes, _ = pd.factorize(partition_df['match_id'])
+            order = np.argsort(codes, kind='stable')
+            table = pa.Table.from_pandas(
+                partition_df.iloc[order].drop(columns=self.partition_columns),
+                schema=self.schema,
+                preserve_index=False
+            )
+
+            writer = self._writer(keys)
+            offset = 0
+            for count in np.bincount(codes):
+                writer.write_table(table.slice(offset, count))
+                offset += count
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+def save_as_dataset(df, output_dir):
+    """Save DataFrame as a partitioned Parquet dataset."""
+    with PartitionedWriter(output_dir, pa.Schema.from_pandas(df, preserve_index=False)) as writer:
+        writer.write(df)
+    print(f"✅ Processed data saved at {output_dir}")
+
+def _value_type(value):
+    """Arrow type of a single JSON value."""
+    if isinstance(value, bool):
+        return pa.bool_()
+    if isinstance(value, int):
+        return pa.int64()
+    if isinstance(value, float):
+        return pa.float64()
+    if isinstance(value, str):
+        return pa.string()
+    return pa.array([value]).type
+
+def _merge_types(a, b):
+    """Smallest Arrow type holding the values of both ``a`` and ``b``."""
+    if a == b or pa.types.is_null(b):
+        return a
+    if pa.types.is_null(a):
+        return b
+    if (pa.types.is_integer(a) or pa.types.is_floating(a)) and (pa.types.is_integer(b) or pa.types.is_floating(b)):
+        return pa.float64()
+    if pa.types.is_list(a) and pa.types.is_list(b):
+        return pa.list_(_merge_types(a.value_type, b.value_type))
+    if pa.types.is_struct(a) and pa.types.is_struct(b):
+        fields = {field.name: field.type for field in a}
+        for field in b:
+            fields[field.name] = _merge_types(fields[field.name], field.type) if field.name in fields else field.type
+        return pa.struct(list(fields.items()))
+    raise ValueError(f"Incompatible value types {a} and {b}.")
+
+def scan_event_schema(events_path):
+    """
+    First streaming pass: column order and Arrow type of every event field.
+
+    Columns are ordered by first appearance, like ``pd.DataFrame`` on the full list.
+    Integer fields missing from some events become float64, as they would in pandas.
+
+    Returns:
+        dict: Column name to Arrow type, in column order.
+    """
+    skipped = set(UNUSED_COLUMNS) | {column_name for column_name, _, _ in COORDINATE_COLUMNS}
+    types = {}
+    present = {}
+    n_events = 0
+
+    for event in iter_json_array(events_path):
+        n_events += 1
+        for key, value in event.items():
+            if key not in types:
+                types[key] = pa.null()
+                present[key] = 0
+            if value is None:
+                continue
+            present[key] += 1
+            if key not in skipped:
+                types[key] = _merge_types(types[key], _value_type(value))
+
+    for key, value_type in types.items():
+        if pa.types.is_integer(value_type) and present[key] < n_events:
+            types[key] = pa.float64()
+
+    return types
+
+def stream_events_to_parquet(events_path, matches_df, output_path, batch_size=50_000, layout='dataset', grid=None):
+    """
+    Preprocess the events file in fixed-size batches and write it as Parquet.
+
+    Peak memory is bounded by ``batch_size`` rather than by the size of the events file.
+    The file is read twice: once to fix the schema, once to convert and write the batches.
+
+    Args:
+        events_path (str): Path of the events JSON array.
+        matches_df (pd.DataFrame): Preprocessed matches.
+        output_path (str): Path of the output dataset directory or Parquet file.
+        batch_size (int): Number of events per batch (and row group for the ``file`` layout).
+        layout (str): ``dataset`` for the partitioned dataset, ``file`` for a single Parquet file.
+        grid (PitchGrid, optional): Grid of the zone IDs, the default grid when not given.
+    """
+    event_types = scan_event_schema(events_path)
+    event_columns = list(event_types)
+
+    # Output column order: preprocessed event columns, then the merged match columns
+    output_columns = list(preprocess_events(pd.DataFrame(columns=event_columns)).columns)
+    output_columns += [column for column in matches_df.columns if column not in output_columns]
+
+    coordinate_columns = {col for _, x_col, y_col in COORDINATE_COLUMNS for col in (x_col, y_col)}
+    match_schema = pa.Schema.from_pandas(matches_df, preserve_index=False)
+
+    fields = []
+    for column in output_columns:
+        if column in CATEGORICAL_COLUMNS:
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+        elif column in INTEGER_COLUMNS:
+            fields.append(pa.field(column, pa.from_numpy_dtype(INTEGER_COLUMNS[column])))
+        elif column in ZONE_COLUMNS:
+            fields.append(pa.field(column, pa.from_numpy_dtype(ZONE_COLUMNS[column])))
+        elif column in coordinate_columns:
+            fields.append(pa.field(column, pa.from_numpy_dtype(COORDINATE_DTYPE)))
+        elif column in event_types:
+            fields.append(pa.field(column, event_types[column]))
+        else:
+            fields.append(match_schema.field(column))
+    schema = pa.schema(fields)
+
+    if layout == 'dataset':
+        writer = PartitionedWriter(output_path, schema)
+    else:
+        writer = pq.ParquetWriter(output_path, schema)
+
+    n_events = 0
+    with writer:
+        for batch in iter_json_batches(events_path, batch_size):
+            events_df = preprocess_events(pd.DataFrame(batch, columns=event_columns), grid)
+            merged_df = compact_events(merge_events_matches(events_df, matches_df))
+            if layout == 'dataset':
+                writer.write(merged_df)
+            else:
+                writer.write_table(pa.Table.from_pandas(merged_df, schema=schema, preserve_index=False))
+            n_events += len(batch)
+
+    print(f"✅ Processed {n_events} events in batches of {batch_size}, saved at {output_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocess the J League events and matches.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Parse the events incrementally and write them in fixed-size batches.")
+    parser.add_argument("--batch-size", type=int, default=50_000,
+                        help="Number of events per batch in streaming mode.")
+    parser.add_argument("--layout", choices=["dataset", "file"], default="dataset",
+                        help="'dataset' writes a Parquet dataset partitioned by competition, season and "
+                             "match week with one row group per match; 'file' writes a single Parquet file.")
+    args = parser.parse_args()
+
+    # Load configuration from config.yaml
+    with open("config/config.yaml", "r") as file:
+        config = yaml.safe_load(file)
+
+    # File paths from config
+    events_path = config["paths"]["events"]
+    matches_path = config["paths"]["matches"]
+    output_path = config["paths"]["output"]
+
+    # Grid of the zone IDs, e.g. {x_bins: 6, y_bins: 4}
+    grid = PitchGrid(**config.get("pitch_grid", {}))
+
     print("🚀 Starting J League Data Preprocessing...")
 
-    # Load data
-    events_df = load_json(events_path)
-    matches_df = load_json(matches_path)
+    # Load and preprocess matches
+    matches_df = preprocess_matches(load_json(matches_path))
 
-    # Preprocess
-    events_df = preprocess_events(events_df)
-    matches_df = preprocess_matches(matches_df)
+    if args.stream:
+        stream_events_to_parquet(events_path, matches_df, output_path, args.batch_size, args.layout, grid)
+    else:
+        # Load data
+        events_df = load_json(events_path)
 
-    # Merge
-    merged_df = merge_events_matches(events_df, matches_df)
+        # Preprocess
+        events_df = preprocess_events(events_df, grid)
 
-    # Save
-    save_as_parquet(merged_df, output_path)
+        # Merge
+        merged_df = compact_events(merge_events_matches(events_df, matches_df))
+
+        # Save
+        if args.layout == "dataset":
+            save_as_dataset(merged_df, output_path)
+        else:
+            save_as_parquet(merged_df, output_path)
 
     print("✅ J League Data Preprocessing Completed.")
+
+if __name__ == "__main__":
+    main()
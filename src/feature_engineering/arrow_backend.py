@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import DEFENSIVE_ACTION_TYPES, EVENT_COLUMNS, SET_PIECE_PATTERNS, derivable_columns
+from src.feature_engineering.pitch_grid import end_coordinates, region_ids
+
+# Period timestamps parsed by the Arrow backend, the ones pandas reads as HH:MM:SS[.fraction]
+TIMESTAMP_PATTERN = r'^\d{2}:[0-5]\d:[0-5]\d(\.\d{1,9})?$'
+
+
+class ArrowColumn:
+    """
+    One column of an ``ArrowEvents`` table, with the column operations of the match stages.
+
+    ``to_numpy`` is a zero-copy view of numeric columns without nulls; ``array`` is
+    a ``pd.Categorical`` built from the indices and dictionary of dictionary-encoded
+    columns, so team and player names are not materialized per event. ``==`` and
+    ``isin`` are evaluated once on the dictionary and taken by the indices; they return
+    boolean columns (nulls are False, as in pandas) that support ``~`` and ``to_numpy``.
+
+    Args:
+        array (pa.Array): Values of the column.
+    """
+
+    def __init__(self, array):
+        self._array = array
+        self._categorical = None
+
+    def __len__(self):
+        return len(self._array)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.to_numpy(dtype)
+
+    def to_numpy(self, dtype=None):
+        """Return the values as a NumPy array (nulls of numeric columns become NaN)."""
+        if pa.types.is_dictionary(self._array.type):
+            values = np.asarray(self.array)
+        else:
+            values = self._array.to_numpy(zero_copy_only=False)
+        return values if dtype is None else values.astype(dtype, copy=False)
+
+    @property
+    def array(self):
+        """Return the values as a ``pd.Categorical`` (dictionary-encoded columns) or a NumPy array."""
+        if not pa.types.is_dictionary(self._array.type):
+            return self.to_numpy()
+
+        if self._categorical is None:
+            codes = self._array.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+            categories = self._array.dictionary.to_numpy(zero_copy_only=False)
+            self._categorical = pd.Categorical.from_codes(codes, categories=categories)
+        return self._categorical
+
+    def _compare(self, function, *args, **kwargs):
+        """Evaluate a comparison kernel, on the dictionary only for dictionary-encoded columns."""
+        if pa.types.is_dictionary(self._array.type):
+            result = pc.take(function(self._array.dictionary, *args, **kwargs), self._array.indices)
+        else:
+            result = function(self._array, *args, **kwargs)
+        return ArrowColumn(result.fill_null(False))
+
+    def __eq__(self, value):
+        return self._compare(pc.equal, value)
+
+    __hash__ = None
+
+    def isin(self, values):
+        value_type = self._array.type.value_type if pa.types.is_dictionary(self._array.type) else self._array.type
+        return self._compare(pc.is_in, value_set=pa.array(list(values), type=value_type))
+
+    def isna(self):
+        return ArrowColumn(pc.is_null(self._array))
+
+    def __invert__(self):
+        return ArrowColumn(pc.invert(self._array))
+
+    def __or__(self, other):
+        return ArrowColumn(pc.or_(self._array, other._array))
+
+
+class ArrowEvents:
+    """
+    Read-only event table of the Arrow backend, indexed by column name like a DataFrame.
+
+    Args:
+        table (pa.Table): Events, one chunk per column.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.columns = table.column_names
+        self._columns = {}
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def __getitem__(self, column):
+        if column not in self._columns:
+            chunked = self.table.column(column)
+            array = chunked.chunk(0) if chunked.num_chunks == 1 else chunked.combine_chunks()
+            self._columns[column] = ArrowColumn(array)
+        return self._columns[column]
+
+
+def period_seconds(timestamps):
+    """
+    Seconds since the start of the period of every ``HH:MM:SS.mmm`` timestamp.
+
+    Parsed with string kernels into integer nanoseconds, then divided like
+    ``pd.to_timedelta(...).dt.total_seconds()``, so the seconds are the same floats.
+
+    Args:
+        timestamps (pa.Array): Timestamp strings.
+
+    Returns:
+        np.ndarray: Seconds, NaN for missing or malformed timestamps.
+    """
+
+    if pa.types.is_dictionary(timestamps.type):
+        timestamps = timestamps.cast(timestamps.type.value_type)
+
+    timestamps = pc.if_else(pc.match_substring_regex(timestamps, TIMESTAMP_PATTERN), timestamps, None)
+
+    def digits(start, stop):
+        return pc.cast(pc.utf8_slice_codeunits(timestamps, start, stop), pa.int64())
+
+    nanoseconds = pc.add(
+        pc.multiply(pc.add(pc.multiply(pc.add(pc.multiply(digits(0, 2), 60), digits(3, 5)), 60), digits(6, 8)), 10**9),
+        pc.cast(pc.utf8_rpad(pc.utf8_slice_codeunits(timestamps, 9, 18), 9, '0'), pa.int64())
+    )
+
+    return nanoseconds.to_numpy(zero_copy_only=False) / 1e9
+
+
+def normalize_table(table, columns=EVENT_COLUMNS):
+    """
+    Arrow counterpart of ``normalize_events``: select the metric columns and add the normalized columns.
+
+    Dictionary-encoded columns (the categoricals of the events store) keep their
+    encoding, with the dictionaries of all chunks unified, so every comparison runs
+    on the distinct values only; plain string columns stay strings, compared by Arrow
+    kernels, so they group like the object strings of the pandas path. The
+    ``timestamp`` strings are replaced by their ``period_seconds``, read by
+    ``speed_metrics.event_clock``.
+
+    Args:
+        table (pa.Table): Processed J League events.
+        columns (list, optional): Event columns to keep, all columns when None.
+
+    Returns:
+        pa.Table: The selected columns with the normalized columns added, one chunk per column.
+    """
+
+    if columns is None:
+        columns = table.column_names
+    columns = [column for column in columns if column in table.column_names]
+
+    events = ArrowEvents(table)
+
+    arrays = {}
+    for column in columns:
+        array = table.column(column)
+        if column == 'timestamp':
+            arrays['period_seconds'] = pa.array(period_seconds(array.combine_chunks()))
+            continue
+        arrays[column] = array
+
+    derivable = derivable_columns(table.column_names)
+
+    if 'region' not in table.column_names and 'region' in derivable:
+        arrays['region'] = pa.array(region_ids(events['x'], events['y']))
+    if 'end_region' not in table.column_names and 'end_region' in derivable:
+        arrays['end_region'] = pa.array(region_ids(*end_coordinates(events)))
+    if 'pass_complete' in derivable:
+        outcome = events['pass.outcome.name']
+        arrays['pass_complete'] = (outcome.isna() | (outcome == "Complete"))._array
+    if 'defensive_action' in derivable:
+        arrays['defensive_action'] = (
+            events['type.name'].isin(DEFENSIVE_ACTION_TYPES) | (events['duel.type.name'] == "Tackle")
+        )._array
+    if 'regular_play' in derivable:
+        arrays['regular_play'] = (~events['play_pattern.name'].isin(SET_PIECE_PATTERNS))._array
+
+    return pa.table(arrays).unify_dictionaries().combine_chunks()
+
+
+class ArrowMatchIndex(MatchIndex):
+    """
+    ``MatchIndex`` over a normalized Arrow table, for the Arrow backend of the metrics engine.
+
+    The matches are partitioned with Arrow kernels and ``events`` is an ``ArrowEvents``
+    view, so the same match stages run on the Arrow buffers without converting the
+    events to pandas.
+
+    Args:
+        table (pa.Table): Output of ``normalize_table``.
+    """
+
+    def __init__(self, table):
+        match_ids = pc.unique(table.column('match_id'))
+        codes = pc.index_in(table.column('match_id'), value_set=match_ids).to_numpy()
+
+        # Codes follow the order of first appearance, so non-decreasing codes mean contiguous matches
+        if not (np.diff(codes) >= 0).all():
+            order = np.argsort(codes, kind='stable')
+            table = table.take(order).combine_chunks()
+            codes = codes[order]
+        self.events = ArrowEvents(table)
+
+        counts = np.bincount(codes, minlength=len(match_ids))
+        self.stops = np.cumsum(counts)
+        self.starts = self.stops - counts
+        self.match_ids = match_ids.to_numpy(zero_copy_only=False)
+
+        self._positions = {match_id: i for i, match_id in enumerate(self.match_ids)}
+
+        # Home and away team (and match week) from the first event of every match
+        first_events = table.take(self.starts)
+        self.home_teams = np.asarray(first_events.column('home_team').to_pylist(), dtype=object)
+        self.away_teams = np.asarray(first_events.column('away_team').to_pylist(), dtype=object)
+        self.match_weeks = first_events.column('match_week').to_numpy()
+
+        self.event_positions = np.repeat(np.arange(len(self.match_ids)), counts)
+
+        self._sides = {}
+        self._masks = {}
+        self._player_groups = {}
+
+    def match(self, match_id):
+        """Return the events of a single match as a zero-copy table slice."""
+        i = self._positions[match_id]
+        return self.events.table.slice(self.starts[i], self.stops[i] - self.starts[i])
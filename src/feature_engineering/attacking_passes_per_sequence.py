@@ -1,66 +1,62 @@
 import pandas as pd
 
-def calculate_avg_attacking_passes_per_sequence(df):
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
+from src.feature_engineering.possession_chains import build_chain_summary
+
+def match_attacking_passes_per_sequence(match_index, chains):
     """
-    Calculate Average Attacking Passes per Possession Sequence for each team.
+    Count the shot-ending sequences, and the passes in them, of both teams in every match.
 
     Args:
-        df (pd.DataFrame): Processed J League events DataFrame.
-    
+        match_index (MatchIndex): Per-match partition of the normalized events.
+        chains (pd.DataFrame): Possession chain summary of ``match_index.events``.
+
     Returns:
-        pd.DataFrame: DataFrame with Average Attacking Passes per Sequence for each team.
+        pd.DataFrame: One row per match with home and away sequence and pass counts.
     """
 
-    # Fill missing values and replace None or NaN with "Complete"
-    df['pass.outcome.name'] = df['pass.outcome.name'].fillna("Complete").replace({None: "Complete"})
-
-    df_events = df.copy()
+    # Sequences ending in a shot with at least three events
+    shot_chains = (chains['has_shot'] & (chains['n_events'] >= 3)).to_numpy()
 
-    match_ids = df_events["match_id"].unique()
+    positions = match_index.positions(chains['match_id'])
+    sides = match_index.sides(positions, chains['possession_team.name'])
 
-    chains_data = []
+    home_chains, away_chains = match_index.side_totals(positions, sides, shot_chains)
+    home_passes, away_passes = match_index.side_totals(positions, sides, shot_chains, chains['n_passes'])
 
-    for match_id in match_ids:
-        df_match = df_events[df_events["match_id"] == match_id]
-        
-        chains = pd.DataFrame()
-        for v in df_match.possession.unique():
-            chain = df_match.loc[df_match["possession"] == v]
-            if ("Shot" in chain["type.name"].values) and (chain.shape[0] >= 3):
-                chains = pd.concat([chains, chain], ignore_index=True)
-        
-        chains_data.append(chains)
-        
-    chains_data = pd.concat(chains_data) 
+    return match_index.match_frame(
+        home_shot_chains=home_chains,
+        away_shot_chains=away_chains,
+        home_shot_chain_passes=home_passes,
+        away_shot_chain_passes=away_passes
+    )
 
-    cd = chains_data.copy()
-
-    cd = chains_data[['team.name', 'type.name', 'possession', 'possession_team.name', 'match_id']]
 
+def aggregate_attacking_passes_per_sequence(sequence_df):
+    """
+    Turn match sequence and pass counts into team-level Attacking Passes per Sequence.
 
-    possession_chain_counts = cd.groupby(['possession_team.name', 'match_id'])['possession'].nunique().reset_index()
-    # Calculate the event counts per team
-    event_counts = cd.groupby(['possession_team.name', 'match_id'])['type.name'].count().reset_index()
+    Args:
+        sequence_df (pd.DataFrame): Output of ``match_attacking_passes_per_sequence``.
 
-    # Calculate the pass counts per team
-    pass_counts = cd[cd['type.name'] == 'Pass'].groupby(['possession_team.name', 'match_id'])['type.name'].count().reset_index()
+    Returns:
+        pd.DataFrame: DataFrame with Average Attacking Passes per Sequence for each team.
+    """
 
-    possession_chain_counts = possession_chain_counts.groupby('possession_team.name')['possession'].sum().reset_index()
+    columns = {'shot_chains': 'Number_of_Possession_Chains', 'shot_chain_passes': 'Number_of_Passes'}
 
-    event_counts = event_counts.groupby('possession_team.name')['type.name'].sum().reset_index()
+    home_data = sequence_df[['home_team'] + ['home_' + c for c in columns]].copy()
+    home_data.columns = ['Team'] + list(columns.values())
 
-    pass_counts = pass_counts.groupby('possession_team.name')['type.name'].sum().reset_index()
+    away_data = sequence_df[['away_team'] + ['away_' + c for c in columns]].copy()
+    away_data.columns = ['Team'] + list(columns.values())
 
-    # Rename the columns for clarity
-    possession_chain_counts.columns = ['Team', 'Number_of_Possession_Chains']
-    event_counts.columns = ['Team', 'Number_of_Events']
-    pass_counts.columns = ['Team', 'Number_of_Passes']
+    result_df = pd.concat([home_data, away_data], ignore_index = True).groupby('Team').sum().reset_index()
 
-    # Merge the DataFrames
-    result_df = possession_chain_counts.merge(event_counts, on='Team')
-    result_df = result_df.merge(pass_counts, on='Team')
+    # Teams without passes in shot-ending sequences have nothing to average
+    result_df = result_df.loc[result_df['Number_of_Passes'] > 0]
 
-    # Display the result
     result_df['Att. Passes_per_sequence'] = result_df['Number_of_Passes']/ result_df['Number_of_Possession_Chains']
     result_df['Att. Passes_per_sequence'] = result_df['Att. Passes_per_sequence'].round(2)
 
@@ -70,3 +66,24 @@ def calculate_avg_attacking_passes_per_sequence(df):
 
     return result_df
 
+
+def calculate_avg_attacking_passes_per_sequence(df, match_index=None, chains=None):
+    """
+    Calculate Average Attacking Passes per Possession Sequence for each team.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+        chains (pd.DataFrame, optional): Possession chain summary from ``build_chain_summary``. Built when not given.
+    
+    Returns:
+        pd.DataFrame: DataFrame with Average Attacking Passes per Sequence for each team.
+    """
+
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
+
+    if chains is None:
+        chains = build_chain_summary(match_index.events)
+
+    return aggregate_attacking_passes_per_sequence(match_attacking_passes_per_sequence(match_index, chains))
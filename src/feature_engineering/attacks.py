@@ -1,6 +1,82 @@
 import pandas as pd
 
-def calculate_buildup_and_direct_attacks(df):
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
+from src.feature_engineering.pitch_grid import in_region
+from src.feature_engineering.possession_chains import build_chain_summary
+
+def match_buildup_and_direct_attacks(match_index, chains):
+    """
+    Count the Buildup Attacks and Direct Attacks of both teams in every match.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+        chains (pd.DataFrame): Possession chain summary of ``match_index.events``.
+
+    Returns:
+        pd.DataFrame: One row per match with home and away attack counts.
+    """
+
+    # Ensure enough events exist
+    chains = chains.loc[chains['n_events'] > 2]
+
+    # Open-play sequences starting with a pass
+    open_play = (chains['first_type'] == 'Pass') & chains['regular_play']
+
+    # Ending in a shot or a touch inside the penalty box
+    in_box = in_region(chains['final_region'], 'box')
+    threat = chains['has_shot'] | in_box
+
+    buildup = open_play & threat & (chains['n_passes'] >= 10)
+
+    direct = (
+        open_play & threat &
+        in_region(chains['first_region'], 'own_half') &
+        (chains['final_x'] >= (chains['first_x'] + (120.0 - chains['first_x'])/2))
+    )
+
+    positions = match_index.positions(chains['match_id'])
+    sides = match_index.sides(positions, chains['possession_team.name'])
+
+    home_buildup, away_buildup = match_index.side_totals(positions, sides, buildup.to_numpy())
+    home_direct, away_direct = match_index.side_totals(positions, sides, direct.to_numpy())
+
+    return match_index.match_frame(
+        home_buildup_attacks=home_buildup,
+        away_buildup_attacks=away_buildup,
+        home_direct_attacks=home_direct,
+        away_direct_attacks=away_direct
+    )
+
+
+def aggregate_buildup_and_direct_attacks(attacks_df):
+    """
+    Sum match attack counts into a team-level table.
+
+    Args:
+        attacks_df (pd.DataFrame): Output of ``match_buildup_and_direct_attacks``.
+
+    Returns:
+        pd.DataFrame: DataFrame with counts of Direct Attacks per team.
+    """
+
+    home_data = attacks_df[['home_team', 'home_buildup_attacks', 'home_direct_attacks']].copy()
+    home_data.columns = ['Team', 'Buildup Attacks', 'Direct Attacks']
+
+    away_data = attacks_df[['away_team', 'away_buildup_attacks', 'away_direct_attacks']].copy()
+    away_data.columns = ['Team', 'Buildup Attacks', 'Direct Attacks']
+
+    data = pd.concat([home_data, away_data], ignore_index = True).groupby('Team').sum().reset_index()
+
+    # Only teams with at least one attack of each kind are reported
+    data = data.loc[(data['Buildup Attacks'] > 0) & (data['Direct Attacks'] > 0)].reset_index(drop = True)
+
+    data = data[['Team', 'Direct Attacks']]
+
+    return data
+
+
+def calculate_buildup_and_direct_attacks(df, match_index=None, chains=None):
     """
     Calculate Buildup Attacks and Direct Attacks for each team.
 
@@ -11,130 +87,17 @@ def calculate_buildup_and_direct_attacks(df):
 
     Args:
         df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+        chains (pd.DataFrame, optional): Possession chain summary from ``build_chain_summary``. Built when not given.
 
     Returns:
         pd.DataFrame: DataFrame with counts of Buildup and Direct Attacks per team.
     """
 
-    # Fill missing values and replace None or NaN with "Complete"
-    df['pass.outcome.name'] = df['pass.outcome.name'].fillna("Complete").replace({None: "Complete"})
-
-    df['play_pattern.name'] = df['play_pattern.name'].where(
-    df['play_pattern.name'].isin(['From Corner', 'From Free Kick']), 'Regular Play'
-    )
-
-    df_events = df.copy()
-
-    match_ids = df_events["match_id"].unique()
-
-
-    chains_data_att = []
-    chains_data_normal = []
-
-
-    for match_id in match_ids:
-        df_match = df_events[df_events["match_id"] == match_id]
-        
-        
-        # Identify home and away teams from the match dataset
-        home_team_name = df_match['home_team'].unique()[0]
-        away_team_name = df_match['away_team'].unique()[0]
-        
-        
-        chains_normal = pd.DataFrame()
-
-        for v in df_match.possession.unique():
-            chain = df_match.loc[df_match["possession"] == v]
-
-            try:
-                if chain.shape[0] > 2:  # Ensure enough events exist
-                    last_event = chain.iloc[-1]
-
-                    # If the last event is a goalkeeper action, use the second-last event instead
-                    if last_event['type.name'] == 'Goal Keeper':
-                        final_x = chain.iloc[-2].x
-                        final_y = chain.iloc[-2].y
-                    else:
-                        final_x = last_event.x
-                        final_y = last_event.y
-
-                    # Apply the filtering conditions
-                    if ((chain['type.name'].value_counts().get('Pass', 0) >= 10) and 
-                        (chain.iloc[0]['type.name'] == 'Pass') and 
-                        ("Regular Play" in chain["play_pattern.name"].values) and 
-                        ("Shot" in chain["type.name"].values)) or \
-                    ((chain['type.name'].value_counts().get('Pass', 0) >= 10) and 
-                        (chain.iloc[0]['type.name'] == 'Pass') and 
-                        ("Regular Play" in chain["play_pattern.name"].values) and 
-                        (final_x >= 102.0) and (18.0 < final_y < 62.0)):
-
-                        chains_normal = pd.concat([chains_normal, chain])  # Use pd.concat instead of .append()
-
-            except Exception as e:
-                pass  # Avoid breaking the loop on errors
-
-                
-        chains_att = pd.DataFrame()
-
-        for v in df_match.possession.unique():
-            chain = df_match.loc[df_match["possession"] == v]
-
-            try:
-                if chain.shape[0] > 2:  # Ensure enough events exist
-                    last_event = chain.iloc[-1]
-
-                    # If the last event is a goalkeeper action, use the second-last event instead
-                    if last_event['type.name'] == 'Goal Keeper':
-                        final_x = chain.iloc[-2].x
-                        final_y = chain.iloc[-2].y
-                    else:
-                        final_x = last_event.x
-                        final_y = last_event.y
-
-                    # Apply the filtering conditions
-                    if ((chain.iloc[0]['type.name'] == 'Pass') and 
-                        ("Regular Play" in chain["play_pattern.name"].values) and 
-                        (chain.iloc[0].x < 60.0) and 
-                        (final_x >= (chain.iloc[0].x + (120.0 - chain.iloc[0].x)/2)) and 
-                        ("Shot" in chain["type.name"].values)) or \
-                    ((chain.iloc[0]['type.name'] == 'Pass') and 
-                        ("Regular Play" in chain["play_pattern.name"].values) and 
-                        (chain.iloc[0].x < 60.0) and 
-                        (final_x >= (chain.iloc[0].x + (120.0 - chain.iloc[0].x)/2)) and 
-                        (final_x >= 102.0) and (18.0 < final_y < 62.0)):
-
-                        chains_att = pd.concat([chains_att, chain])  # Use pd.concat instead of .append()
-
-            except Exception as e:
-                pass  # Avoid breaking the loop on errors
-
-        
-        
-        
-        chains_data_normal.append(chains_normal)
-        chains_data_att.append(chains_att)
-
-        
-        
-    chains_data_normal = pd.concat(chains_data_normal)
-    chains_data_att = pd.concat(chains_data_att)
-        
-    team_possession_counts_normal = chains_data_normal.groupby(['possession_team.name', 'match_id'])['possession'].nunique().reset_index()
-    table = team_possession_counts_normal.groupby('possession_team.name')['possession'].sum().reset_index()
-    team_possession_counts_att = chains_data_att.groupby(['possession_team.name', 'match_id'])['possession'].nunique().reset_index()
-    table1 = team_possession_counts_att.groupby('possession_team.name')['possession'].sum().reset_index()
-    table1.rename(columns = {'possession': 'possesion_chain_att'}, inplace = True)
-
-    data = table.merge(table1, on='possession_team.name')
-    
-    data.rename(columns = {'possession': 'Buildup Attacks', 
-                       'possesion_chain_att': 'Direct Attacks'}, inplace = True)
-
-
-    data.rename(columns = {'possession_team.name': 'Team'}, inplace = True)
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
 
-    data = data[['Team', 'Direct Attacks']]
-
-    return data
-    
+    if chains is None:
+        chains = build_chain_summary(match_index.events)
 
+    return aggregate_buildup_and_direct_attacks(match_buildup_and_direct_attacks(match_index, chains))
@@ -1,98 +1,67 @@
 import pandas as pd
 
-def calculate_avg_pressure(df):
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
+
+def pressure_mask(match_index):
+    """Pressure events of a team while the other team has the ball, shared by the team and player stages."""
+    team_sides = match_index.event_sides('team.name')
+    possession_sides = match_index.event_sides('possession_team.name')
+
+    out_of_possession = (possession_sides >= 0) & (possession_sides != team_sides)
+    return match_index.event_mask('type.name', 'Pressure') & out_of_possession
+
+
+def match_pressure(match_index):
     """
-    Calculate Average Pressure per Possession for each team OOP.
+    Count the pressures of both teams while the opponent is in possession, in every match.
 
     Args:
-        df (pd.DataFrame): Processed J League events DataFrame.
-    
+        match_index (MatchIndex): Per-match partition of the normalized events.
+
     Returns:
-        pd.DataFrame: DataFrame with Average Pressure per Team.
+        pd.DataFrame: One row per match with home and away pressure counts.
+    """
+
+    pressure = pressure_mask(match_index)
+
+    away_possession_home_press, home_possession_away_press = match_index.event_totals(pressure)
+
+    return match_index.match_frame(
+        home_possession_away_pressure=home_possession_away_press,
+        away_possession_home_pressure=away_possession_home_press
+    )
+
+
+def match_player_pressure(match_index):
+    """
+    Count the pressures of every player while the opponent is in possession, in every match.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+
+    Returns:
+        pd.DataFrame: One row per match, team and player with the pressure count.
+    """
+
+    return match_index.player_frame(pressures=match_index.player_totals(pressure_mask(match_index)))
+
+
+def aggregate_pressure(pressure_data):
     """
+    Average match pressure counts into a team-level table.
 
+    Args:
+        pressure_data (pd.DataFrame): Output of ``match_pressure``.
 
-    # Fill missing values and replace None or NaN with "Complete"
-    df['pass.outcome.name'] = df['pass.outcome.name'].fillna("Complete").replace({None: "Complete"})
-
-    df_events = df.copy()
-
-    match_ids = df_events["match_id"].unique()
-
-    # Lists to store match-level statistics
-    home_team = []
-    away_team = []
-
-    home_possession_home_pressure = []
-    home_possession_away_pressure = []
-
-    away_possession_away_pressure = []
-    away_possession_home_pressure = []
-
-    week = []
-    match = []
-
-    for match_id in match_ids:
-        df_match = df_events[df_events["match_id"] == match_id]
-        
-        # Identify home and away teams for this match
-        home_team_name = df_match['home_team'].unique()[0]
-        away_team_name = df_match['away_team'].unique()[0]
-        
-        # Store team details
-        home_team.append(home_team_name)
-        away_team.append(away_team_name)
-        
-
-        ## --- PRESSURE EVENTS COUNT --- ##
-
-        # When home team is in possession
-        df_home_possession = df_match[df_match['possession_team.name'] == home_team_name]
-        
-        home_possession_home_press = df_home_possession[
-            (df_home_possession['type.name'] == "Pressure") & (df_home_possession['team.name'] == home_team_name)
-        ].shape[0]
-        
-        home_possession_away_press = df_home_possession[
-            (df_home_possession['type.name'] == "Pressure") & (df_home_possession['team.name'] == away_team_name)
-        ].shape[0]
-        
-        # When away team is in possession
-        df_away_possession = df_match[df_match['possession_team.name'] == away_team_name]
-        
-        away_possession_away_press = df_away_possession[
-            (df_away_possession['type.name'] == "Pressure") & (df_away_possession['team.name'] == away_team_name)
-        ].shape[0]
-        
-        away_possession_home_press = df_away_possession[
-            (df_away_possession['type.name'] == "Pressure") & (df_away_possession['team.name'] == home_team_name)
-        ].shape[0]
-
-        # Append computed values to respective lists
-        home_possession_home_pressure.append(home_possession_home_press)
-        home_possession_away_pressure.append(home_possession_away_press)
-        away_possession_away_pressure.append(away_possession_away_press)
-        away_possession_home_pressure.append(away_possession_home_press)
-        
-        week.append(df_match.match_week.unique()[0])
-        match.append(df_match.match_id.unique()[0])
-
-    # Create a DataFrame with structured data
-    pressure_data = pd.DataFrame({
-        "Match Week": week,
-        "Match ID": match,
-        "home_team": home_team,
-        "away_team": away_team,
-        "home_possession_home_pressure": home_possession_home_pressure,
-        "home_possession_away_pressure": home_possession_away_pressure,
-        "away_possession_away_pressure": away_possession_away_pressure,
-        "away_possession_home_pressure": away_possession_home_pressure
-    })
+    Returns:
+        pd.DataFrame: DataFrame with Average Pressure per Team.
+    """
 
     p_data = pressure_data[['home_team', 'away_team', 'home_possession_away_pressure', 'away_possession_home_pressure']]
 
-    p_data = p_data.rename(columns={ 
-                     'home_possession_away_pressure': 'Away Pressure', 
+    p_data = p_data.rename(columns={
+                     'home_possession_away_pressure': 'Away Pressure',
                      'away_possession_home_pressure': 'Home Pressure'})
 
 
@@ -112,3 +81,35 @@ def calculate_avg_pressure(df):
     return average_pressure
 
 
+def aggregate_player_pressure(player_df):
+    """
+    Average the match pressure counts of every player over the matches they played.
+
+    Args:
+        player_df (pd.DataFrame): Output of ``match_player_pressure``.
+
+    Returns:
+        pd.DataFrame: DataFrame with Average Pressure for each team and player.
+    """
+
+    average = player_df.groupby(['Team', 'Player'], sort=False)['pressures'].mean()
+
+    return average.round(2).rename('Pressure').reset_index()
+
+
+def calculate_avg_pressure(df, match_index=None):
+    """
+    Calculate Average Pressure per Possession for each team OOP.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+
+    Returns:
+        pd.DataFrame: DataFrame with Average Pressure per Team.
+    """
+
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
+
+    return aggregate_pressure(match_pressure(match_index))
@@ -0,0 +1,181 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import yaml
+
+from src.data_processing.preprocess_jleague import (
+    PartitionedWriter, compact_events, load_json, merge_events_matches, preprocess_events, preprocess_matches
+)
+from src.feature_engineering.engine import aggregate_team_metrics, compute_match_table
+from src.feature_engineering.pitch_grid import PitchGrid
+from src.feature_engineering.results_store import write_results
+
+# Keys of every run of the manifest
+RUN_KEYS = ['competition', 'season', 'events', 'matches']
+
+# Columns identifying the run of every output row
+RUN_COLUMNS = ['competition', 'season']
+
+
+def load_manifest(path):
+    """
+    Load and check a batch manifest.
+
+    The manifest is a YAML file with a ``runs`` list, one entry per competition
+    and season with the paths of its raw StatsBomb ``events`` and ``matches``
+    JSON files, and the output paths of the batch::
+
+        events_output: data/processed/events
+        metrics_output: data/processed/batch_metrics.arrow            # .arrow, .parquet or .xlsx
+        match_table_output: data/processed/batch_match_table.parquet  # optional
+        workers: 4                                                    # optional
+        pitch_grid: {x_bins: 6, y_bins: 4}                            # optional
+        runs:
+          - {competition: J1 League, season: '2023', events: ..., matches: ...}
+          - {competition: J1 League, season: '2024', events: ..., matches: ...}
+
+    Args:
+        path (str): Path of the manifest.
+
+    Returns:
+        dict: The manifest, with every season as a string.
+
+    Raises:
+        ValueError: If a run misses a key or a competition and season appears twice.
+    """
+
+    with open(path, "r") as file:
+        manifest = yaml.safe_load(file)
+
+    runs = manifest.get('runs') or []
+    if not runs:
+        raise ValueError(f"Manifest {path} has no runs.")
+
+    seen = set()
+    for run in runs:
+        missing = [key for key in RUN_KEYS if key not in run]
+        if missing:
+            raise ValueError(f"Manifest run {run} misses {', '.join(missing)}.")
+
+        run['season'] = str(run['season'])
+        key = (run['competition'], run['season'])
+        if key in seen:
+            raise ValueError(f"Manifest has {key[0]} {key[1]} more than once.")
+        seen.add(key)
+
+    return manifest
+
+
+def run_partition(events_output, competition, season):
+    """Directory of the events of one competition and season in the events dataset."""
+    return os.path.join(
+        events_output, f"competition={quote(competition, safe='')}", f"season={quote(season, safe='')}"
+    )
+
+
+def process_run(run, events_output, grid=None):
+    """
+    Preprocess the raw events of one competition and season and compute their metrics.
+
+    The events are written to their own competition / season partition of the
+    events dataset, replacing only that partition. The metrics are computed from
+    the events already in memory, the written partition is not read back.
+
+    Args:
+        run (dict): Manifest run with competition, season, events and matches.
+        events_output (str): Directory of the partitioned events dataset.
+        grid (PitchGrid, optional): Grid of the zone IDs, the default grid when not given.
+
+    Returns:
+        tuple: (match table, team metrics), both keyed by competition and season.
+    """
+
+    competition, season = run['competition'], run['season']
+
+    # The manifest names the competition and season, whatever the matches file says
+    matches_df = preprocess_matches(load_json(run['matches'])).drop(columns=RUN_COLUMNS, errors='ignore')
+    events_df = preprocess_events(load_json(run['events']), grid)
+    merged_df = compact_events(merge_events_matches(events_df, matches_df))
+
+    with PartitionedWriter(
+        run_partition(events_output, competition, season), pa.Schema.from_pandas(merged_df, preserve_index=False)
+    ) as writer:
+        writer.write(merged_df)
+
+    match_table = compute_match_table(merged_df)
+    team_metrics = aggregate_team_metrics(match_table)
+
+    for table in (match_table, team_metrics):
+        table.insert(0, 'competition', competition)
+        table.insert(1, 'season', season)
+
+    print(f"✅ {competition} {season}: {len(merged_df)} events, {len(match_table)} matches")
+    return match_table, team_metrics
+
+
+def run_batch(manifest, workers=1):
+    """
+    Process every run of a manifest, in parallel over ``workers`` processes.
+
+    Runs are independent: each worker preprocesses one competition and season,
+    writes its events partition and returns its match table and team metrics.
+    The parent concatenates the returned tables in manifest order, so the
+    consolidated outputs never reread the events.
+
+    Args:
+        manifest (dict): Output of ``load_manifest``.
+        workers (int): Number of worker processes.
+
+    Returns:
+        tuple: (match table, team metrics) of all runs, keyed by competition, season and match / team.
+    """
+
+    runs = manifest['runs']
+    events_output = manifest['events_output']
+    grid = PitchGrid(**manifest.get('pitch_grid', {}))
+
+    if workers > 1 and len(runs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(runs))) as executor:
+            results = list(executor.map(process_run, runs, [events_output] * len(runs), [grid] * len(runs)))
+    else:
+        results = [process_run(run, events_output, grid) for run in runs]
+
+    match_table = pd.concat([run_match_table for run_match_table, _ in results], ignore_index=True)
+    team_metrics = pd.concat([run_team_metrics for _, run_team_metrics in results], ignore_index=True)
+
+    return match_table, team_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocess and compute the team metrics of many competitions and seasons.")
+    parser.add_argument("manifest", help="YAML manifest of the competitions and seasons to process.")
+    parser.add_argument("--workers", type=int,
+                        help="Number of worker processes the runs are spread over. Defaults to workers in the manifest, or 1.")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    workers = args.workers or manifest.get('workers', 1)
+    if workers < 1:
+        parser.error("--workers must be at least 1")
+
+    print(f"🚀 Processing {len(manifest['runs'])} competition seasons with {workers} worker(s)...")
+
+    match_table, team_metrics = run_batch(manifest, workers)
+
+    # One consolidated table, keyed by competition, season and team
+    runs = [{key: run[key] for key in RUN_COLUMNS} for run in manifest['runs']]
+    output_file = manifest.get('metrics_output', "data/processed/batch_metrics.arrow")
+    write_results(team_metrics, output_file, {'table': 'team_metrics', 'runs': runs})
+    print(f"✅ All metrics saved to {output_file}")
+
+    if manifest.get('match_table_output'):
+        write_results(match_table, manifest['match_table_output'], {'table': 'match_table', 'runs': runs})
+        print(f"✅ Match table saved to {manifest['match_table_output']}")
+
+
+if __name__ == "__main__":
+    main()
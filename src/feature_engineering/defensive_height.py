@@ -1,77 +1,90 @@
 import pandas as pd
 import numpy as np
 
-def calculate_avg_defensive_height(df):
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
+
+def player_action_heights(match_index):
     """
-    Calculate Average Defensive Height for each team.
+    Median x of the defensive actions of every player in every match, shared by the team and player stages.
 
-    Defensive Height is the average vertical position of defensive actions (tackles, interceptions, fouls).
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+
+    Returns:
+        pd.Series: Median x indexed by match position, side and player name.
+    """
+
+    events = match_index.events
+
+    sides = match_index.event_sides('team.name')
+    defensive_actions = events['defensive_action'].to_numpy() & (sides >= 0)
+
+    actions = pd.DataFrame({
+        'match': match_index.event_positions[defensive_actions],
+        'side': sides[defensive_actions],
+        'player.name': events['player.name'].array[defensive_actions],
+        'x': events['x'].to_numpy(dtype=float)[defensive_actions]
+    })
+
+    return actions.groupby(['match', 'side', 'player.name'], observed=True)['x'].median()
+
+
+def match_defensive_height(match_index):
+    """
+    Calculate the Defensive Height of both teams in every match.
+
+    The median x of each player's defensive actions is averaged over the players of the team.
 
     Args:
-        df (pd.DataFrame): Processed J League events DataFrame.
-    
+        match_index (MatchIndex): Per-match partition of the normalized events.
+
     Returns:
-        pd.DataFrame: DataFrame with Average Defensive Height for each team.
+        pd.DataFrame: One row per match with home and away Defensive Height.
+    """
+
+    average_locations_player = player_action_heights(match_index)
+    height = average_locations_player.groupby(level=['match', 'side']).mean()
+
+    heights = np.full((len(match_index), 2), np.nan)
+    heights[height.index.get_level_values('match'), height.index.get_level_values('side')] = height.to_numpy()
+
+    return match_index.match_frame(
+        home_height=heights[:, MatchIndex.HOME],
+        away_height=heights[:, MatchIndex.AWAY]
+    )
+
+
+def match_player_defensive_height(match_index):
+    """
+    Calculate the Defensive Height of every player in every match: the median x of their defensive actions.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+
+    Returns:
+        pd.DataFrame: One row per match, team and player with the Defensive Height (NaN without defensive actions).
+    """
+
+    _, groups = match_index.player_groups()
+    heights = player_action_heights(match_index)
+
+    found = heights.index.get_indexer(pd.MultiIndex.from_arrays([groups['match'], groups['side'], groups['player']]))
+    height = np.where(found >= 0, heights.to_numpy()[found], np.nan)
+
+    return match_index.player_frame(height=height)
+
+
+def aggregate_defensive_height(ppda):
     """
+    Average match Defensive Height into a team-level table.
+
+    Args:
+        ppda (pd.DataFrame): Output of ``match_defensive_height``.
 
-    # Fill missing values and replace None or NaN with "Complete"
-    df['pass.outcome.name'] = df['pass.outcome.name'].fillna("Complete").replace({None: "Complete"})
-
-    df_events = df.copy()
-
-    match_ids = df_events["match_id"].unique()
-
-    home_team = []
-    away_team = []
-
-    home_height = []
-    away_height = []
-
-
-    ppda = pd.DataFrame()
-
-    for match_id in match_ids:
-        df_match = df_events[df_events["match_id"] == match_id]
-        
-        
-        # Identify home and away teams from the match dataset
-        home_team_name = df_match['home_team'].unique()[0]
-        away_team_name = df_match['away_team'].unique()[0]
-        
-        
-        team_H = df_match.loc[df_match['team.name'] == home_team_name]
-        team_A = df_match.loc[df_match['team.name'] == away_team_name]
-        
-        team1_defensive_actions_H = pd.concat([
-            team_H.loc[team_H['type.name'].isin(['Interception', 'Foul Committed', 'Block'])],
-            team_H.loc[team_H['duel.type.name'] == "Tackle"]
-        ]).drop_duplicates().reset_index(drop=True)
-
-
-        team2_defensive_actions_A = pd.concat([
-            team_A.loc[team_A['type.name'].isin(['Interception', 'Foul Committed', 'Block'])],
-            team_A.loc[team_A['duel.type.name'] == "Tackle"]
-        ]).drop_duplicates().reset_index(drop=True)
-        
-        average_locations_player_home = team1_defensive_actions_H.groupby('player.name').agg({'x':['median'],'y':['mean','count']})
-        average_locations_player_home.columns = ['x', 'y', 'count']
-        
-        average_locations_player_away = team2_defensive_actions_A.groupby('player.name').agg({'x':['median'],'y':['mean','count']})
-        average_locations_player_away.columns = ['x', 'y', 'count']
-        
-        
-        home_height.append(average_locations_player_home['x'].mean())
-        away_height.append(average_locations_player_away['x'].mean())
-        
-        
-        home_team.append(home_team_name)
-        away_team.append(away_team_name)
-        
-    ppda['home_team'] = home_team
-    ppda['away_team'] = away_team
-
-    ppda['home_height'] = home_height
-    ppda['away_height'] = away_height
+    Returns:
+        pd.DataFrame: DataFrame with Average Defensive Height for each team.
+    """
 
     home_data = ppda[['home_team', 'home_height']].copy()
     home_data.rename(columns = {'home_team': 'Team', 'home_height': 'Def Height'}, inplace = True)
@@ -89,5 +102,38 @@ def calculate_avg_defensive_height(df):
 
     return average_def
 
-    
-    
+
+def aggregate_player_defensive_height(player_df):
+    """
+    Average the match Defensive Height of every player over the matches with defensive actions.
+
+    Args:
+        player_df (pd.DataFrame): Output of ``match_player_defensive_height``.
+
+    Returns:
+        pd.DataFrame: DataFrame with Average Defensive Height for each team and player.
+    """
+
+    average = player_df.groupby(['Team', 'Player'], sort=False)['height'].mean()
+
+    return average.round(3).rename('Def Height').reset_index()
+
+
+def calculate_avg_defensive_height(df, match_index=None):
+    """
+    Calculate Average Defensive Height for each team.
+
+    Defensive Height is the average vertical position of defensive actions (tackles, interceptions, fouls).
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+
+    Returns:
+        pd.DataFrame: DataFrame with Average Defensive Height for each team.
+    """
+
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
+
+    return aggregate_defensive_height(match_defensive_height(match_index))
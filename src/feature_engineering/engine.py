@@ -0,0 +1,597 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering.arrow_backend import ArrowMatchIndex, normalize_table
+from src.feature_engineering.event_store import load_event_table, load_events, store_columns
+from src.feature_engineering.instrumentation import profiled
+from src.feature_engineering.match_cache import match_hashes
+from src.feature_engineering.match_index import MATCH_INDEX_COLUMNS, MatchIndex
+from src.feature_engineering.normalize import normalize_events, source_columns
+from src.feature_engineering.possession_chains import build_chain_summary, chain_offsets
+from src.feature_engineering.zones import ZONE_FAMILIES, zone_totals
+
+from src.feature_engineering.possession import match_possession, aggregate_possession, calculate_possession
+from src.feature_engineering.ppda import match_ppda, aggregate_ppda, calculate_ppda
+from src.feature_engineering.field_tilt import (
+    match_field_tilt, aggregate_field_tilt, calculate_field_tilt, match_player_field_tilt, aggregate_player_field_tilt
+)
+from src.feature_engineering.maintain_buildup_sustain import (
+    match_maintain_buildup_sustain, aggregate_maintain_buildup_sustain, calculate_maintain_buildup_sustain
+)
+from src.feature_engineering.speed_metrics import match_speed_metrics, aggregate_speed_metrics, calculate_speed_metrics
+from src.feature_engineering.passes_per_sequence import (
+    match_passes_per_sequence, aggregate_passes_per_sequence, calculate_avg_passes_per_sequence,
+    match_player_passes_per_sequence, aggregate_player_passes_per_sequence
+)
+from src.feature_engineering.attacking_passes_per_sequence import (
+    match_attacking_passes_per_sequence,
+    aggregate_attacking_passes_per_sequence,
+    calculate_avg_attacking_passes_per_sequence
+)
+from src.feature_engineering.verticality import (
+    match_verticality, aggregate_verticality, calculate_avg_verticality,
+    match_player_verticality, aggregate_player_verticality
+)
+from src.feature_engineering.defensive_height import (
+    match_defensive_height, aggregate_defensive_height, calculate_avg_defensive_height,
+    match_player_defensive_height, aggregate_player_defensive_height
+)
+from src.feature_engineering.average_pressure import (
+    match_pressure, aggregate_pressure, calculate_avg_pressure, match_player_pressure, aggregate_player_pressure
+)
+from src.feature_engineering.attacks import (
+    match_buildup_and_direct_attacks, aggregate_buildup_and_direct_attacks, calculate_buildup_and_direct_attacks
+)
+from src.feature_engineering.attacks_under_10_passes import (
+    match_buildup_and_direct_attacks_under_10_passes,
+    aggregate_buildup_and_direct_attacks_under_10_passes,
+    calculate_buildup_and_direct_attacks_under_10_passes
+)
+
+# An intermediate shared by the match stages, built once per run:
+# - name: key the match stages ask for,
+# - build: function of the match index and the shared inputs built before it,
+# - inputs: shared inputs it is built from,
+# - columns: event (or normalized) columns it reads.
+SharedInput = namedtuple('SharedInput', ['name', 'build', 'inputs', 'columns'])
+
+
+def _build_offsets(match_index, shared):
+    return chain_offsets(match_index.events)
+
+
+def _build_chains(match_index, shared):
+    return build_chain_summary(match_index.events, offsets=shared['offsets'])
+
+
+def _build_zones(match_index, shared):
+    return zone_totals(match_index, ZONE_FAMILIES)
+
+
+# Shared inputs in build order, every input after the inputs it is built from
+SHARED_INPUTS = [
+    SharedInput('offsets', _build_offsets, (), ['match_id', 'possession', 'possession_team.name']),
+    SharedInput('chains', _build_chains, ('offsets',), ['type.name', 'x', 'y', 'region', 'play_pattern.name']),
+    SharedInput(
+        'zones', _build_zones, (),
+        ['type.name', 'x', 'y', 'pass_end_x', 'pass_end_y', 'region', 'end_region']
+        + [family.side_column for family in ZONE_FAMILIES]
+        + [family.weight for family in ZONE_FAMILIES if family.weight is not None]
+    ),
+]
+
+# A registered team metric:
+# - name: metric name, as selected with ``run-metrics --only``,
+# - match_stage: match-level stage, called with the match index and its shared inputs,
+# - aggregate: team-level aggregation of the match table,
+# - calculate: standalone calculate_* function (the 'separate' engine),
+# - inputs: shared inputs of the match stage (``SHARED_INPUTS`` names),
+# - columns: event (or normalized) columns the match stage reads besides its shared inputs,
+# - outputs: columns of the metric in the team metrics table,
+# - version: bump when the match stage changes, so its cached match results are recomputed.
+TeamMetric = namedtuple(
+    'TeamMetric', ['name', 'match_stage', 'aggregate', 'calculate', 'inputs', 'columns', 'outputs', 'version']
+)
+
+# Registered team metrics, in the column order of the final metrics table
+TEAM_METRICS = [
+    TeamMetric('possession', match_possession, aggregate_possession, calculate_possession,
+               (), ['type.name', 'team.name'], ['Possession'], 1),
+    TeamMetric('ppda', match_ppda, aggregate_ppda, calculate_ppda,
+               (), ['type.name', 'team.name', 'region', 'pass_complete', 'defensive_action'], ['PPDA'], 1),
+    TeamMetric('field_tilt', match_field_tilt, aggregate_field_tilt, calculate_field_tilt,
+               ('zones',), [], ['Field_tilt'], 1),
+    TeamMetric('maintain_buildup_sustain', match_maintain_buildup_sustain, aggregate_maintain_buildup_sustain,
+               calculate_maintain_buildup_sustain, ('zones',), [], ['Maintain (%)', 'Buildup (%)', 'Sustain (%)'], 1),
+    TeamMetric('speed_metrics', match_speed_metrics, aggregate_speed_metrics, calculate_speed_metrics,
+               ('offsets',), ['minute', 'second', 'timestamp', 'x', 'y'], ['Direct Speed Upfield(m/s)', 'Speed'], 2),
+    TeamMetric('passes_per_sequence', match_passes_per_sequence, aggregate_passes_per_sequence,
+               calculate_avg_passes_per_sequence, ('chains',), ['type.name', 'possession_team.name'],
+               ['Passes_per_sequence'], 1),
+    TeamMetric('attacking_passes_per_sequence', match_attacking_passes_per_sequence,
+               aggregate_attacking_passes_per_sequence, calculate_avg_attacking_passes_per_sequence,
+               ('chains',), [], ['Att. Passes_per_sequence'], 1),
+    TeamMetric('verticality', match_verticality, aggregate_verticality, calculate_avg_verticality,
+               (), ['type.name', 'team.name', 'pass_complete', 'x', 'y', 'pass_end_x', 'pass_end_y'],
+               ['average_verticality'], 1),
+    TeamMetric('defensive_height', match_defensive_height, aggregate_defensive_height, calculate_avg_defensive_height,
+               (), ['team.name', 'player.name', 'defensive_action', 'x'], ['Def Height'], 1),
+    TeamMetric('average_pressure', match_pressure, aggregate_pressure, calculate_avg_pressure,
+               (), ['type.name', 'team.name', 'possession_team.name'], ['Pressure'], 1),
+    TeamMetric('attacks', match_buildup_and_direct_attacks, aggregate_buildup_and_direct_attacks,
+               calculate_buildup_and_direct_attacks, ('chains',), [], ['Direct Attacks'], 1),
+    TeamMetric('attacks_under_10_passes', match_buildup_and_direct_attacks_under_10_passes,
+               aggregate_buildup_and_direct_attacks_under_10_passes,
+               calculate_buildup_and_direct_attacks_under_10_passes,
+               ('chains',), [], ['Buildup Attacks', 'Direct Attacks_10'], 1),
+]
+
+
+# Event columns of the (match, team, player) key of the player stages
+PLAYER_KEY_COLUMNS = ['team.name', 'player.name']
+
+# The player-level counterpart of a team metric, computed in the same run on the same match index:
+# - name: name of the ``TeamMetric`` it extends, selected with it,
+# - match_stage: stage called with the match index, one row per match, team and player
+#   (``MatchIndex.player_frame``), grouped by the cached ``MatchIndex.player_groups``,
+# - aggregate: player-level aggregation of the player match table,
+# - columns: event (or normalized) columns the stage reads besides ``PLAYER_KEY_COLUMNS``,
+# - outputs: columns of the metric in the player metrics table.
+PlayerMetric = namedtuple('PlayerMetric', ['name', 'match_stage', 'aggregate', 'columns', 'outputs'])
+
+# Registered player metrics, in the column order of the player metrics table
+PLAYER_METRICS = [
+    PlayerMetric('field_tilt', match_player_field_tilt, aggregate_player_field_tilt,
+                 ['type.name', 'x', 'y', 'pass_end_x', 'pass_end_y', 'region', 'end_region'], ['Att. Third Passes']),
+    PlayerMetric('passes_per_sequence', match_player_passes_per_sequence, aggregate_player_passes_per_sequence,
+                 ['type.name', 'possession_team.name', 'possession'], ['Passes_per_sequence']),
+    PlayerMetric('verticality', match_player_verticality, aggregate_player_verticality,
+                 ['type.name', 'pass_complete', 'x', 'y', 'pass_end_x', 'pass_end_y'], ['average_verticality']),
+    PlayerMetric('defensive_height', match_player_defensive_height, aggregate_player_defensive_height,
+                 ['defensive_action', 'x'], ['Def Height']),
+    PlayerMetric('average_pressure', match_player_pressure, aggregate_player_pressure,
+                 ['type.name', 'possession_team.name'], ['Pressure']),
+]
+
+
+def select_metrics(names=None):
+    """
+    Registered metrics to compute, in registry order.
+
+    Args:
+        names (list, optional): Metric names, all registered metrics when None.
+
+    Returns:
+        list: ``TeamMetric`` entries.
+
+    Raises:
+        ValueError: If a name is not a registered metric.
+    """
+
+    if names is None:
+        return list(TEAM_METRICS)
+
+    unknown = sorted(set(names) - {metric.name for metric in TEAM_METRICS})
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown)}.")
+    return [metric for metric in TEAM_METRICS if metric.name in names]
+
+
+def player_metrics(metrics):
+    """Registered player metrics of the selected ``TeamMetric`` entries, in registry order."""
+    names = {metric.name for metric in metrics}
+    return [metric for metric in PLAYER_METRICS if metric.name in names]
+
+
+def required_inputs(metrics):
+    """Shared inputs the match stages of ``metrics`` depend on, with their own inputs, in build order."""
+    needed = {name for metric in metrics for name in metric.inputs}
+    for shared_input in reversed(SHARED_INPUTS):
+        if shared_input.name in needed:
+            needed.update(shared_input.inputs)
+    return [shared_input for shared_input in SHARED_INPUTS if shared_input.name in needed]
+
+
+def metric_columns(metric):
+    """Event (and normalized) columns read by a metric: the match index keys, its shared inputs and its stage."""
+    columns = list(MATCH_INDEX_COLUMNS)
+    for shared_input in required_inputs([metric]):
+        columns.extend(shared_input.columns)
+    columns.extend(metric.columns)
+    return list(dict.fromkeys(columns))
+
+
+def required_columns(metrics, stored=None, players=False):
+    """
+    Event columns to load for ``metrics``: the union of their columns, normalized columns resolved to their sources.
+
+    Args:
+        metrics (list): ``TeamMetric`` entries, e.g. from ``select_metrics``.
+        stored (list, optional): Columns of the events store (see ``normalize.source_columns``).
+        players (bool): Also load the columns of their player metrics.
+
+    Returns:
+        list: Event columns, in ``EVENT_COLUMNS`` order.
+    """
+
+    columns = [column for metric in metrics for column in metric_columns(metric)]
+    if players:
+        columns += PLAYER_KEY_COLUMNS + [column for metric in player_metrics(metrics) for column in metric.columns]
+    return source_columns(columns, stored)
+
+
+def _shared_inputs(match_index, metrics):
+    """Build the shared inputs of ``metrics`` (chain offsets, chain summary, zone totals), each one once."""
+    shared = {}
+    for shared_input in required_inputs(metrics):
+        shared[shared_input.name] = shared_input.build(match_index, shared)
+    return shared
+
+
+def _build_cached_match_tables(match_index, cache, metrics, profiler=None):
+    """
+    Run the match stages only for the matches missing from the cache.
+
+    Every metric is looked up with the hash of the (normalized) event columns it
+    reads, so runs of a few metrics share the cached rows of full runs; the missing matches of all metrics get one shared sub-index; the fresh rows
+    are added to the cache and combined with the cached rows in index order.
+    """
+
+    with profiled(profiler, 'cache_lookup', rows_in=len(match_index)) as stage:
+        hashes = match_hashes(match_index, [metric_columns(metric) for metric in metrics])
+
+        lookups = [
+            cache.lookup(metric.name, metric.version, match_index.match_ids, metric_hashes)
+            for metric, metric_hashes in zip(metrics, hashes)
+        ]
+        missing = np.zeros(len(match_index), dtype=bool)
+        for _, hit in lookups:
+            missing |= ~hit
+        stage.rows(int(missing.sum()))
+
+    if missing.any():
+        missing_index = MatchIndex(match_index.events.loc[missing[match_index.event_positions]])
+        missing_metrics = [metric for metric, (_, hit) in zip(metrics, lookups) if not hit.all()]
+        with profiled(profiler, 'shared_inputs', rows_in=len(missing_index.events)):
+            shared = _shared_inputs(missing_index, missing_metrics)
+
+    match_tables = []
+    for metric, metric_hashes, (rows, hit) in zip(metrics, hashes, lookups):
+        if hit.all():
+            match_tables.append(rows)
+            continue
+
+        with profiled(profiler, 'match_stage', metric.name, len(missing_index.events)) as stage:
+            fresh = metric.match_stage(missing_index, *[shared[input_name] for input_name in metric.inputs])
+            stage.rows(len(fresh))
+        fresh = fresh.loc[~hit[missing]]
+        cache.add(metric.name, metric.version, fresh, metric_hashes[~hit])
+
+        # Cached and fresh rows back in index order
+        match_table = pd.concat([rows, fresh], ignore_index=True).set_index('Match ID')
+        match_tables.append(match_table.loc[match_index.match_ids].reset_index())
+
+    return match_tables
+
+
+def build_player_match_table(match_index, profiler=None, metrics=None):
+    """
+    Run the player stage of every selected metric on the match index of the team stages.
+
+    The player stages read the same normalized columns as the team stages, with
+    the masks and team sides the match index has cached, and group them by the
+    (match, side, player) key of ``MatchIndex.player_groups``, built once for all
+    of them; no events are loaded or normalized again.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+        profiler (Profiler, optional): Records every player stage.
+        metrics (list, optional): Names of the metrics to compute, all registered metrics when None.
+
+    Returns:
+        pd.DataFrame: One row per match, team and player with the partial results of every selected player metric.
+    """
+
+    player_tables = [match_index.player_frame()]
+    for metric in player_metrics(select_metrics(metrics)):
+        with profiled(profiler, 'player_stage', metric.name, len(match_index.events)) as stage:
+            player_tables.append(metric.match_stage(match_index))
+            stage.rows(len(player_tables[-1]))
+
+    player_table = pd.concat(player_tables, axis=1)
+    return player_table.loc[:, ~player_table.columns.duplicated()]
+
+
+def build_match_table(match_index, cache=None, profiler=None, metrics=None, players=False):
+    """
+    Run the match-level stage of every selected metric on shared inputs.
+
+    The normalized events, the per-match partition and the shared inputs the
+    selected metrics need are built once and reused by every stage. With a
+    ``cache``, matches whose events and metric version are unchanged are taken
+    from the cache and only the other matches are computed. With ``players``, the
+    player stages run on the same match index (``build_player_match_table``);
+    they are not cached.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+        cache (MatchCache, optional): Per-match result cache.
+        profiler (Profiler, optional): Records the shared inputs and every match stage.
+        metrics (list, optional): Names of the metrics to compute, all registered metrics when None.
+        players (bool): Also build the player match table.
+
+    Returns:
+        pd.DataFrame: One row per match with the partial results of every selected metric,
+        or a tuple of it and the player match table with ``players``.
+    """
+
+    metrics = select_metrics(metrics)
+
+    if cache is not None:
+        match_tables = _build_cached_match_tables(match_index, cache, metrics, profiler)
+    else:
+        with profiled(profiler, 'shared_inputs', rows_in=len(match_index.events)):
+            shared = _shared_inputs(match_index, metrics)
+
+        match_tables = []
+        for metric in metrics:
+            with profiled(profiler, 'match_stage', metric.name, len(match_index.events)) as stage:
+                match_tables.append(metric.match_stage(match_index, *[shared[input_name] for input_name in metric.inputs]))
+                stage.rows(len(match_tables[-1]))
+
+    with profiled(profiler, 'match_table', rows_in=len(match_index)) as stage:
+        match_table = pd.concat(match_tables, axis=1)
+        match_table = match_table.loc[:, ~match_table.columns.duplicated()]
+        stage.rows(len(match_table))
+
+    if players:
+        return match_table, build_player_match_table(match_index, profiler, [metric.name for metric in metrics])
+    return match_table
+
+
+def aggregate_team_metrics(match_table, profiler=None, metrics=None):
+    """
+    Reduce the match table to the team-level metrics table.
+
+    Args:
+        match_table (pd.DataFrame): Output of ``build_match_table``.
+        profiler (Profiler, optional): Records every aggregation and the merge.
+        metrics (list, optional): Names of the metrics to aggregate (all computed in
+            ``match_table``), all registered metrics when None.
+
+    Returns:
+        pd.DataFrame: One row per team with every selected metric.
+    """
+
+    team_tables = []
+    for metric in select_metrics(metrics):
+        with profiled(profiler, 'aggregate', metric.name, len(match_table)) as stage:
+            team_tables.append(metric.aggregate(match_table))
+            stage.rows(len(team_tables[-1]))
+
+    # Merge all metrics into a single DataFrame
+    with profiled(profiler, 'merge', rows_in=sum(len(team_table) for team_table in team_tables)) as stage:
+        metrics_df = team_tables[0]
+        for team_table in team_tables[1:]:
+            metrics_df = metrics_df.merge(team_table, on='Team', how='left')
+        stage.rows(len(metrics_df))
+
+    return metrics_df
+
+
+def aggregate_player_metrics(player_table, profiler=None, metrics=None):
+    """
+    Reduce the player match table to the player-level metrics table.
+
+    Args:
+        player_table (pd.DataFrame): Output of ``build_player_match_table``.
+        profiler (Profiler, optional): Records every aggregation and the merge.
+        metrics (list, optional): Names of the metrics to aggregate, all registered metrics when None.
+
+    Returns:
+        pd.DataFrame: One row per team and player with the matches played and every selected player metric.
+    """
+
+    player_tables = [player_table.groupby(['Team', 'Player'], sort=False).size().rename('Matches').reset_index()]
+    for metric in player_metrics(select_metrics(metrics)):
+        with profiled(profiler, 'player_aggregate', metric.name, len(player_table)) as stage:
+            player_tables.append(metric.aggregate(player_table))
+            stage.rows(len(player_tables[-1]))
+
+    with profiled(profiler, 'player_merge', rows_in=sum(len(table) for table in player_tables)) as stage:
+        players_df = player_tables[0]
+        for table in player_tables[1:]:
+            players_df = players_df.merge(table, on=['Team', 'Player'], how='left')
+        stage.rows(len(players_df))
+
+    return players_df
+
+
+def compute_match_table(df, cache=None, profiler=None, metrics=None, players=False):
+    """
+    Build the match table of the selected metrics in a single pass over the events.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame, with at least the
+            ``required_columns`` of the selected metrics.
+        cache (MatchCache, optional): Per-match result cache, saved after the run.
+        profiler (Profiler, optional): Records the normalization and every match stage.
+        metrics (list, optional): Names of the metrics to compute, all registered metrics when None.
+        players (bool): Also build the player match table, from the same match index.
+
+    Returns:
+        pd.DataFrame: One row per match with the partial results of every selected metric,
+        or a tuple of it and the player match table with ``players``.
+    """
+
+    with profiled(profiler, 'normalize', rows_in=len(df)) as stage:
+        match_index = MatchIndex(normalize_events(df))
+        stage.rows(len(match_index.events))
+
+    match_table = build_match_table(match_index, cache, profiler, metrics, players)
+
+    if cache is not None:
+        with profiled(profiler, 'cache_save'):
+            cache.save()
+
+    return match_table
+
+
+def compute_match_table_arrow(table, profiler=None, metrics=None, players=False):
+    """
+    Build the match table of the selected metrics from a pyarrow Table, without pandas events.
+
+    The Arrow backend runs the same match stages as ``compute_match_table`` on an
+    ``ArrowMatchIndex``: filters and key comparisons use ``pyarrow.compute`` on the
+    dictionary-encoded columns and numeric columns are read as zero-copy NumPy
+    views, so the results are the same as the pandas path.
+
+    Args:
+        table (pa.Table): Processed J League events, e.g. from ``load_event_table``.
+        profiler (Profiler, optional): Records the normalization and every match stage.
+        metrics (list, optional): Names of the metrics to compute, all registered metrics when None.
+        players (bool): Also build the player match table, from the same match index.
+
+    Returns:
+        pd.DataFrame: One row per match with the partial results of every selected metric,
+        or a tuple of it and the player match table with ``players``.
+    """
+
+    with profiled(profiler, 'normalize', rows_in=table.num_rows) as stage:
+        match_index = ArrowMatchIndex(normalize_table(table))
+        stage.rows(len(match_index.events))
+
+    return build_match_table(match_index, profiler=profiler, metrics=metrics, players=players)
+
+
+def compute_team_metrics(df, cache=None, profiler=None, metrics=None):
+    """
+    Compute the selected team metrics in a single pass over the events.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        cache (MatchCache, optional): Per-match result cache, saved after the run.
+        profiler (Profiler, optional): Records every stage of the run.
+        metrics (list, optional): Names of the metrics to compute, all registered metrics when None.
+
+    Returns:
+        pd.DataFrame: One row per team with every selected metric.
+    """
+
+    return aggregate_team_metrics(compute_match_table(df, cache, profiler, metrics), profiler, metrics)
+
+
+def _build_shard_match_table(input_parquet, match_ids, cache=None, profiler=None, backend='pandas', metrics=None,
+                             players=False):
+    """Read the columns of the selected metrics for one shard of matches and build its match table (and player table)."""
+    columns = required_columns(select_metrics(metrics), store_columns(input_parquet), players)
+
+    if backend == 'arrow':
+        with profiled(profiler, 'load') as stage:
+            table = load_event_table(input_parquet, columns=columns, match_ids=match_ids)
+            stage.rows(table.num_rows)
+
+        match_table = compute_match_table_arrow(table, profiler, metrics, players)
+    else:
+        with profiled(profiler, 'load') as stage:
+            df = load_events(input_parquet, columns=columns, match_ids=match_ids)
+            stage.rows(len(df))
+
+        with profiled(profiler, 'normalize', rows_in=len(df)) as stage:
+            match_index = MatchIndex(normalize_events(df))
+            stage.rows(len(match_index.events))
+
+        match_table = build_match_table(match_index, cache, profiler, metrics, players)
+
+    # Stage records of the worker, sent back to the parent profiler
+    return match_table, cache, None if profiler is None else profiler.records
+
+
+def compute_match_table_parallel(input_parquet, workers, match_weeks=None, teams=None, cache=None, profiler=None,
+                                 backend='pandas', metrics=None, players=False):
+    """
+    Build the match table of the selected metrics with the matches sharded over worker processes.
+
+    Each worker reads only its own matches, and only the columns of the selected
+    metrics, from the events store and returns their match table; the parent
+    concatenates the shards in match order, so the result is the same as
+    ``compute_match_table``. With a ``cache``, workers only read it; their new
+    match results are merged and saved by the parent. With a ``profiler``, the
+    stages of every worker are merged into it, tagged with the worker number. With
+    ``backend='arrow'`` the workers build their match tables with
+    ``compute_match_table_arrow`` (no cache).
+
+    Args:
+        input_parquet (str): Path of the processed events Parquet file or dataset.
+        workers (int): Number of worker processes.
+        match_weeks (list, optional): Match weeks to include.
+        teams (list, optional): Teams whose matches are included.
+        cache (MatchCache, optional): Per-match result cache, saved after the run.
+        profiler (Profiler, optional): Records the sharding and the stages of every worker.
+        backend (str): 'pandas' or 'arrow'.
+        metrics (list, optional): Names of the metrics to compute, all registered metrics when None.
+        players (bool): Also build the player match table, in the same workers.
+
+    Returns:
+        pd.DataFrame: One row per match with the partial results of every selected metric,
+        or a tuple of it and the player match table with ``players``.
+    """
+
+    # Matches in order of first appearance, split into contiguous shards
+    match_ids = load_events(input_parquet, columns=['match_id'], match_weeks=match_weeks, teams=teams)['match_id'].unique()
+    shards = [shard.tolist() for shard in np.array_split(match_ids, workers) if len(shard)]
+
+    with profiled(profiler, 'workers', rows_in=len(match_ids)) as stage:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                _build_shard_match_table, [input_parquet] * len(shards), shards, [cache] * len(shards),
+                [profiler] * len(shards), [backend] * len(shards), [metrics] * len(shards), [players] * len(shards)
+            ))
+
+        if players:
+            match_table = pd.concat([shard_tables[0] for shard_tables, _, _ in results], ignore_index=True)
+            player_table = pd.concat([shard_tables[1] for shard_tables, _, _ in results], ignore_index=True)
+        else:
+            match_table = pd.concat([shard_table for shard_table, _, _ in results], ignore_index=True)
+        stage.rows(len(match_table))
+
+    if profiler is not None:
+        for worker, (_, _, records) in enumerate(results):
+            profiler.merge(records, worker)
+
+    if cache is not None:
+        for _, shard_cache, _ in results:
+            cache.merge(shard_cache)
+        with profiled(profiler, 'cache_save'):
+            cache.save()
+
+    if players:
+        return match_table, player_table
+    return match_table
+
+
+def compute_team_metrics_parallel(input_parquet, workers, match_weeks=None, teams=None, cache=None, profiler=None,
+                                  metrics=None):
+    """
+    Compute the selected team metrics with the matches sharded over worker processes.
+
+    Args:
+        input_parquet (str): Path of the processed events Parquet file or dataset.
+        workers (int): Number of worker processes.
+        match_weeks (list, optional): Match weeks to include.
+        teams (list, optional): Teams whose matches are included.
+        cache (MatchCache, optional): Per-match result cache, saved after the run.
+        profiler (Profiler, optional): Records every stage of the run.
+        metrics (list, optional): Names of the metrics to compute, all registered metrics when None.
+
+    Returns:
+        pd.DataFrame: One row per team with every selected metric.
+    """
+
+    return aggregate_team_metrics(
+        compute_match_table_parallel(input_parquet, workers, match_weeks, teams, cache, profiler, metrics=metrics),
+        profiler, metrics
+    )
@@ -0,0 +1,81 @@
+from functools import reduce
+import operator
+
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+
+def event_filter(match_weeks=None, teams=None, match_ids=None):
+    """
+    Build the pyarrow filter expression selecting matches of the events store.
+
+    Args:
+        match_weeks (list, optional): Match weeks to keep.
+        teams (list, optional): Teams to keep, a match is kept if either side is in ``teams``.
+        match_ids (list, optional): Match ids to keep.
+
+    Returns:
+        pyarrow.compute.Expression or None: Conjunction of the given filters, None if there are none.
+    """
+
+    filters = []
+    if match_weeks is not None:
+        filters.append(pc.field('match_week').isin(list(match_weeks)))
+    if teams is not None:
+        teams = list(teams)
+        filters.append(pc.field('home_team').isin(teams) | pc.field('away_team').isin(teams))
+    if match_ids is not None:
+        filters.append(pc.field('match_id').isin(list(match_ids)))
+
+    if not filters:
+        return None
+    return reduce(operator.and_, filters)
+
+
+def store_columns(path):
+    """Columns of the events store (a Parquet file or a partitioned dataset), read from its schema only."""
+    return ds.dataset(path, format='parquet', partitioning='hive').schema.names
+
+
+def load_event_table(path, columns=None, match_weeks=None, teams=None, match_ids=None):
+    """
+    Load processed events as a pyarrow Table, reading only the requested columns and matches.
+
+    See ``load_events``; the Arrow backend of the metrics engine reads the table
+    directly, without converting it to pandas.
+
+    Returns:
+        pa.Table: The selected events, events of a match stay contiguous and in order.
+    """
+
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+
+    if columns is not None:
+        columns = [column for column in columns if column in dataset.schema.names]
+
+    return dataset.to_table(columns=columns, filter=event_filter(match_weeks, teams, match_ids))
+
+
+def load_events(path, columns=None, match_weeks=None, teams=None, match_ids=None):
+    """
+    Load processed events, reading only the requested columns and matches.
+
+    ``path`` is either a single Parquet file or the partitioned events dataset
+    written by the preprocessing (competition=/season=/match_week= directories,
+    one row group per match). Column projection and filters are pushed down to
+    pyarrow: partitions outside the filter are skipped and row groups are pruned
+    from their statistics, so a single match week of a few metric columns reads
+    a small part of the season.
+
+    Args:
+        path (str): Processed events Parquet file or dataset directory.
+        columns (list, optional): Columns to read, all columns when not given. Columns missing from the store are skipped.
+        match_weeks (list, optional): Match weeks to keep.
+        teams (list, optional): Teams to keep, a match is kept if either side is in ``teams``.
+        match_ids (list, optional): Match ids to keep.
+
+    Returns:
+        pd.DataFrame: The selected events, events of a match stay contiguous and in order.
+    """
+
+    return load_event_table(path, columns, match_weeks, teams, match_ids).to_pandas()
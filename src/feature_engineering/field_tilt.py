@@ -1,73 +1,62 @@
+import numpy as np
 import pandas as pd
 
-def calculate_field_tilt(df):
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
+from src.feature_engineering.zones import FIELD_TILT, pass_locations, zone_mask, zone_totals
+
+def match_field_tilt(match_index, zones=None):
     """
-    Calculate Field Tilt (Attacking Third Possession).
-    
-    Field Tilt measures which team controls possession in the attacking third.
-    
+    Count the attacking third passes (pass_end_x >= 80.0) of both teams in every match.
+
     Args:
-        df (pd.DataFrame): Processed J League events DataFrame.
-    
+        match_index (MatchIndex): Per-match partition of the normalized events.
+        zones (pd.DataFrame, optional): ``zone_totals`` of ``match_index`` including ``FIELD_TILT``.
+
+    Returns:
+        pd.DataFrame: One row per match with home and away attacking third passes.
+    """
+
+    if zones is None:
+        zones = zone_totals(match_index, [FIELD_TILT])
+
+    return match_index.match_frame(home_attt=zones['home_attt'].to_numpy(), away_attt=zones['away_attt'].to_numpy())
+
+
+def match_player_field_tilt(match_index):
+    """
+    Count the attacking third passes (the ``FIELD_TILT`` zone) of every player in every match.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+
+    Returns:
+        pd.DataFrame: One row per match, team and player with the attacking third pass count.
+    """
+
+    passes = np.flatnonzero(match_index.event_mask('type.name', 'Pass'))
+    coordinates, regions = pass_locations(match_index, passes)
+
+    attacking_third = np.zeros(len(match_index.events), dtype=bool)
+    for zone in FIELD_TILT.zones:
+        attacking_third[passes[zone_mask(zone, coordinates, regions)]] = True
+
+    return match_index.player_frame(attt=match_index.player_totals(attacking_third, column=FIELD_TILT.side_column))
+
+
+def aggregate_field_tilt(ppda):
+    """
+    Turn match attacking third passes into team-level Field Tilt.
+
+    Args:
+        ppda (pd.DataFrame): Output of ``match_field_tilt``.
+
     Returns:
         pd.DataFrame: DataFrame with Field Tilt metrics.
     """
 
-    # Fill missing values and replace None or NaN with "Complete"
-    df['pass.outcome.name'] = df['pass.outcome.name'].fillna("Complete").replace({None: "Complete"})
-
-    df_events = df.copy()
-
-    match_ids = df_events["match_id"].unique()
-
-    home_team = []
-    away_team = []
-    home_attt = []
-    away_attt = []
-
-    ppda = pd.DataFrame()
-
-    for match_id in match_ids:
-        df_match = df_events[df_events["match_id"] == match_id]
-        
-        
-        # Identify home and away teams from the match dataset
-        home_team_name = df_match['home_team'].unique()[0]
-        away_team_name = df_match['away_team'].unique()[0]
-        
-        
-        
-        def is_att_third(endX):
-            if endX >= 80.0:
-                return True  
-            else:
-                return False
-            
-            
-        pass_data = df_match.loc[df_match['type.name'] == 'Pass']
-        
-        pass_data["is_att_third"] = pass_data.apply(lambda row : is_att_third(row['pass_end_x']), axis = 1)
-        pass_data_att_third = pass_data.loc[pass_data['is_att_third'] == True]
-        
-        
-        
-        team1_att_third_pass_data = pass_data_att_third.loc[pass_data_att_third['team.name'] == home_team_name]
-        team2_att_third_pass_data = pass_data_att_third.loc[pass_data_att_third['team.name'] == away_team_name]
-        
-        home_team.append(home_team_name)
-        away_team.append(away_team_name)
-
-        
-        home_attt.append(team1_att_third_pass_data.shape[0])
-        away_attt.append(team2_att_third_pass_data.shape[0])
-        
-
-    ppda['home_team'] = home_team
-    ppda['away_team'] = away_team
-
-    ppda['home_attt'] = home_attt
-    ppda['away_attt'] = away_attt
-    
+    ppda = ppda[['home_team', 'away_team', 'home_attt', 'away_attt']].copy()
+
     ppda['home_tilt'] = ppda['home_attt']/ (ppda['home_attt'] + ppda['away_attt'])
     ppda['away_tilt'] = ppda['away_attt']/ (ppda['home_attt'] + ppda['away_attt'])
 
@@ -91,4 +80,40 @@ def calculate_field_tilt(df):
     average_FT = average_FT.sort_values(by='Field_tilt', ascending=True)
 
 
-    return average_FT
\ No newline at end of file
+    return average_FT
+
+
+def aggregate_player_field_tilt(player_df):
+    """
+    Average the match attacking third passes of every player over the matches they played.
+
+    Args:
+        player_df (pd.DataFrame): Output of ``match_player_field_tilt``.
+
+    Returns:
+        pd.DataFrame: DataFrame with Attacking Third Passes per match for each team and player.
+    """
+
+    average = player_df.groupby(['Team', 'Player'], sort=False)['attt'].mean()
+
+    return average.round(2).rename('Att. Third Passes').reset_index()
+
+
+def calculate_field_tilt(df, match_index=None):
+    """
+    Calculate Field Tilt (Attacking Third Possession).
+
+    Field Tilt measures which team controls possession in the attacking third.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+
+    Returns:
+        pd.DataFrame: DataFrame with Field Tilt metrics.
+    """
+
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
+
+    return aggregate_field_tilt(match_field_tilt(match_index))
@@ -0,0 +1,184 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows, peak RSS is not recorded
+    resource = None
+
+
+def _peak_rss_mb():
+    """High-water mark of the resident set size of this process in MB, None when unavailable."""
+    if resource is None:
+        return None
+    unit = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 1e6
+
+
+class _Stage:
+    """One measured stage, entered and exited as a context manager."""
+
+    def __init__(self, profiler, name, metric, rows_in):
+        self.profiler = profiler
+        self.record = {'stage': name, 'metric': metric, 'rows_in': rows_in, 'rows_out': None}
+        self._child_peak = 0
+
+    def rows(self, rows_out):
+        """Record the number of output rows of the stage."""
+        self.record['rows_out'] = rows_out
+
+    def __enter__(self):
+        stack = self.profiler._stack
+        self.record['depth'] = len(stack)
+
+        if self.profiler.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]._child_peak = max(stack[-1]._child_peak, peak)
+            tracemalloc.reset_peak()
+            self._traced_start = current
+
+        stack.append(self)
+        self._rss_start = _peak_rss_mb()
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.record['wall_seconds'] = time.perf_counter() - self._wall_start
+        self.record['cpu_seconds'] = time.process_time() - self._cpu_start
+
+        rss = _peak_rss_mb()
+        self.record['peak_rss_mb'] = rss
+        self.record['rss_growth_mb'] = None if rss is None else rss - self._rss_start
+
+        stack = self.profiler._stack
+        stack.pop()
+
+        if self.profiler.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, self._child_peak)
+            self.record['traced_peak_mb'] = (peak - self._traced_start) / 1e6
+            if stack:
+                stack[-1]._child_peak = max(stack[-1]._child_peak, peak)
+            tracemalloc.reset_peak()
+
+        self.profiler.records.append(self.record)
+
+
+class _NullStage:
+    """Stage of a disabled profiler: entering, exiting and recording rows do nothing."""
+
+    def rows(self, rows_out):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    """
+    Per-stage instrumentation of a metrics run.
+
+    Every ``stage`` records its wall and CPU time, the peak RSS of the process
+    (and how much the stage raised it), the rows in and out and, with
+    ``trace_memory``, the peak of the Python allocations traced by
+    ``tracemalloc`` above the allocations at the start of the stage. Stages nest;
+    ``depth`` is the nesting level. Records are kept in the order the stages end.
+
+    Code takes an optional ``profiler`` and opens stages with ``profiled``, so a
+    run without a profiler only pays for a ``None`` check per stage. When a
+    profiler is sent to a worker process, it starts empty there; the worker sends
+    its ``records`` back and the parent folds them in with ``merge``.
+
+    Args:
+        trace_memory (bool): Trace the Python allocations of every stage (slows the run down).
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []
+        self._start = time.perf_counter()
+
+    def __getstate__(self):
+        # Records and open stages stay in this process, a worker starts with none
+        state = self.__dict__.copy()
+        state['records'] = []
+        state['_stack'] = []
+        return state
+
+    def stage(self, name, metric=None, rows_in=None):
+        """Return the context manager measuring a stage of the run."""
+        return _Stage(self, name, metric, rows_in)
+
+    def merge(self, records, worker):
+        """Fold the stage records of a worker process into this profiler, tagged with the worker number."""
+        self.records.extend(dict(record, worker=worker) for record in records)
+
+    def report(self):
+        """
+        Return the report of the run.
+
+        Returns:
+            dict: Total wall time and peak RSS, the stage records and the wall and CPU
+            time of every metric summed over its stages.
+        """
+        metrics = {}
+        for record in self.records:
+            if record['metric'] is not None:
+                totals = metrics.setdefault(record['metric'], {'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+                totals['wall_seconds'] += record['wall_seconds']
+                totals['cpu_seconds'] += record['cpu_seconds']
+
+        return {
+            'wall_seconds': time.perf_counter() - self._start,
+            'peak_rss_mb': _peak_rss_mb(),
+            'trace_memory': self.trace_memory,
+            'stages': self.records,
+            'metrics': metrics,
+        }
+
+    def save(self, path):
+        """Write the report as JSON."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+    def summary(self, top=5):
+        """Return the slowest metrics of the run as printable lines."""
+        metrics = sorted(self.report()['metrics'].items(), key=lambda item: -item[1]['wall_seconds'])
+        return [f"{name}: {totals['wall_seconds']:.3f} s wall, {totals['cpu_seconds']:.3f} s CPU"
+                for name, totals in metrics[:top]]
+
+
+def profiled(profiler, name, metric=None, rows_in=None):
+    """
+    Open a stage of ``profiler``, or a no-op stage when profiling is disabled.
+
+    Args:
+        profiler (Profiler or None): Profiler of the run.
+        name (str): Stage name, e.g. 'load', 'normalize', 'match_stage', 'aggregate'.
+        metric (str, optional): Metric the stage belongs to.
+        rows_in (int, optional): Number of input rows.
+
+    Returns:
+        Context manager whose ``rows(n)`` records the output rows.
+    """
+
+    if profiler is None:
+        return _NULL_STAGE
+    return profiler.stage(name, metric, rows_in)
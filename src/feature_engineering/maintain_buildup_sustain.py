@@ -1,157 +1,45 @@
 import pandas as pd
 import numpy as np
 
-def calculate_maintain_buildup_sustain(df):
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
+from src.feature_engineering.zones import MAINTAIN_BUILDUP_SUSTAIN, zone_shares, zone_totals
+
+def match_maintain_buildup_sustain(match_index, zones=None):
     """
-    Calculate Maintain buildup and Sustain Percentages.
+    Calculate Maintain, Buildup and Sustain percentages of both teams in every match.
 
-    Maintain measures how often teams retain possession after passing sequences.
+    Each percentage is the duration of the team's passes in that zone over the
+    duration of all passes of the match, see ``MAINTAIN_BUILDUP_SUSTAIN``.
 
     Args:
-        df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex): Per-match partition of the normalized events.
+        zones (pd.DataFrame, optional): ``zone_totals`` of ``match_index`` including this family.
+
+    Returns:
+        pd.DataFrame: One row per match with home and away percentages.
+    """
+
+    if zones is None:
+        zones = zone_totals(match_index, [MAINTAIN_BUILDUP_SUSTAIN])
+
+    shares = zone_shares(zones, MAINTAIN_BUILDUP_SUSTAIN)
+
+    return match_index.match_frame(**{column: np.round(share, 2) for column, share in shares.items()})
+
+
+def aggregate_maintain_buildup_sustain(ppda):
+    """
+    Average match Maintain, Buildup and Sustain percentages into a team-level table.
+
+    Args:
+        ppda (pd.DataFrame): Output of ``match_maintain_buildup_sustain``.
 
     Returns:
         pd.DataFrame: DataFrame with Maintain percentage.
     """
 
-    df_events = df.copy()
-
-    match_ids = df_events["match_id"].unique()
-
-    home_team = []
-    away_team = []
-
-    home_maintain = []
-    away_maintain = []
-
-    home_build = []
-    away_build = []
-
-    home_sustain = []
-    away_sustain = []
-
-    week = []
-    match = []
-
-    for match_id in match_ids:
-        df_match = df_events[df_events["match_id"] == match_id]
-        
-        df_match['Time'] = df_match['minute'] * 60 + df_match['second']
-        df_match['Time_diff'] = df_match['Time'].diff()
-        df_match['Time_diff'].fillna(0, inplace = True)
-        df_match["Time_diff"] = df_match["Time_diff"].shift(-1)
-        
-        df_match = df_match.loc[df_match['type.name'].isin(['Pass'])]
-        
-        
-        # Identify home and away teams from the match dataset
-        home_team_name = df_match['home_team'].unique()[0]
-        away_team_name = df_match['away_team'].unique()[0]
-        
-        # Create copies for possession calculation
-        pos_A = df_match[df_match['possession_team.name'] == home_team_name]
-        pos_B = df_match[df_match['possession_team.name'] == away_team_name]
-        
-        
-        """---------------------------------"""
-        
-        def is_maintain(x, pass_end_x):
-            if (x < 60.0) and (pass_end_x < 60.0):
-                return True  
-            else:
-                return False
-            
-        def is_buildup(x, pass_end_x):
-            if (x > 60.0) and (pass_end_x < 102):
-                return True  
-            else:
-                return False
-            
-        def is_sustain(x, pass_end_x):
-            if (x > 90.0) and (pass_end_x > 90.0):
-                return True  
-            else:
-                return False
-                
-        
-        """---------------------------------"""
-        
-        pos_A["is_maintain"] = pos_A.apply(lambda row : is_maintain(row['x'], row['pass_end_x']), axis = 1)
-
-        pos_B["is_maintain"] = pos_B.apply(lambda row : is_maintain(row['x'], row['pass_end_x']), axis = 1)
-        
-        pos_A["is_buildup"] = pos_A.apply(lambda row : is_buildup(row['x'], row['pass_end_x']), axis = 1)
-
-        pos_B["is_buildup"] = pos_B.apply(lambda row : is_buildup(row['x'], row['pass_end_x']), axis = 1)
-        
-        
-        pos_A["is_sustain"] = pos_A.apply(lambda row : is_sustain(row['x'], row['pass_end_x']), axis = 1)
-        
-        pos_B["is_sustain"] = pos_B.apply(lambda row : is_sustain(row['x'], row['pass_end_x']), axis = 1)
-        
-        """---------------------------------"""
-    
-        team_A_maintain = pos_A.loc[pos_A['is_maintain'] == True]
-        team_B_maintain = pos_B.loc[pos_B['is_maintain'] == True]
-        
-        team_A_buildup = pos_A.loc[pos_A['is_buildup'] == True]
-        team_B_buildup = pos_B.loc[pos_B['is_buildup'] == True]
-        
-        team_A_sustain = pos_A.loc[pos_A['is_sustain'] == True]
-        team_B_sustain = pos_B.loc[pos_B['is_sustain'] == True]
-        
-        """---------------------------------"""
-        
-
-        team_A_maintain_possession = (team_A_maintain.duration.sum()/ (pos_A.duration.sum() + pos_B.duration.sum()))*100
-        team_A_maintain_possession = np.round(team_A_maintain_possession, 2)
-        
-        team_B_maintain_possession = (team_B_maintain.duration.sum()/ (pos_A.duration.sum() + pos_B.duration.sum()))*100
-        team_B_maintain_possession = np.round(team_B_maintain_possession, 2)
-        
-        
-        team_A_buildup_possession = (team_A_buildup.duration.sum()/ (pos_A.duration.sum() + pos_B.duration.sum()))*100
-        team_A_buildup_possession = np.round(team_A_buildup_possession, 2)
-
-        team_B_buildup_possession = (team_B_buildup.duration.sum()/ (pos_A.duration.sum() + pos_B.duration.sum()))*100
-        team_B_buildup_possession = np.round(team_B_buildup_possession, 2)
-        
-        team_A_sustain_possession = (team_A_sustain.duration.sum()/ (pos_A.duration.sum() + pos_B.duration.sum()))*100
-        team_A_sustain_possession = np.round(team_A_sustain_possession, 2)
-
-        team_B_sustain_possession = (team_B_sustain.duration.sum()/ (pos_A.duration.sum() + pos_B.duration.sum()))*100
-        team_B_sustain_possession = np.round(team_B_sustain_possession, 2)
-        
-        """---------------------------------"""
-        
-        home_team.append(home_team_name)
-        away_team.append(away_team_name)
-        
-        home_maintain.append(team_A_maintain_possession)
-        away_maintain.append(team_B_maintain_possession)
-        
-        home_build.append(team_A_buildup_possession)
-        away_build.append(team_B_buildup_possession)
-        
-        home_sustain.append(team_A_sustain_possession)
-        away_sustain.append(team_B_sustain_possession)
-        
-        week.append(df_match.match_week.unique()[0])
-        match.append(df_match.match_id.unique()[0])
-        
-    # Create a DataFrame to store possession calculations per match
-    ppda = pd.DataFrame({
-        "home_team": home_team,
-        "away_team": away_team,
-        "home_maintain": home_maintain,
-        "away_maintain": away_maintain,
-        "home_build": home_build,
-        "away_build": away_build,
-        "home_sustain": home_sustain,
-        "away_sustain": away_sustain,
-        "Match Week": week,
-        "Match ID": match
-    })
+    ppda = ppda[['home_team', 'away_team', 'home_maintain', 'away_maintain', 'home_build', 'away_build', 'home_sustain', 'away_sustain']].copy()
 
     ppda['home_maintain'] = ppda['home_maintain'].round(2)
     ppda['away_maintain'] = ppda['away_maintain'].round(2)
@@ -180,5 +68,22 @@ def calculate_maintain_buildup_sustain(df):
 
     return average_mbs
 
-    
-    
\ No newline at end of file
+
+def calculate_maintain_buildup_sustain(df, match_index=None):
+    """
+    Calculate Maintain buildup and Sustain Percentages.
+
+    Maintain measures how often teams retain possession after passing sequences.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+
+    Returns:
+        pd.DataFrame: DataFrame with Maintain percentage.
+    """
+
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
+
+    return aggregate_maintain_buildup_sustain(match_maintain_buildup_sustain(match_index))
@@ -0,0 +1,144 @@
+from collections import Counter
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def match_hashes(match_index, column_sets):
+    """
+    Content hash of the events of every match, over every set of columns.
+
+    Every column is hashed once and the hash of a set covers the row hashes of its
+    columns (and their names) only, so metrics reading different columns get
+    independent hashes: a change to a column only invalidates the metrics reading it,
+    and a run that loads fewer columns still matches the hashes of a full run.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the events.
+        column_sets (list): Lists of event columns, columns missing from the events are skipped.
+
+    Returns:
+        list: For every column set, one hex digest per match in index order.
+    """
+
+    events = match_index.events
+    column_hashes = {}
+
+    hashes = []
+    for columns in column_sets:
+        columns = [column for column in columns if column in events.columns]
+        for column in columns:
+            if column not in column_hashes:
+                column_hashes[column] = pd.util.hash_pandas_object(events[column], index=False).to_numpy()
+
+        names = ','.join(columns).encode()
+        row_hashes = np.column_stack([column_hashes[column] for column in columns]) if columns else np.zeros((len(events), 0))
+        hashes.append(np.array([
+            hashlib.blake2b(names + row_hashes[start:stop].tobytes(), digest_size=16).hexdigest()
+            for start, stop in zip(match_index.starts, match_index.stops)
+        ], dtype=object))
+
+    return hashes
+
+
+class MatchCache:
+    """
+    Persisted per-match results of the match-level metric stages.
+
+    Every metric stage has one Parquet file ``<name>-v<version>.parquet`` in
+    ``cache_dir`` with its match rows and the content hash of each match's events.
+    A cached row is reused only if the match id, the content hash and the metric
+    version all match, so new or changed matches and bumped metrics are recomputed.
+
+    Lookups are counted per metric in ``hits`` and ``misses``. New rows are kept
+    in memory until ``save``; when the cache is sent to a worker process only the
+    new rows and the counts travel back, so the parent can ``merge`` and save them.
+
+    Args:
+        cache_dir (str): Directory of the cache files.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hits = Counter()
+        self.misses = Counter()
+        self._entries = {}
+        self._fresh = {}
+
+    def __getstate__(self):
+        # Cached entries are read again from disk on the other side
+        state = self.__dict__.copy()
+        state['_entries'] = {}
+        return state
+
+    def _path(self, name, version):
+        return os.path.join(self.cache_dir, f"{name}-v{version}.parquet")
+
+    def entries(self, name, version):
+        """Return (and load) the cached rows of a metric stage, None if there are none."""
+        key = (name, version)
+        if key not in self._entries:
+            path = self._path(name, version)
+            self._entries[key] = pd.read_parquet(path) if os.path.exists(path) else None
+        return self._entries[key]
+
+    def lookup(self, name, version, match_ids, hashes):
+        """
+        Look up the cached rows of a metric stage for a set of matches.
+
+        Args:
+            name (str): Metric name.
+            version (int): Metric version.
+            match_ids (np.ndarray): Match ids.
+            hashes (np.ndarray): Content hash of every match.
+
+        Returns:
+            tuple: Cached rows of the hit matches (in ``match_ids`` order, or None) and the hit mask.
+        """
+        entries = self.entries(name, version)
+
+        if entries is None:
+            hit = np.zeros(len(match_ids), dtype=bool)
+            rows = None
+        else:
+            keys = pd.MultiIndex.from_arrays([entries['Match ID'], entries['content_hash']])
+            found = keys.get_indexer(pd.MultiIndex.from_arrays([match_ids, hashes]))
+            hit = found >= 0
+            rows = entries.iloc[found[hit]].drop(columns='content_hash').reset_index(drop=True)
+
+        self.hits[name] += int(hit.sum())
+        self.misses[name] += int((~hit).sum())
+
+        return rows, hit
+
+    def add(self, name, version, rows, hashes):
+        """Record freshly computed match rows of a metric stage with their content hashes."""
+        self._fresh.setdefault((name, version), []).append(rows.assign(content_hash=hashes))
+
+    def merge(self, other):
+        """Fold the counts and new rows of another cache (e.g. from a worker process) into this one."""
+        self.hits.update(other.hits)
+        self.misses.update(other.misses)
+        for key, fresh in other._fresh.items():
+            self._fresh.setdefault(key, []).extend(fresh)
+
+    def save(self):
+        """Write the new rows, replacing older rows of the same matches."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        for (name, version), fresh in self._fresh.items():
+            fresh = pd.concat(fresh, ignore_index=True)
+            entries = self.entries(name, version)
+            if entries is not None:
+                entries = entries.loc[~entries['Match ID'].isin(fresh['Match ID'])]
+                fresh = pd.concat([entries, fresh], ignore_index=True)
+            fresh.to_parquet(self._path(name, version), index=False)
+            self._entries[(name, version)] = fresh
+
+        self._fresh = {}
+
+    def report(self):
+        """Return the hit and miss counts over all metrics (one lookup per metric and match)."""
+        return f"Match cache: {sum(self.hits.values())} hits, {sum(self.misses.values())} misses"
@@ -0,0 +1,249 @@
+import numpy as np
+import pandas as pd
+
+# Event columns the index is built from
+MATCH_INDEX_COLUMNS = ['match_id', 'match_week', 'home_team', 'away_team']
+
+
+class MatchIndex:
+    """
+    Contiguous per-match partition of the events DataFrame.
+
+    Events are stably sorted by match (matches keep their order of first
+    appearance, events keep their order within a match), so every match
+    occupies one contiguous block of rows. When the matches already are
+    contiguous (as read from the events store) the frame is used as is,
+    without a sorted copy; it is never modified. Slice offsets and the home and
+    away team of each match are stored once, so fetching a match is an O(1)
+    slice instead of a boolean mask over the whole season.
+
+    The index also caches per-event groupings shared by the match-level metric
+    stages: the match position of every event, the side (home or away) of a
+    team column, the (match, side, player) group of every event and boolean
+    masks on event columns.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+    """
+
+    HOME = 0
+    AWAY = 1
+
+    def __init__(self, df):
+        codes, match_ids = pd.factorize(df['match_id'])
+
+        # Codes follow the order of first appearance, so non-decreasing codes mean contiguous matches
+        if (np.diff(codes) >= 0).all():
+            self.events = df
+        else:
+            # Sorted copy of the events, original index labels are kept
+            self.events = df.take(np.argsort(codes, kind='stable'))
+
+        counts = np.bincount(codes, minlength=len(match_ids))
+        self.stops = np.cumsum(counts)
+        self.starts = self.stops - counts
+        self.match_ids = np.asarray(match_ids)
+
+        self._positions = {match_id: i for i, match_id in enumerate(self.match_ids)}
+
+        # Home and away team (and match week) from the first event of every match
+        first_events = self.events.iloc[self.starts]
+        self.home_teams = np.asarray(first_events['home_team'], dtype=object)
+        self.away_teams = np.asarray(first_events['away_team'], dtype=object)
+        self.match_weeks = first_events['match_week'].to_numpy()
+
+        self.event_positions = np.repeat(np.arange(len(self.match_ids)), counts)
+
+        self._sides = {}
+        self._masks = {}
+        self._player_groups = {}
+
+    def __len__(self):
+        return len(self.match_ids)
+
+    def __iter__(self):
+        return iter(self.match_ids)
+
+    def position(self, match_id):
+        """Return the position of a match in the index."""
+        return self._positions[match_id]
+
+    def positions(self, match_ids):
+        """Return the positions of an array of match ids (-1 for unknown matches)."""
+        return pd.Index(self.match_ids).get_indexer(match_ids)
+
+    def match(self, match_id):
+        """Return the events of a single match as a contiguous slice."""
+        i = self._positions[match_id]
+        return self.events.iloc[self.starts[i]:self.stops[i]]
+
+    def home_team(self, match_id):
+        """Return the home team of a match."""
+        return self.home_teams[self._positions[match_id]]
+
+    def away_team(self, match_id):
+        """Return the away team of a match."""
+        return self.away_teams[self._positions[match_id]]
+
+    def match_week(self, match_id):
+        """Return the match week of a match."""
+        return self.match_weeks[self._positions[match_id]]
+
+    def sides(self, positions, teams):
+        """
+        Return the side of each team in the match at the same position.
+
+        Categorical team names are compared through their integer codes.
+
+        Args:
+            positions (np.ndarray): Match positions.
+            teams (array-like): Team names.
+
+        Returns:
+            np.ndarray: 0 for the home team, 1 for the away team, -1 otherwise.
+        """
+        sides = np.full(len(teams), -1, dtype=np.int8)
+
+        if isinstance(getattr(teams, 'dtype', None), pd.CategoricalDtype):
+            teams = pd.Categorical(teams)
+            codes = teams.codes
+            known = codes >= 0
+            home_codes = teams.categories.get_indexer(self.home_teams)[positions]
+            away_codes = teams.categories.get_indexer(self.away_teams)[positions]
+            sides[known & (codes == home_codes)] = self.HOME
+            sides[known & (codes == away_codes)] = self.AWAY
+            return sides
+
+        teams = np.asarray(teams, dtype=object)
+        sides[teams == self.home_teams[positions]] = self.HOME
+        sides[teams == self.away_teams[positions]] = self.AWAY
+        return sides
+
+    def event_sides(self, column='team.name'):
+        """Return (and cache) the side of the team in ``column`` for every event."""
+        if column not in self._sides:
+            self._sides[column] = self.sides(self.event_positions, self.events[column].array)
+        return self._sides[column]
+
+    def event_mask(self, column, values):
+        """Return (and cache) the mask of events whose ``column`` equals (or is in) ``values``."""
+        key = (column, values)
+        if key not in self._masks:
+            if isinstance(values, tuple):
+                self._masks[key] = self.events[column].isin(values).to_numpy()
+            else:
+                self._masks[key] = (self.events[column] == values).to_numpy()
+        return self._masks[key]
+
+    def side_totals(self, positions, sides, mask=None, weights=None):
+        """
+        Count (or sum ``weights`` over) rows per match for the home and away team.
+
+        Args:
+            positions (np.ndarray): Match position of every row.
+            sides (np.ndarray): Side of every row, as returned by ``sides``.
+            mask (np.ndarray, optional): Rows to include.
+            weights (np.ndarray, optional): Values to sum instead of counting rows. NaN is skipped.
+
+        Returns:
+            tuple: Home and away totals, one value per match in index order.
+        """
+        keep = sides >= 0
+        if mask is not None:
+            keep &= mask
+
+        key = positions[keep] * 2 + sides[keep]
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)[keep]
+            weights = np.where(np.isnan(weights), 0.0, weights)
+
+        totals = np.bincount(key, weights=weights, minlength=2 * len(self)).reshape(-1, 2)
+        return totals[:, self.HOME], totals[:, self.AWAY]
+
+    def event_totals(self, mask=None, column='team.name', weights=None):
+        """Count (or sum ``weights`` over) events per match for the home and away team in ``column``."""
+        return self.side_totals(self.event_positions, self.event_sides(column), mask, weights)
+
+    def player_groups(self, column='team.name', player_column='player.name'):
+        """
+        Return (and cache) the (match, side, player) group of every event, the player key of the player stages.
+
+        Groups are numbered in match, side and player order; events without a side
+        in the match or without a player are in no group.
+
+        Args:
+            column (str): Team column the side of an event is taken from.
+            player_column (str): Player column.
+
+        Returns:
+            tuple: Group of every event (-1 for none) and a DataFrame of the groups with
+            their ``match`` position, ``side`` and ``player`` name.
+        """
+        key = (column, player_column)
+        if key not in self._player_groups:
+            sides = self.event_sides(column)
+            player_codes, players = pd.factorize(self.events[player_column].array)
+            n_players = max(len(players), 1)
+
+            grouped = (sides >= 0) & (player_codes >= 0)
+            keys = (self.event_positions[grouped] * 2 + sides[grouped]) * n_players + player_codes[grouped]
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+
+            codes = np.full(len(sides), -1, dtype=np.int64)
+            codes[grouped] = inverse
+            groups = pd.DataFrame({
+                'match': unique_keys // (2 * n_players),
+                'side': (unique_keys // n_players % 2).astype(np.int8),
+                'player': np.asarray(players, dtype=object)[unique_keys % n_players],
+            })
+            self._player_groups[key] = (codes, groups)
+        return self._player_groups[key]
+
+    def player_totals(self, mask=None, column='team.name', weights=None):
+        """
+        Count (or sum ``weights`` over) events per (match, side, player) group of ``player_groups``.
+
+        The player counterpart of ``event_totals``: the same masks and weights, grouped
+        by one more key.
+
+        Args:
+            mask (np.ndarray, optional): Events to include.
+            column (str): Team column the side of an event is taken from.
+            weights (np.ndarray, optional): Values to sum instead of counting events. NaN is skipped.
+
+        Returns:
+            np.ndarray: One total per group, in group order.
+        """
+        codes, groups = self.player_groups(column)
+        keep = codes >= 0
+        if mask is not None:
+            keep &= mask
+
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)[keep]
+            weights = np.where(np.isnan(weights), 0.0, weights)
+
+        return np.bincount(codes[keep], weights=weights, minlength=len(groups))
+
+    def player_frame(self, column='team.name', **columns):
+        """Return a one-row-per-(match, team, player) DataFrame with the group keys followed by ``columns``."""
+        _, groups = self.player_groups(column)
+        matches = groups['match'].to_numpy()
+        home = groups['side'].to_numpy() == self.HOME
+        return pd.DataFrame({
+            "Match ID": self.match_ids[matches],
+            "Match Week": self.match_weeks[matches],
+            "Team": np.where(home, self.home_teams[matches], self.away_teams[matches]),
+            "Player": groups['player'].to_numpy(),
+            **columns
+        })
+
+    def match_frame(self, **columns):
+        """Return a one-row-per-match DataFrame with the match keys followed by ``columns``."""
+        return pd.DataFrame({
+            "Match ID": self.match_ids,
+            "Match Week": self.match_weeks,
+            "home_team": self.home_teams,
+            "away_team": self.away_teams,
+            **columns
+        })
@@ -1,63 +1,270 @@
-import pandas as pd
-import yaml
+import argparse
+import cProfile
 
-from possession import calculate_possession
-from ppda import calculate_ppda
-from field_tilt import calculate_field_tilt
-from maintain_buildup_sustain import calculate_maintain_buildup_sustain
-from speed_metrics import calculate_speed_metrics
-from passes_per_sequence import calculate_avg_passes_per_sequence
-from attacking_passes_per_sequence import calculate_avg_attacking_passes_per_sequence
-from verticality import calculate_avg_verticality
-from defensive_height import calculate_avg_defensive_height
-from attacks import calculate_buildup_and_direct_attacks
-from attacks_under_10_passes import calculate_buildup_and_direct_attacks_under_10_passes
-from average_pressure import calculate_avg_pressure
-
-# Load configuration from config.yaml
-with open("config/config.yaml", "r") as file:
-    config = yaml.safe_load(file)
-
-# File paths from config
-input_parquet = config["paths"]["output"]
-output_file = config["paths"].get("metrics_output", "data/processed/j_league_metrics.xlsx")
-
-# Load the processed Parquet file
-df = pd.read_parquet(input_parquet)
-
-# Calculate metrics
-possession = calculate_possession(df)
-ppda = calculate_ppda(df)
-field_tilt = calculate_field_tilt(df)
-mbs = calculate_maintain_buildup_sustain(df)
-speed_metrics = calculate_speed_metrics(df)
-avg_passes = calculate_avg_passes_per_sequence(df)
-avg_attacking_passes = calculate_avg_attacking_passes_per_sequence(df)
-avg_verticality = calculate_avg_verticality(df)
-avg_defensive_height = calculate_avg_defensive_height(df)
-attacks = calculate_buildup_and_direct_attacks(df)
-attacks_under_10 = calculate_buildup_and_direct_attacks_under_10_passes(df)
-avg_pressure = calculate_avg_pressure(df)
-
-
-# Merge all metrics into a single DataFrame
-metrics_df = (
-    possession
-    .merge(ppda, on='Team', how='left')
-    .merge(field_tilt, on='Team', how='left')
-    .merge(mbs, on='Team', how='left')
-    .merge(speed_metrics, on='Team', how='left')
-    .merge(avg_passes, on='Team', how='left')
-    .merge(avg_attacking_passes, on='Team', how='left')
-    .merge(avg_verticality, on='Team', how='left')
-    .merge(avg_defensive_height, on='Team', how='left')
-    .merge(avg_pressure, on='Team', how='left')
-    .merge(attacks, on='Team', how='left')
-    .merge(attacks_under_10, on='Team', how='left')
+import yaml
 
+from src.feature_engineering.engine import (
+    TEAM_METRICS, aggregate_player_metrics, aggregate_team_metrics, compute_match_table, compute_match_table_arrow,
+    compute_match_table_parallel, player_metrics, required_columns, select_metrics
 )
+from src.feature_engineering.event_store import load_event_table, load_events, store_columns
+from src.feature_engineering.instrumentation import Profiler, profiled
+from src.feature_engineering.match_cache import MatchCache
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
+from src.feature_engineering.possession_chains import build_chain_summary
+from src.feature_engineering.results_store import write_results
+from src.feature_engineering.windows import compute_windowed_team_metrics
+
+
+def calculate_metrics_separately(df, profiler=None, metrics=None):
+    """
+    Calculate every selected metric with its own calculate_* function and merge the results.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        profiler (Profiler, optional): Records the normalization, every calculate_* call and the merge.
+        metrics (list, optional): Names of the metrics to calculate, all registered metrics when None.
+
+    Returns:
+        pd.DataFrame: One row per team with every selected metric.
+    """
+
+    metrics = select_metrics(metrics)
+
+    # Partition the events by match once, shared by every per-match metric
+    with profiled(profiler, 'normalize', rows_in=len(df)) as stage:
+        match_index = MatchIndex(normalize_events(df))
+        stage.rows(len(match_index.events))
+
+    # Summarise every possession chain once, shared by the sequence metrics
+    chains = None
+    if any('chains' in metric.inputs for metric in metrics):
+        with profiled(profiler, 'shared_inputs', rows_in=len(match_index.events)) as stage:
+            chains = build_chain_summary(match_index.events)
+            stage.rows(len(chains))
+
+    # Calculate metrics
+    results = []
+    for metric in metrics:
+        args = (chains,) if 'chains' in metric.inputs else ()
+        with profiled(profiler, 'calculate', metric.name, len(df)) as stage:
+            results.append(metric.calculate(df, match_index, *args))
+            stage.rows(len(results[-1]))
+
+    # Merge all metrics into a single DataFrame
+    with profiled(profiler, 'merge') as stage:
+        metrics_df = results[0]
+        for result in results[1:]:
+            metrics_df = metrics_df.merge(result, on='Team', how='left')
+        stage.rows(len(metrics_df))
+
+    return metrics_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calculate team metrics from the processed events.")
+    parser.add_argument("--only", metavar="METRICS",
+                        help="Comma-separated metrics to compute, e.g. 'ppda,field_tilt'; only the event columns "
+                             "and shared inputs they need are loaded and built. All metrics by default: "
+                             + ", ".join(metric.name for metric in TEAM_METRICS) + ".")
+    parser.add_argument("--engine", choices=["fused", "separate"], default="fused",
+                        help="'fused' computes every metric in one pass over the events, "
+                             "'separate' calls each calculate_* function on its own.")
+    parser.add_argument("--backend", choices=["pandas", "arrow"], default="pandas",
+                        help="'arrow' runs the fused engine on the pyarrow Table of the events, without "
+                             "converting them to pandas (fused engine only, no match cache).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes the matches are sharded over (fused engine only).")
+    parser.add_argument("--cache-dir",
+                        help="Directory of the per-match result cache (fused engine, pandas backend only). "
+                             "Defaults to paths.metrics_cache in the config, which is skipped by runs with "
+                             "another engine or backend; no cache when neither is set.")
+    parser.add_argument("--match-weeks", type=int, nargs="+",
+                        help="Only use the matches of these match weeks.")
+    parser.add_argument("--teams", nargs="+",
+                        help="Only use the matches involving these teams.")
+    parser.add_argument("--windows", action="store_true",
+                        help="Also write every metric as a per-team time series over the match weeks "
+                             "(last-N, expanding and exponentially weighted windows; fused engine only).")
+    parser.add_argument("--players", action="store_true",
+                        help="Also compute the player-level metrics in the same pass and write them to "
+                             "paths.player_metrics_results (fused engine only).")
+    parser.add_argument("--last-n", type=int, nargs="+", default=[5],
+                        help="Lengths, in match weeks, of the last-N windows.")
+    parser.add_argument("--halflife", type=float, default=3.0,
+                        help="Half-life, in match weeks, of the exponentially weighted window.")
+    parser.add_argument("--excel", action="store_true",
+                        help="Also export the metrics (and windowed metrics) to Excel, at paths.metrics_output "
+                             "(and paths.windowed_metrics_output).")
+    parser.add_argument("--profile", metavar="REPORT",
+                        help="Write a JSON report with the wall time, CPU time, peak RSS and rows in and out "
+                             "of every stage and metric of the run.")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also trace the Python allocations of every stage with tracemalloc (requires --profile).")
+    parser.add_argument("--cprofile", metavar="FILE",
+                        help="Write a cProfile dump of the run (open with pstats or snakeviz).")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and args.engine != "fused":
+        parser.error("--workers is only supported by the fused engine")
+    if args.backend == "arrow" and args.engine != "fused":
+        parser.error("--backend arrow is only supported by the fused engine")
+    if args.windows and args.engine != "fused":
+        parser.error("--windows is only supported by the fused engine")
+    if args.players and args.engine != "fused":
+        parser.error("--players is only supported by the fused engine")
+    if min(args.last_n) < 1 or args.halflife <= 0:
+        parser.error("--last-n and --halflife must be positive")
+    if args.trace_memory and not args.profile:
+        parser.error("--trace-memory requires --profile")
+
+    # Metrics selected with --only, all registered metrics by default
+    names = None if args.only is None else [name.strip() for name in args.only.split(",") if name.strip()]
+    try:
+        metrics = select_metrics(names)
+    except ValueError as error:
+        parser.error(f"--only: {error}")
+    if not metrics:
+        parser.error("--only selects no metric")
+
+    # Instrumentation of the run, nothing is recorded when neither is requested
+    profiler = Profiler(trace_memory=args.trace_memory) if args.profile else None
+    c_profile = cProfile.Profile() if args.cprofile else None
+    if c_profile is not None:
+        c_profile.enable()
+
+    # Load configuration from config.yaml
+    with open("config/config.yaml", "r") as file:
+        config = yaml.safe_load(file)
+
+    # File paths from config
+    input_parquet = config["paths"]["output"]
+    results_file = config["paths"].get("metrics_results", "data/processed/j_league_metrics.arrow")
+    windows_results_file = config["paths"].get("windowed_metrics_results", "data/processed/j_league_windowed_metrics.arrow")
+    excel_file = config["paths"].get("metrics_output", "data/processed/j_league_metrics.xlsx")
+    windows_excel_file = config["paths"].get("windowed_metrics_output", "data/processed/j_league_windowed_metrics.xlsx")
+    players_results_file = config["paths"].get("player_metrics_results", "data/processed/j_league_player_metrics.arrow")
+    players_excel_file = config["paths"].get("player_metrics_output", "data/processed/j_league_player_metrics.xlsx")
+    cache_dir = args.cache_dir or config["paths"].get("metrics_cache")
+
+    # The match cache is only read by the fused engine on the pandas backend: an explicit
+    # --cache-dir conflicts with the other options, the cache of the config is skipped
+    conflict = None
+    if args.engine != "fused":
+        conflict = f"--engine {args.engine}"
+    elif args.backend == "arrow":
+        conflict = "--backend arrow"
+    if cache_dir and conflict:
+        if args.cache_dir:
+            parser.error(f"--cache-dir is only supported by the fused engine on the pandas backend, not with {conflict}")
+        print(f"⚠️ Match cache of paths.metrics_cache not used with {conflict}")
+        cache_dir = None
+
+    # Per-match results of earlier runs, only new or changed matches are computed
+    cache = MatchCache(cache_dir) if cache_dir else None
+
+    # Columns of the selected metrics, region IDs are read from the store when it has them
+    columns = required_columns(metrics, store_columns(input_parquet), args.players)
+
+    # Calculate metrics, worker processes read their own matches from the events store
+    match_table = None
+    player_table = None
+    if args.workers > 1:
+        match_table = compute_match_table_parallel(
+            input_parquet, args.workers, args.match_weeks, args.teams, cache, profiler, args.backend, names, args.players
+        )
+    elif args.backend == "arrow":
+        # Arrow Table of the metric columns of the selected matches, never converted to pandas
+        with profiled(profiler, 'load') as stage:
+            table = load_event_table(input_parquet, columns=columns, match_weeks=args.match_weeks, teams=args.teams)
+            stage.rows(table.num_rows)
+
+        match_table = compute_match_table_arrow(table, profiler, names, args.players)
+    else:
+        # Load the metric columns of the selected matches
+        with profiled(profiler, 'load') as stage:
+            df = load_events(input_parquet, columns=columns, match_weeks=args.match_weeks, teams=args.teams)
+            stage.rows(len(df))
+
+        if args.engine == "fused":
+            match_table = compute_match_table(df, cache, profiler, names, args.players)
+        else:
+            metrics_df = calculate_metrics_separately(df, profiler, names)
+
+    # Team and player match tables come from the same pass over the events
+    if args.players:
+        match_table, player_table = match_table
+
+    if match_table is not None:
+        metrics_df = aggregate_team_metrics(match_table, profiler, names)
+
+    if cache is not None:
+        print(f"🗂️ {cache.report()}")
+
+    # Description stored with the results: the metrics, their versions and the selected matches
+    metadata = {
+        'metrics': [{'name': metric.name, 'version': metric.version, 'outputs': metric.outputs} for metric in metrics],
+        'engine': args.engine,
+        'backend': args.backend,
+        'match_weeks': args.match_weeks,
+        'teams': args.teams,
+    }
+
+    # Save the metrics as a memory-mappable Arrow file, Excel is an optional export
+    with profiled(profiler, 'results_write', rows_in=len(metrics_df)):
+        write_results(metrics_df, results_file, {'table': 'team_metrics', **metadata})
+    print(f"✅ All metrics saved to {results_file}")
+    if args.excel:
+        with profiled(profiler, 'excel_write', rows_in=len(metrics_df)):
+            metrics_df.to_excel(excel_file, index=False)
+        print(f"✅ Excel export saved to {excel_file}")
+
+    # Player metrics, from the player match table of the same run
+    if player_table is not None:
+        players_df = aggregate_player_metrics(player_table, profiler, names)
+        with profiled(profiler, 'results_write', rows_in=len(players_df)):
+            write_results(players_df, players_results_file, {
+                'table': 'player_metrics', **metadata,
+                'metrics': [{'name': metric.name, 'outputs': metric.outputs} for metric in player_metrics(metrics)]
+            })
+        print(f"✅ Player metrics of {len(players_df)} players saved to {players_results_file}")
+        if args.excel:
+            with profiled(profiler, 'excel_write', rows_in=len(players_df)):
+                players_df.to_excel(players_excel_file, index=False)
+            print(f"✅ Excel export saved to {players_excel_file}")
+
+    # Per-team time series of every metric, from the same match table
+    if args.windows:
+        with profiled(profiler, 'windows', rows_in=len(match_table)) as stage:
+            windows_df = compute_windowed_team_metrics(
+                match_table, args.last_n, args.halflife, [output for metric in metrics for output in metric.outputs]
+            )
+            stage.rows(len(windows_df))
+        with profiled(profiler, 'results_write', rows_in=len(windows_df)):
+            write_results(
+                windows_df, windows_results_file,
+                {'table': 'windowed_team_metrics', 'last_n': args.last_n, 'halflife': args.halflife, **metadata}
+            )
+        print(f"✅ Windowed metrics saved to {windows_results_file}")
+        if args.excel:
+            with profiled(profiler, 'excel_write', rows_in=len(windows_df)):
+                windows_df.to_excel(windows_excel_file, index=False)
+            print(f"✅ Excel export saved to {windows_excel_file}")
+
+    if c_profile is not None:
+        c_profile.disable()
+        c_profile.dump_stats(args.cprofile)
+        print(f"✅ cProfile stats saved to {args.cprofile}")
+
+    if profiler is not None:
+        profiler.save(args.profile)
+        for line in profiler.summary():
+            print(f"⏱️ {line}")
+        print(f"✅ Profile report saved to {args.profile}")
 
 
-# Save the metrics to an Excel file
-metrics_df.to_excel(output_file, index=False)
-print(f"✅ All metrics saved to {output_file}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import pandas as pd
+
+from src.feature_engineering.pitch_grid import END_COORDINATES, end_coordinates, region_ids
+
+DEFENSIVE_ACTION_TYPES = ['Interception', 'Foul Committed', 'Block']
+SET_PIECE_PATTERNS = ['From Corner', 'From Free Kick']
+
+# Event columns read by the metrics
+EVENT_COLUMNS = [
+    'match_id', 'match_week', 'home_team', 'away_team', 'team.name', 'possession_team.name',
+    'possession', 'player.name', 'type.name', 'play_pattern.name', 'pass.outcome.name',
+    'duel.type.name', 'minute', 'second', 'timestamp', 'duration', 'x', 'y', 'pass_end_x', 'pass_end_y',
+    'region', 'end_region'
+]
+
+# Event columns every normalized column is computed from
+NORMALIZED_COLUMNS = {
+    'pass_complete': ['pass.outcome.name'],
+    'defensive_action': ['type.name', 'duel.type.name'],
+    'regular_play': ['play_pattern.name'],
+    'region': ['x', 'y'],
+    'end_region': [column for coordinates in END_COORDINATES for column in coordinates],
+}
+
+
+def derivable_columns(columns):
+    """
+    Normalized columns that can be computed from the given event columns.
+
+    ``end_region`` needs one pair of end coordinates, the other normalized columns
+    need all their ``NORMALIZED_COLUMNS`` sources.
+    """
+
+    columns = set(columns)
+    derivable = [
+        name for name, sources in NORMALIZED_COLUMNS.items()
+        if name != 'end_region' and all(source in columns for source in sources)
+    ]
+    if any(x_col in columns and y_col in columns for x_col, y_col in END_COORDINATES):
+        derivable.append('end_region')
+    return derivable
+
+
+def source_columns(columns, stored=None):
+    """
+    Event columns to load for a list of event and normalized columns.
+
+    Normalized columns are replaced by the event columns they are computed from,
+    except ``region`` and ``end_region`` when the events store already has them.
+    Columns are returned in ``EVENT_COLUMNS`` order, other columns after them.
+
+    Args:
+        columns (list): Event and normalized columns read by the metrics.
+        stored (list, optional): Columns of the events store; when not given, stored
+            region IDs and their coordinates are both loaded.
+
+    Returns:
+        list: Event columns to load.
+    """
+
+    sources = []
+    for column in columns:
+        if column in NORMALIZED_COLUMNS:
+            if column in EVENT_COLUMNS and (stored is None or column in stored):
+                sources.append(column)
+            if stored is None or column not in stored:
+                sources.extend(NORMALIZED_COLUMNS[column])
+        else:
+            sources.append(column)
+
+    sources = list(dict.fromkeys(sources))
+    return [column for column in EVENT_COLUMNS if column in sources] + [column for column in sources if column not in EVENT_COLUMNS]
+
+
+def normalize_events(df, columns=EVENT_COLUMNS):
+    """
+    Select the metric columns of the events and add the normalized columns shared by the metrics.
+
+    - pass_complete: Pass outcome is missing (StatsBomb leaves it empty) or "Complete".
+    - defensive_action: Interception, foul, block or tackle (a missing duel type is not a tackle).
+    - regular_play: Play pattern is not a corner or a free kick.
+    - region, end_region: Region IDs of the start and end location (see ``pitch_grid``),
+      computed from the coordinates when the events were processed without them.
+
+    A normalized column is only added when its source columns are in ``df`` (see
+    ``derivable_columns``), so events loaded for a few metrics normalize only what
+    those metrics read.
+
+    ``df`` is treated as read-only: the selected columns are copied once into the
+    returned frame, so other event columns are never copied.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        columns (list, optional): Event columns to keep, all columns when None.
+
+    Returns:
+        pd.DataFrame: The selected columns with the normalized columns added.
+    """
+
+    if columns is None:
+        columns = df.columns
+    columns = [column for column in columns if column in df.columns]
+
+    derivable = derivable_columns(df.columns)
+
+    normalized = {}
+    if 'region' not in df.columns and 'region' in derivable:
+        normalized['region'] = region_ids(df['x'], df['y'])
+    if 'end_region' not in df.columns and 'end_region' in derivable:
+        normalized['end_region'] = region_ids(*end_coordinates(df))
+    if 'pass_complete' in derivable:
+        normalized['pass_complete'] = df['pass.outcome.name'].isna() | (df['pass.outcome.name'] == "Complete")
+    if 'defensive_action' in derivable:
+        normalized['defensive_action'] = df['type.name'].isin(DEFENSIVE_ACTION_TYPES) | (df['duel.type.name'] == "Tackle")
+    if 'regular_play' in derivable:
+        normalized['regular_play'] = ~df['play_pattern.name'].isin(SET_PIECE_PATTERNS)
+
+    return pd.DataFrame({**{column: df[column] for column in columns}, **normalized})
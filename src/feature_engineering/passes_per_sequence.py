@@ -1,47 +1,89 @@
+import numpy as np
 import pandas as pd
 
-def calculate_avg_passes_per_sequence(df):
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
+from src.feature_engineering.possession_chains import build_chain_summary
+
+def match_passes_per_sequence(match_index, chains):
     """
-    Calculate Average Passes per Possession Sequence for each team.
-    
-    This metric computes the average number of passes during each possession.
+    Count the possession chains and passes in possession of both teams in every match.
 
     Args:
-        df (pd.DataFrame): Processed J League events DataFrame.
-    
+        match_index (MatchIndex): Per-match partition of the normalized events.
+        chains (pd.DataFrame): Possession chain summary of ``match_index.events``.
+
     Returns:
-        pd.DataFrame: DataFrame with Average Passes per Sequence for each team.
+        pd.DataFrame: One row per match with home and away chain and pass counts.
     """
 
-    # Fill missing values and replace None or NaN with "Complete"
-    df['pass.outcome.name'] = df['pass.outcome.name'].fillna("Complete").replace({None: "Complete"})
+    positions = match_index.positions(chains['match_id'])
+    sides = match_index.sides(positions, chains['possession_team.name'])
 
-    df_events = df.copy()
+    home_chains, away_chains = match_index.side_totals(positions, sides)
+    home_passes, away_passes = match_index.event_totals(match_index.event_mask('type.name', 'Pass'), column='possession_team.name')
 
-    cd = df_events[['team.name', 'type.name', 'possession', 'possession_team.name', 'match_id']]
+    return match_index.match_frame(
+        home_possession_chains=home_chains,
+        away_possession_chains=away_chains,
+        home_possession_passes=home_passes,
+        away_possession_passes=away_passes
+    )
 
-    possession_chain_counts = cd.groupby(['possession_team.name', 'match_id'])['possession'].nunique().reset_index()
 
-    # Calculate the event counts per team
-    event_counts = cd.groupby(['possession_team.name', 'match_id'])['type.name'].count().reset_index()
+def match_player_passes_per_sequence(match_index):
+    """
+    Count the possession sequences every player is involved in, and their passes in them, in every match.
 
-    # Calculate the pass counts per team
-    pass_counts = cd[cd['type.name'] == 'Pass'].groupby(['possession_team.name', 'match_id'])['type.name'].count().reset_index()
+    A player is involved in a sequence of their team when they have at least one
+    event in the possession while their team has the ball.
 
-    possession_chain_counts = possession_chain_counts.groupby('possession_team.name')['possession'].sum().reset_index()
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+
+    Returns:
+        pd.DataFrame: One row per match, team and player with sequence and pass counts.
+    """
+
+    codes, groups = match_index.player_groups()
+    team_sides = match_index.event_sides('team.name')
+    in_possession = (team_sides >= 0) & (team_sides == match_index.event_sides('possession_team.name'))
 
-    event_counts = event_counts.groupby('possession_team.name')['type.name'].sum().reset_index()
+    # Distinct (player group, possession) pairs of the events in possession
+    involved = in_possession & (codes >= 0)
+    possession = match_index.events['possession'].to_numpy(dtype=np.int64)[involved]
+    n_possessions = int(possession.max()) + 1 if len(possession) else 1
+    pairs = np.unique(codes[involved] * n_possessions + possession)
 
-    pass_counts = pass_counts.groupby('possession_team.name')['type.name'].sum().reset_index()
+    return match_index.player_frame(
+        possession_chains=np.bincount(pairs // n_possessions, minlength=len(groups)),
+        possession_passes=match_index.player_totals(match_index.event_mask('type.name', 'Pass') & in_possession)
+    )
 
-    # Rename the columns for clarity
-    possession_chain_counts.columns = ['Team', 'Number_of_Possession_Chains']
-    event_counts.columns = ['Team', 'Number_of_Events']
-    pass_counts.columns = ['Team', 'Number_of_Passes']
 
-    # Merge the DataFrames
-    result_df = possession_chain_counts.merge(event_counts, on='Team')
-    result_df = result_df.merge(pass_counts, on='Team')
+def aggregate_passes_per_sequence(sequence_df):
+    """
+    Turn match chain and pass counts into team-level Passes per Sequence.
+
+    Args:
+        sequence_df (pd.DataFrame): Output of ``match_passes_per_sequence``.
+
+    Returns:
+        pd.DataFrame: DataFrame with Average Passes per Sequence for each team.
+    """
+
+    columns = {'possession_chains': 'Number_of_Possession_Chains', 'possession_passes': 'Number_of_Passes'}
+
+    home_data = sequence_df[['home_team'] + ['home_' + c for c in columns]].copy()
+    home_data.columns = ['Team'] + list(columns.values())
+
+    away_data = sequence_df[['away_team'] + ['away_' + c for c in columns]].copy()
+    away_data.columns = ['Team'] + list(columns.values())
+
+    result_df = pd.concat([home_data, away_data], ignore_index = True).groupby('Team').sum().reset_index()
+
+    # Teams without passes in possession have no sequences to average
+    result_df = result_df.loc[result_df['Number_of_Passes'] > 0]
 
     result_df['Passes_per_sequence'] = result_df['Number_of_Passes']/ result_df['Number_of_Possession_Chains']
 
@@ -52,3 +94,44 @@ def calculate_avg_passes_per_sequence(df):
     result_df = result_df[['Team', 'Passes_per_sequence']]
 
     return result_df
+
+
+def aggregate_player_passes_per_sequence(player_df):
+    """
+    Turn the match sequence and pass counts of every player into Passes per Sequence involvement.
+
+    Args:
+        player_df (pd.DataFrame): Output of ``match_player_passes_per_sequence``.
+
+    Returns:
+        pd.DataFrame: DataFrame with Passes per Sequence for each team and player (NaN without sequences).
+    """
+
+    totals = player_df.groupby(['Team', 'Player'], sort=False)[['possession_passes', 'possession_chains']].sum()
+    average = totals['possession_passes'] / totals['possession_chains'].where(totals['possession_chains'] > 0)
+
+    return average.round(2).rename('Passes_per_sequence').reset_index()
+
+
+def calculate_avg_passes_per_sequence(df, match_index=None, chains=None):
+    """
+    Calculate Average Passes per Possession Sequence for each team.
+
+    This metric computes the average number of passes during each possession.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+        chains (pd.DataFrame, optional): Possession chain summary from ``build_chain_summary``. Built when not given.
+
+    Returns:
+        pd.DataFrame: DataFrame with Average Passes per Sequence for each team.
+    """
+
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
+
+    if chains is None:
+        chains = build_chain_summary(match_index.events)
+
+    return aggregate_passes_per_sequence(match_passes_per_sequence(match_index, chains))
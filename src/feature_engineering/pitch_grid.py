@@ -0,0 +1,210 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# StatsBomb pitch, x towards the opponent's goal and y across the pitch
+PITCH_LENGTH = 120.0
+PITCH_WIDTH = 80.0
+
+# A named pitch region: the x and y ranges (``pd.Interval``, closed as declared) of the
+# locations inside it. None is any value.
+Region = namedtuple('Region', ['name', 'x', 'y'], defaults=(None, None))
+
+REGIONS = [
+    Region('own_half', x=pd.Interval(-np.inf, 60.0, closed='neither')),
+    Region('opponent_half', x=pd.Interval(60.0, np.inf, closed='neither')),
+    Region('defensive_third', x=pd.Interval(-np.inf, 40.0, closed='neither')),
+    Region('middle_third', x=pd.Interval(40.0, 80.0, closed='left')),
+    Region('attacking_third', x=pd.Interval(80.0, np.inf, closed='left')),
+    # The 60% of the pitch closest to the opponent's goal, where PPDA is counted
+    Region('press_zone', x=pd.Interval(48.0, np.inf, closed='neither')),
+    Region('box', x=pd.Interval(102.0, np.inf, closed='left'), y=pd.Interval(18.0, 62.0, closed='neither')),
+    Region('left_wing', y=pd.Interval(-np.inf, 18.0, closed='neither')),
+    Region('left_half_space', y=pd.Interval(18.0, 30.0, closed='left')),
+    Region('centre', y=pd.Interval(30.0, 50.0, closed='left')),
+    Region('right_half_space', y=pd.Interval(50.0, 62.0, closed='left')),
+    Region('right_wing', y=pd.Interval(62.0, np.inf, closed='left')),
+]
+
+# Bit of every region in the region IDs, a location is in all regions whose bit is set
+REGION_BITS = {region.name: 1 << bit for bit, region in enumerate(REGIONS)}
+
+REGION_DTYPE = 'uint16'
+ZONE_DTYPE = 'int16'
+
+# Zone ID columns of the processed events, for the start and the end location of every event
+ZONE_COLUMNS = {'zone': ZONE_DTYPE, 'end_zone': ZONE_DTYPE, 'region': REGION_DTYPE, 'end_region': REGION_DTYPE}
+
+# Coordinate columns the end location is taken from, the first one present wins
+END_COORDINATES = [('pass_end_x', 'pass_end_y'), ('carry_end_x', 'carry_end_y'), ('shot_end_x', 'shot_end_y')]
+
+
+def in_range(values, interval):
+    """Mask of ``values`` inside ``interval`` (a ``pd.Interval``), NaN is outside every range."""
+    low = values >= interval.left if interval.closed_left else values > interval.left
+    high = values <= interval.right if interval.closed_right else values < interval.right
+    return low & high
+
+
+def region_ids(x, y):
+    """
+    Region ID of every location: the bits of all ``REGIONS`` the location is in.
+
+    Args:
+        x (array-like): x coordinates, NaN for a missing location.
+        y (array-like): y coordinates.
+
+    Returns:
+        np.ndarray: Region IDs, 0 for a missing location.
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    located = ~np.isnan(x) & ~np.isnan(y)
+
+    ids = np.zeros(len(x), dtype=REGION_DTYPE)
+    for region in REGIONS:
+        mask = located.copy()
+        if region.x is not None:
+            mask &= in_range(x, region.x)
+        if region.y is not None:
+            mask &= in_range(y, region.y)
+        ids[mask] |= REGION_BITS[region.name]
+
+    return ids
+
+
+def in_region(ids, *names):
+    """
+    Mask of the region IDs inside any of the named regions.
+
+    Args:
+        ids (array-like): Region IDs, as returned by ``region_ids``.
+        *names (str): Names of ``REGIONS``.
+
+    Returns:
+        np.ndarray: Boolean mask.
+    """
+
+    bits = 0
+    for name in names:
+        bits |= REGION_BITS[name]
+    return (np.asarray(ids) & bits) != 0
+
+
+class PitchGrid:
+    """
+    Regular grid of ``x_bins`` by ``y_bins`` zones over the pitch.
+
+    Zone IDs run along y first: zone ``i * y_bins + j`` is the i-th column in x and
+    the j-th row in y. Locations on the far touchline or goal line fall in the last
+    zone, locations off the pitch in the nearest one, missing locations get -1.
+
+    Args:
+        x_bins (int): Number of zones along the pitch.
+        y_bins (int): Number of zones across the pitch.
+    """
+
+    def __init__(self, x_bins=6, y_bins=4):
+        self.x_bins = x_bins
+        self.y_bins = y_bins
+        self.x_edges = np.linspace(0.0, PITCH_LENGTH, x_bins + 1)
+        self.y_edges = np.linspace(0.0, PITCH_WIDTH, y_bins + 1)
+
+    def __len__(self):
+        return self.x_bins * self.y_bins
+
+    def zone_ids(self, x, y):
+        """Zone ID of every location, -1 for a missing location."""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        column = np.clip(np.searchsorted(self.x_edges, x, side='right') - 1, 0, self.x_bins - 1)
+        row = np.clip(np.searchsorted(self.y_edges, y, side='right') - 1, 0, self.y_bins - 1)
+
+        return np.where(np.isnan(x) | np.isnan(y), -1, column * self.y_bins + row).astype(ZONE_DTYPE)
+
+    def bounds(self, zone):
+        """Return the (x_min, x_max, y_min, y_max) bounds of a zone."""
+        column, row = divmod(zone, self.y_bins)
+        return self.x_edges[column], self.x_edges[column + 1], self.y_edges[row], self.y_edges[row + 1]
+
+    def zones(self, x=None, y=None):
+        """
+        IDs of the zones whose centre lies inside the given ranges.
+
+        Args:
+            x (pd.Interval, optional): Range along the pitch, any x when None.
+            y (pd.Interval, optional): Range across the pitch, any y when None.
+
+        Returns:
+            np.ndarray: Zone IDs in increasing order.
+        """
+        x_centres = (self.x_edges[:-1] + self.x_edges[1:]) / 2
+        y_centres = (self.y_edges[:-1] + self.y_edges[1:]) / 2
+
+        columns = np.ones(self.x_bins, dtype=bool) if x is None else in_range(x_centres, x)
+        rows = np.ones(self.y_bins, dtype=bool) if y is None else in_range(y_centres, y)
+
+        return np.flatnonzero(np.outer(columns, rows).ravel())
+
+    def counts(self, ids, weights=None):
+        """
+        Count (or sum ``weights`` over) the locations of every zone.
+
+        Args:
+            ids (array-like): Zone IDs, -1 is skipped.
+            weights (array-like, optional): Values to sum instead of counting. NaN is skipped.
+
+        Returns:
+            np.ndarray: ``(x_bins, y_bins)`` array of totals.
+        """
+        ids = np.asarray(ids)
+        keep = ids >= 0
+        if weights is not None:
+            weights = np.nan_to_num(np.asarray(weights, dtype=float)[keep])
+
+        return np.bincount(ids[keep], weights=weights, minlength=len(self)).reshape(self.x_bins, self.y_bins)
+
+
+def end_coordinates(df):
+    """End location of every event: the first of the pass, carry and shot end locations present."""
+    end_x = np.full(len(df), np.nan)
+    end_y = np.full(len(df), np.nan)
+
+    for x_col, y_col in END_COORDINATES:
+        if x_col in df.columns and y_col in df.columns:
+            missing = np.isnan(end_x)
+            end_x = np.where(missing, df[x_col].to_numpy(dtype=float), end_x)
+            end_y = np.where(missing, df[y_col].to_numpy(dtype=float), end_y)
+
+    return end_x, end_y
+
+
+def zone_columns(df, grid=None):
+    """
+    Zone and region IDs of the start and end location of every event.
+
+    Args:
+        df (pd.DataFrame): Events with the extracted x / y coordinate columns.
+        grid (PitchGrid, optional): Grid of the zone IDs, the default grid when not given.
+
+    Returns:
+        dict: ``ZONE_COLUMNS`` name to the IDs of every event.
+    """
+
+    if grid is None:
+        grid = PitchGrid()
+
+    x = df['x'].to_numpy(dtype=float)
+    y = df['y'].to_numpy(dtype=float)
+    end_x, end_y = end_coordinates(df)
+
+    return {
+        'zone': grid.zone_ids(x, y),
+        'end_zone': grid.zone_ids(end_x, end_y),
+        'region': region_ids(x, y),
+        'end_region': region_ids(end_x, end_y),
+    }
@@ -1,70 +1,41 @@
 import pandas as pd
 
-def calculate_possession(df):
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
+
+def match_possession(match_index):
     """
-    Calculate possession percentage for each team.
-    
+    Calculate possession percentage of both teams in every match.
+
     Args:
-        df (pd.DataFrame): Processed J League events DataFrame.
-    
+        match_index (MatchIndex): Per-match partition of the normalized events.
+
     Returns:
-        pd.DataFrame: DataFrame with possession metrics.
+        pd.DataFrame: One row per match with home and away possession.
+    """
+
+    # Extract pass events for possession calculation
+    home_passes, away_passes = match_index.event_totals(match_index.event_mask('type.name', 'Pass'))
+
+    # Compute possession percentage for each team
+    total_passes = home_passes + away_passes
+
+    return match_index.match_frame(
+        home_possession=(home_passes / total_passes) * 100,
+        away_possession=(away_passes / total_passes) * 100
+    )
+
+
+def aggregate_possession(possession_df):
     """
+    Average match possession into a team-level table.
+
+    Args:
+        possession_df (pd.DataFrame): Output of ``match_possession``.
 
-    df_events = df.copy()
-
-    match_ids = df_events["match_id"].unique()
-
-    # Initialize lists to store computed metrics for each match
-    home_team = []
-    away_team = []
-    home_possession = []
-    away_possession = []
-    week = []
-    match = []
-
-    # Process each match individually
-    for match_id in match_ids:
-        df_match = df_events[df_events["match_id"] == match_id]
-
-        # Identify home and away teams from the match dataset
-        home_team_name = df_match['home_team'].unique()[0]
-        away_team_name = df_match['away_team'].unique()[0]
-
-        # Create copies for possession calculation
-        pos_A = df_match[df_match['team.name'] == home_team_name]
-        pos_B = df_match[df_match['team.name'] == away_team_name]
-
-        # Extract unique team names
-        team1_name = home_team_name
-        team2_name = away_team_name
-
-        # Extract pass events for possession calculation
-        pos_A_pass = pos_A[pos_A['type.name'] == 'Pass']
-        pos_B_pass = pos_B[pos_B['type.name'] == 'Pass']
-
-        # Compute possession percentage for each team
-        total_passes = pos_A_pass.shape[0] + pos_B_pass.shape[0]
-        pos_A_mom = (pos_A_pass.shape[0] / total_passes) * 100
-        pos_B_mom = (pos_B_pass.shape[0] / total_passes) * 100
-
-        # Append match data to respective lists
-        home_team.append(team1_name)
-        away_team.append(team2_name)
-        home_possession.append(pos_A_mom)
-        away_possession.append(pos_B_mom)
-        week.append(df_match.match_week.unique()[0])
-        match.append(df_match.match_id.unique()[0])
-
-    # Create a DataFrame to store possession calculations per match
-    possession_df = pd.DataFrame({
-        "home_team": home_team,
-        "away_team": away_team,
-        "home_possession": home_possession,
-        "away_possession": away_possession,
-        "Match Week": week,
-        "Match ID": match
-    })
+    Returns:
+        pd.DataFrame: DataFrame with possession metrics.
+    """
 
     # Convert match-level data into team-level aggregation
     home_data = possession_df[['home_team', 'home_possession']].rename(columns={'home_team': 'Team', 'home_possession': 'Possession'})
@@ -82,3 +53,19 @@ def calculate_possession(df):
     return average_possession
 
 
+def calculate_possession(df, match_index=None):
+    """
+    Calculate possession percentage for each team.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+
+    Returns:
+        pd.DataFrame: DataFrame with possession metrics.
+    """
+
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
+
+    return aggregate_possession(match_possession(match_index))
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering.pitch_grid import region_ids
+
+
+def chain_offsets(df, team_key='possession_team.name'):
+    """
+    Order the events by possession chain and locate the chain boundaries.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        team_key (str): Team column used as the third chain key.
+
+    Returns:
+        tuple: Event order (positions into ``df``), chain start and stop offsets into that order.
+    """
+
+    match_codes, _ = pd.factorize(df['match_id'].array)
+    team_codes, _ = pd.factorize(df[team_key].array)
+    possession = df['possession'].to_numpy()
+
+    # Stable sort keeps the event order inside every chain
+    order = np.lexsort((team_codes, possession, match_codes))
+    match_codes = match_codes[order]
+    team_codes = team_codes[order]
+    possession = possession[order]
+
+    # Chain boundaries are the rows where any key changes
+    new_chain = np.ones(len(order), dtype=bool)
+    new_chain[1:] = (
+        (match_codes[1:] != match_codes[:-1])
+        | (possession[1:] != possession[:-1])
+        | (team_codes[1:] != team_codes[:-1])
+    )
+    starts = np.flatnonzero(new_chain)
+    stops = np.append(starts[1:], len(order))
+
+    return order, starts, stops
+
+
+def build_chain_summary(df, team_key='possession_team.name', offsets=None):
+    """
+    Summarise every possession chain in one vectorized pass.
+
+    Events are grouped by (match_id, possession, team_key) and each group becomes
+    one row. With the default ``team_key`` a chain is the whole possession; with
+    ``team_key='team.name'`` it is the part of the possession played by each team.
+
+    Columns of the summary:
+        - match_id, possession, <team_key>: chain keys.
+        - n_events, n_passes: number of events and passes in the chain.
+        - first_type, first_x, first_region: type, x and region ID of the first event.
+        - last_x, last_y: location of the last event.
+        - final_x, final_y, final_region: location and region ID of the last event, or of
+          the second-last event when the last one is a Goal Keeper action.
+        - has_shot: True if the chain contains a shot.
+        - regular_play: True if any event is not from a corner or free kick.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        team_key (str): Team column used as the third chain key.
+        offsets (tuple, optional): Result of ``chain_offsets`` for ``df`` and ``team_key``.
+
+    Returns:
+        pd.DataFrame: One row per possession chain, in match and possession order.
+    """
+
+    if offsets is None:
+        offsets = chain_offsets(df, team_key)
+    order, starts, stops = offsets
+    last = stops - 1
+
+    # String columns are compared in place (codes for categoricals) and only then reordered
+    type_name = df['type.name']
+    x = df['x'].to_numpy(dtype=float)[order]
+    y = df['y'].to_numpy(dtype=float)[order]
+    region = (df['region'].to_numpy() if 'region' in df.columns else region_ids(df['x'], df['y']))[order]
+
+    is_pass = (type_name == 'Pass').to_numpy()[order].astype(np.int64)
+    is_shot = (type_name == 'Shot').to_numpy()[order].astype(np.int64)
+    is_regular = (~df['play_pattern.name'].isin(['From Corner', 'From Free Kick'])).to_numpy()[order].astype(np.int64)
+    is_goalkeeper = (type_name == 'Goal Keeper').to_numpy()[order]
+
+    n_events = stops - starts
+
+    # If the last event is a goalkeeper action, use the second-last event instead
+    use_previous = is_goalkeeper[last] & (n_events > 1)
+    final = np.where(use_previous, last - 1, last)
+
+    chains = pd.DataFrame({
+        'match_id': df['match_id'].to_numpy()[order[starts]],
+        'possession': df['possession'].to_numpy()[order[starts]],
+        team_key: df[team_key].array[order[starts]],
+        'n_events': n_events,
+        'n_passes': np.add.reduceat(is_pass, starts),
+        'first_type': type_name.array[order[starts]],
+        'first_x': x[starts],
+        'first_region': region[starts],
+        'last_x': x[last],
+        'last_y': y[last],
+        'final_x': x[final],
+        'final_y': y[final],
+        'final_region': region[final],
+        'has_shot': np.add.reduceat(is_shot, starts) > 0,
+        'regular_play': np.add.reduceat(is_regular, starts) > 0,
+    })
+
+    return chains
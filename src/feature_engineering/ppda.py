@@ -1,85 +1,57 @@
+import numpy as np
 import pandas as pd
 
-def calculate_ppda(df):
-    """
-    Calculate Passes per Defensive Action (PPDA).
-    
-    Args:
-        df (pd.DataFrame): Processed J League events DataFrame.
-    
-    Returns:
-        pd.DataFrame: DataFrame with PPDA metrics.
-    """
-
-
-    # Fill missing values and replace None or NaN with "Complete"
-    df['pass.outcome.name'] = df['pass.outcome.name'].fillna("Complete").replace({None: "Complete"})
-    df['duel.type.name'] = df['duel.type.name'].fillna("")
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
+from src.feature_engineering.pitch_grid import in_region
 
+def match_ppda(match_index):
+    """
+    Calculate PPDA of both teams in every match.
 
-    df_events = df.copy()
+    Only events in the opponent's half (x > 48.0) are counted.
 
-    match_ids = df_events["match_id"].unique()
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
 
-    home_team = []
-    away_team = []
-    home_ppda = []
-    away_ppda = []
+    Returns:
+        pd.DataFrame: One row per match with home and away PPDA.
+    """
 
-    ppda = pd.DataFrame()
+    events = match_index.events
 
-    # Iterate over each match
-    for match_id in match_ids:
-        df_match = df_events[df_events["match_id"] == match_id]
-        
-        # Identify home and away teams
-        home_team_name = df_match['home_team'].unique()[0]
-        away_team_name = df_match['away_team'].unique()[0]
-        
-        # Filter events in opponent's half (x > 48.0)
-        df_match = df_match.loc[df_match['x'] > 48.0]
+    # Filter events in opponent's half (x > 48.0)
+    opponent_half = in_region(events['region'], 'press_zone')
 
-        # Split data by team
-        team1 = df_match.loc[df_match['team.name'] == home_team_name]
-        team2 = df_match.loc[df_match['team.name'] == away_team_name]
+    # Successful passes and defensive actions of each team
+    pass_succ = opponent_half & match_index.event_mask('type.name', 'Pass') & events['pass_complete'].to_numpy()
+    defensive_actions = opponent_half & events['defensive_action'].to_numpy()
 
-        # Filter Passes
-        team1_pass = team1.loc[team1['type.name'] == 'Pass']
-        team2_pass = team2.loc[team2['type.name'] == 'Pass']
+    team1_pass_succ, team2_pass_succ = match_index.event_totals(pass_succ)
+    team1_def_count, team2_def_count = match_index.event_totals(defensive_actions)
 
-        # Filter Successful Passes
-        team1_pass_succ = team1_pass.loc[team1_pass['pass.outcome.name'] == 'Complete']
-        team2_pass_succ = team2_pass.loc[team2_pass['pass.outcome.name'] == 'Complete']
+    # Avoid ZeroDivisionError
+    team1_def_count = np.maximum(team1_def_count, 1)
+    team2_def_count = np.maximum(team2_def_count, 1)
 
-        team1_defensive_actions = pd.concat([
-            team1.loc[team1['type.name'].isin(['Interception', 'Foul Committed', 'Block'])],
-            team1.loc[team1['duel.type.name'] == "Tackle"]
-        ]).drop_duplicates().reset_index(drop=True)
-        
-        team2_defensive_actions = pd.concat([
-            team2.loc[team2['type.name'].isin(['Interception', 'Foul Committed', 'Block'])],
-            team2.loc[team2['duel.type.name'] == "Tackle"]
-        ]).drop_duplicates().reset_index(drop=True)
+    return match_index.match_frame(
+        home_ppda=team2_pass_succ / team1_def_count,
+        away_ppda=team1_pass_succ / team2_def_count
+    )
 
 
-        team1_def_count = max(team1_defensive_actions.shape[0], 1)  # Avoid ZeroDivisionError
-        team2_def_count = max(team2_defensive_actions.shape[0], 1)  # Avoid ZeroDivisionError
+def aggregate_ppda(ppda):
+    """
+    Average match PPDA into a team-level table.
 
-        home_PPDA = team2_pass_succ.shape[0] / team1_def_count
-        away_PPDA = team1_pass_succ.shape[0] / team2_def_count
+    Args:
+        ppda (pd.DataFrame): Output of ``match_ppda``.
 
-        # Append computed values
-        home_team.append(home_team_name)
-        away_team.append(away_team_name)
-        home_ppda.append(home_PPDA)
-        away_ppda.append(away_PPDA)
+    Returns:
+        pd.DataFrame: DataFrame with PPDA metrics.
+    """
 
-        
-        
-    ppda['home_team'] = home_team
-    ppda['away_team'] = away_team
-    ppda['home_ppda'] = home_ppda
-    ppda['away_ppda'] = away_ppda
+    ppda = ppda[['home_team', 'away_team', 'home_ppda', 'away_ppda']].copy()
 
     ppda['home_ppda'] = ppda['home_ppda'].round(3)
     ppda['away_ppda'] = ppda['away_ppda'].round(3)
@@ -97,4 +69,22 @@ def calculate_ppda(df):
     average_ppda = average_ppda.sort_values(by='PPDA', ascending=True)
     average_ppda['PPDA'] = average_ppda['PPDA'].round(3)
 
-    return average_ppda
\ No newline at end of file
+    return average_ppda
+
+
+def calculate_ppda(df, match_index=None):
+    """
+    Calculate Passes per Defensive Action (PPDA).
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+
+    Returns:
+        pd.DataFrame: DataFrame with PPDA metrics.
+    """
+
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
+
+    return aggregate_ppda(match_ppda(match_index))
@@ -0,0 +1,201 @@
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Format of a results file, from its extension
+RESULT_FORMATS = {'.arrow': 'ipc', '.feather': 'ipc', '.ipc': 'ipc', '.parquet': 'parquet', '.xlsx': 'excel'}
+
+# Schema metadata key of the description of a results table
+METADATA_KEY = b'jleague'
+
+
+def results_format(path):
+    """Format of a results file: 'ipc', 'parquet' or 'excel'."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in RESULT_FORMATS:
+        raise ValueError(f"Unsupported results file {path}, expected one of {', '.join(RESULT_FORMATS)}.")
+    return RESULT_FORMATS[extension]
+
+
+def write_results(df, path, metadata=None):
+    """
+    Write a results table (team metrics, windowed metrics, sequences, ...) in the format of its extension.
+
+    Arrow IPC files (``.arrow``) are written uncompressed, so readers memory-map
+    them without a copy; Parquet files are compressed and read a column at a time.
+    Both keep the pandas dtypes and store ``metadata`` as JSON in the schema
+    metadata. ``.xlsx`` writes an Excel export, without the metadata.
+
+    Args:
+        df (pd.DataFrame): Results table.
+        path (str): Output file.
+        metadata (dict, optional): JSON-serializable description of the table (metrics, versions, filters).
+    """
+
+    file_format = results_format(path)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if file_format == 'excel':
+        df.to_excel(path, index=False)
+        return
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), METADATA_KEY: json.dumps(metadata).encode()})
+
+    if file_format == 'parquet':
+        pq.write_table(table, path)
+    else:
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def write_results_chunks(chunks, path, metadata=None):
+    """
+    Write a results table given as DataFrame chunks, one chunk in memory at a time.
+
+    Every chunk is written as record batches of an Arrow IPC file or row groups of
+    a Parquet file with the schema of the first chunk, so tables larger than
+    memory (e.g. player-level outputs) are written with flat memory.
+
+    Args:
+        chunks (iterable): DataFrames with the same columns.
+        path (str): Output file (``.arrow`` or ``.parquet``).
+        metadata (dict, optional): JSON-serializable description of the table.
+
+    Returns:
+        int: Number of rows written.
+    """
+
+    file_format = results_format(path)
+    if file_format == 'excel':
+        raise ValueError(f"{path} is an Excel file, chunked results are written as Arrow IPC or Parquet.")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    schema, writer, sink, n_rows = None, None, None, 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                if metadata is not None:
+                    schema = schema.with_metadata({**(schema.metadata or {}), METADATA_KEY: json.dumps(metadata).encode()})
+                table = table.replace_schema_metadata(schema.metadata)
+                if file_format == 'parquet':
+                    writer = pq.ParquetWriter(path, schema)
+                else:
+                    sink = pa.OSFile(path, 'wb')
+                    writer = pa.ipc.new_file(sink, schema)
+            writer.write_table(table)
+            n_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+        if sink is not None:
+            sink.close()
+
+    if writer is None:
+        raise ValueError(f"No rows to write to {path}.")
+    return n_rows
+
+
+def read_results_table(path, columns=None):
+    """
+    Read a results file as a pyarrow Table; Arrow IPC files are memory-mapped.
+
+    Args:
+        path (str): Results file written by ``write_results`` (Arrow IPC or Parquet).
+        columns (list, optional): Columns to read, all columns when not given.
+
+    Returns:
+        pa.Table: The results, with their schema metadata.
+    """
+
+    file_format = results_format(path)
+    if file_format == 'excel':
+        raise ValueError(f"{path} is an Excel export, read it with read_results.")
+
+    if file_format == 'parquet':
+        return pq.read_table(path, columns=columns, memory_map=True)
+
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table if columns is None else table.select(columns)
+
+
+def read_results(path, columns=None):
+    """
+    Load a results table as a DataFrame with the dtypes it was written with.
+
+    Arrow IPC files are memory-mapped and Parquet files read with a memory map, so
+    loading the team metrics takes milliseconds; Excel exports are still read,
+    slowly and with inferred dtypes, for outputs of older runs.
+
+    Args:
+        path (str): Results file (``.arrow``, ``.parquet`` or ``.xlsx``).
+        columns (list, optional): Columns to read, all columns when not given.
+
+    Returns:
+        pd.DataFrame: The results table.
+    """
+
+    if results_format(path) == 'excel':
+        return pd.read_excel(path, usecols=columns)
+    return read_results_table(path, columns).to_pandas()
+
+
+def iter_results(path, columns=None, batch_size=65536):
+    """
+    Read a results table as DataFrame chunks of at most ``batch_size`` rows.
+
+    Arrow IPC files are memory-mapped and sliced, Parquet files read a batch at a
+    time, so only the current chunk is materialized however large the table is.
+
+    Args:
+        path (str): Results file (``.arrow`` or ``.parquet``).
+        columns (list, optional): Columns to read, all columns when not given.
+        batch_size (int): Maximum rows per chunk.
+
+    Yields:
+        pd.DataFrame: The next rows of the table.
+    """
+
+    file_format = results_format(path)
+    if file_format == 'excel':
+        raise ValueError(f"{path} is an Excel export, read it with read_results.")
+
+    if file_format == 'parquet':
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    table = read_results_table(path, columns)
+    for start in range(0, table.num_rows, batch_size):
+        yield table.slice(start, batch_size).to_pandas()
+
+
+def results_schema(path):
+    """Arrow schema of a results file, without reading its data."""
+    file_format = results_format(path)
+    if file_format == 'excel':
+        raise ValueError(f"{path} is an Excel export, it has no Arrow schema.")
+    if file_format == 'parquet':
+        return pq.read_schema(path)
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).schema
+
+
+def read_results_metadata(path):
+    """Description stored with a results file by ``write_results``, from its schema only (None when absent)."""
+    if results_format(path) == 'excel':
+        return None
+
+    metadata = results_schema(path).metadata or {}
+    return json.loads(metadata[METADATA_KEY]) if METADATA_KEY in metadata else None
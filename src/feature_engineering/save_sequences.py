@@ -1,135 +1,130 @@
+import argparse
+
 import pandas as pd
 import yaml
 
-with open("config/config.yaml", "r") as file:
-    config = yaml.safe_load(file)
-
-input_parquet = config["paths"]["output"]
-output_file = config["paths"]["output_sequence"]
-
-df = pd.read_parquet(input_parquet)
-
-# Fill missing values and replace None or NaN with "Complete"
-df['pass.outcome.name'] = df['pass.outcome.name'].fillna("Complete").replace({None: "Complete"})
-
-df_events = df.copy()
-
-match_ids = df_events["match_id"].unique()
-
-home_team = []
-away_team = []
-
-home_chain_normal = []
-home_chain_shot = []
-home_chain_att_t = []
-home_chain_in_box = []
-
-away_chain_normal = []
-away_chain_shot = []
-away_chain_att_t = []
-away_chain_in_box = []
-
-sequences = pd.DataFrame()
-
-for match_id in match_ids:
-    df_match = df_events[df_events["match_id"] == match_id]
-    
-    home_team_name = df_match['home_team'].unique()[0]
-    away_team_name = df_match['away_team'].unique()[0]
-    
-    home_chain = df_match.loc[df_match['team.name'] == home_team_name]
-    away_chain = df_match.loc[df_match['team.name'] == away_team_name]
-    
-    """Home Team Sequences""" 
-    home_chains = pd.DataFrame()
-    for v in home_chain.possession.unique():
-        chain = home_chain.loc[home_chain["possession"] == v]
-        if chain.shape[0] > 2:
-            home_chains = pd.concat([home_chains, chain], ignore_index=True)
-    
-    home_chains_att = pd.DataFrame()
-    for v in home_chain.possession.unique():
-        chain = home_chain.loc[home_chain["possession"] == v]
-        if "Shot" in chain["type.name"].values and chain.shape[0] > 2:
-            home_chains_att = pd.concat([home_chains_att, chain], ignore_index=True)
-    
-    home_chains_att_t = pd.DataFrame()
-    for v in home_chain.possession.unique():
-        chain = home_chain.loc[home_chain["possession"] == v]
-        if chain.iloc[-1].x > 80.0 and chain.shape[0] > 2:
-            home_chains_att_t = pd.concat([home_chains_att_t, chain], ignore_index=True)
-    
-    home_chains_in_box = pd.DataFrame()
-    for v in home_chain.possession.unique():
-        chain = home_chain.loc[home_chain["possession"] == v]
-        if chain.shape[0] > 2:
-            last_event = chain.iloc[-1]
-            if last_event['type.name'] == 'Goal Keeper' and chain.shape[0] > 2:
-                second_last_event = chain.iloc[-2]
-                if second_last_event.x > 102.0 and 18.0 < second_last_event.y < 62.0:
-                    home_chains_in_box = pd.concat([home_chains_in_box, chain], ignore_index=True)
-            else:
-                if last_event.x > 102.0 and 18.0 < last_event.y < 62.0:
-                    home_chains_in_box = pd.concat([home_chains_in_box, chain], ignore_index=True)
-    
-    """Away Team Sequences""" 
-    away_chains = pd.DataFrame()
-    for v in away_chain.possession.unique():
-        chain = away_chain.loc[away_chain["possession"] == v]
-        if chain.shape[0] > 2:
-            away_chains = pd.concat([away_chains, chain], ignore_index=True)
-    
-    away_chains_att = pd.DataFrame()
-    for v in away_chain.possession.unique():
-        chain = away_chain.loc[away_chain["possession"] == v]
-        if "Shot" in chain["type.name"].values and chain.shape[0] > 2:
-            away_chains_att = pd.concat([away_chains_att, chain], ignore_index=True)
-    
-    away_chains_att_t = pd.DataFrame()
-    for v in away_chain.possession.unique():
-        chain = away_chain.loc[away_chain["possession"] == v]
-        if chain.iloc[-1].x > 80.0 and chain.shape[0] > 2:
-            away_chains_att_t = pd.concat([away_chains_att_t, chain], ignore_index=True)
-    
-    away_chains_in_box = pd.DataFrame()
-    for v in away_chain.possession.unique():
-        chain = away_chain.loc[away_chain["possession"] == v]
-        if chain.shape[0] > 2:
-            last_event = chain.iloc[-1]
-            if last_event['type.name'] == 'Goal Keeper' and chain.shape[0] > 2:
-                second_last_event = chain.iloc[-2]
-                if second_last_event.x > 102.0 and 18.0 < second_last_event.y < 62.0:
-                    away_chains_in_box = pd.concat([away_chains_in_box, chain], ignore_index=True)
-            else:
-                if last_event.x > 102.0 and 18.0 < last_event.y < 62.0:
-                    away_chains_in_box = pd.concat([away_chains_in_box, chain], ignore_index=True)
-    
-    # Collect lengths of sequences
-    home_chain_normal.append(len(home_chains.possession.unique()) if not home_chains.empty else 0)
-    home_chain_shot.append(len(home_chains_att.possession.unique()) if not home_chains_att.empty else 0)
-    home_chain_att_t.append(len(home_chains_att_t.possession.unique()) if not home_chains_att_t.empty else 0)
-    home_chain_in_box.append(len(home_chains_in_box.possession.unique()) if not home_chains_in_box.empty else 0)
-    
-    away_chain_normal.append(len(away_chains.possession.unique()) if not away_chains.empty else 0)
-    away_chain_shot.append(len(away_chains_att.possession.unique()) if not away_chains_att.empty else 0)
-    away_chain_att_t.append(len(away_chains_att_t.possession.unique()) if not away_chains_att_t.empty else 0)
-    away_chain_in_box.append(len(away_chains_in_box.possession.unique()) if not away_chains_in_box.empty else 0)
-    
-    home_team.append(home_team_name)
-    away_team.append(away_team_name)
-
-# Create sequences DataFrame
-sequences['home_team'] = home_team
-sequences['away_team'] = away_team
-sequences['home_chain_normal'] = home_chain_normal
-sequences['home_chain_shot'] = home_chain_shot
-sequences['home_chain_att_third'] = home_chain_att_t
-sequences['home_chain_in_box'] = home_chain_in_box
-sequences['away_chain_normal'] = away_chain_normal
-sequences['away_chain_shot'] = away_chain_shot
-sequences['away_chain_att_third'] = away_chain_att_t
-sequences['away_chain_in_box'] = away_chain_in_box  
-
-# Save to Parquet
-sequences.to_excel(output_file, index=False)
-print(f"✅ Sequences saved to {output_file}")
+from src.feature_engineering.event_store import load_events
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.pitch_grid import in_region
+from src.feature_engineering.possession_chains import build_chain_summary
+from src.feature_engineering.results_store import write_results
+
+# Event columns read to build the sequences
+SEQUENCE_EVENT_COLUMNS = [
+    'match_id', 'match_week', 'home_team', 'away_team', 'team.name', 'possession', 'type.name',
+    'play_pattern.name', 'x', 'y', 'region'
+]
+
+# Sequence classes counted per match, every class requires more than 2 events
+SEQUENCE_CLASSES = ['chain_normal', 'chain_shot', 'chain_att_third', 'chain_in_box']
+
+
+def build_sequence_table(df):
+    """
+    Classify every possession sequence of the events once.
+
+    A sequence is the part of a possession played by one team (its own events within
+    the possession). Every sequence is one row, with its chain summary and its classes:
+
+    - chain_normal: more than 2 events.
+    - chain_shot: a normal sequence containing a shot.
+    - chain_att_third: a normal sequence whose last event is beyond x = 80.
+    - chain_in_box: a normal sequence ending inside the box (x > 102, 18 < y < 62),
+      judged on the second-last event when the last one is a Goal Keeper action.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+
+    Returns:
+        pd.DataFrame: One row per sequence, in match and possession order, with match_id, match_week,
+        home_team, away_team, side ('home' or 'away'), the chain summary columns and the class flags.
+    """
+
+    match_index = MatchIndex(df)
+    chains = build_chain_summary(match_index.events, team_key='team.name')
+
+    positions = match_index.positions(chains['match_id'])
+    sides = match_index.sides(positions, chains['team.name'])
+
+    normal = chains['n_events'].to_numpy() > 2
+
+    # The box of the sequences is exclusive at x = 102, unlike the box region
+    in_box = (chains['final_x'] > 102.0) & in_region(chains['final_region'], 'box')
+
+    sequences = pd.DataFrame({
+        'match_id': chains['match_id'],
+        'match_week': match_index.match_weeks[positions],
+        'home_team': pd.Categorical(match_index.home_teams[positions]),
+        'away_team': pd.Categorical(match_index.away_teams[positions]),
+        'side': pd.Categorical.from_codes(sides, categories=['home', 'away']),
+    })
+    sequences = pd.concat([sequences, chains.drop(columns='match_id')], axis=1)
+
+    sequences['chain_normal'] = normal
+    sequences['chain_shot'] = normal & chains['has_shot'].to_numpy()
+    sequences['chain_att_third'] = normal & (chains['last_x'] > 80.0).to_numpy()
+    sequences['chain_in_box'] = normal & in_box.to_numpy()
+
+    return sequences
+
+
+def count_sequences(sequences):
+    """
+    Count the sequences of every class for the home and away team of every match.
+
+    Args:
+        sequences (pd.DataFrame): Output of ``build_sequence_table`` (or the saved sequence table).
+
+    Returns:
+        pd.DataFrame: One row per match, in order of appearance, with home_team, away_team and
+        the home and away count of every class.
+    """
+
+    matches = sequences[['match_id', 'home_team', 'away_team']].drop_duplicates('match_id')
+
+    counts = sequences.groupby(['match_id', 'side'], observed=True)[SEQUENCE_CLASSES].sum()
+
+    # Collect the number of sequences of the home and away team of each match
+    home_counts = counts.reindex(pd.MultiIndex.from_arrays([matches['match_id'], ['home'] * len(matches)]), fill_value=0)
+    away_counts = counts.reindex(pd.MultiIndex.from_arrays([matches['match_id'], ['away'] * len(matches)]), fill_value=0)
+
+    return pd.DataFrame({
+        'home_team': matches['home_team'].to_numpy(),
+        'away_team': matches['away_team'].to_numpy(),
+        **{f"home_{column}": home_counts[column].to_numpy() for column in SEQUENCE_CLASSES},
+        **{f"away_{column}": away_counts[column].to_numpy() for column in SEQUENCE_CLASSES},
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify every possession sequence and count the classes per match.")
+    parser.add_argument("--excel", action="store_true",
+                        help="Also export the per-match counts to Excel, at paths.output_sequence.")
+    args = parser.parse_args()
+
+    # Load configuration from config.yaml
+    with open("config/config.yaml", "r") as file:
+        config = yaml.safe_load(file)
+
+    input_parquet = config["paths"]["output"]
+    table_file = config["paths"].get("sequence_table", "data/processed/j_league_sequences.parquet")
+    counts_file = config["paths"].get("sequence_counts", "data/processed/j_league_sequence_counts.arrow")
+    excel_file = config["paths"].get("output_sequence", "data/processed/j_league_sequences.xlsx")
+
+    df = load_events(input_parquet, columns=SEQUENCE_EVENT_COLUMNS)
+
+    # One row per sequence, then the per-match counts derived from it
+    sequences = build_sequence_table(df)
+    write_results(sequences, table_file, {'table': 'sequences', 'classes': SEQUENCE_CLASSES})
+    print(f"✅ Sequence table saved to {table_file}")
+
+    counts = count_sequences(sequences)
+    write_results(counts, counts_file, {'table': 'sequence_counts', 'classes': SEQUENCE_CLASSES})
+    print(f"✅ Sequence counts saved to {counts_file}")
+    if args.excel:
+        counts.to_excel(excel_file, index=False)
+        print(f"✅ Excel export saved to {excel_file}")
+
+
+if __name__ == "__main__":
+    main()
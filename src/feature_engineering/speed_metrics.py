@@ -1,80 +1,200 @@
 import pandas as pd
 import numpy as np
 
-def calculate_speed_metrics(df):
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
+from src.feature_engineering.possession_chains import chain_offsets
+
+
+def event_clock(events):
+    """
+    Match clock of every event in seconds, at millisecond precision.
+
+    ``minute`` and ``second`` give the whole seconds of the match clock (continuous
+    over the periods); the milliseconds come from the fractional part of the
+    period ``timestamp`` (``HH:MM:SS.mmm``), or from ``period_seconds`` when the Arrow
+    backend has already parsed the timestamps. Events without a timestamp keep whole seconds.
+
+    Args:
+        events (pd.DataFrame): Processed J League events DataFrame.
+
+    Returns:
+        np.ndarray: Event times in seconds.
+    """
+
+    clock = events['minute'].to_numpy(dtype=float) * 60 + events['second'].to_numpy(dtype=float)
+
+    if 'period_seconds' in events.columns:
+        clock += np.nan_to_num(events['period_seconds'].to_numpy(dtype=float) % 1)
+    elif 'timestamp' in events.columns:
+        period_seconds = pd.to_timedelta(events['timestamp'], errors='coerce').dt.total_seconds().to_numpy()
+        clock += np.nan_to_num(period_seconds % 1)
+
+    return clock
+
+
+def sequence_speeds(match_index, offsets=None):
+    """
+    Compute the time, path length, progress and speeds of every possession sequence.
+
+    A sequence is a possession chain; its time and length run from its first event
+    to the first event after it in the match. All sequences are computed in one
+    vectorized pass over the chain-ordered events. Sequences with at least 4 events
+    and a finite, non-negative Direct Speed are flagged as ``kept``; only those
+    count in the team metrics.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+        offsets (tuple, optional): ``chain_offsets`` of ``match_index.events``.
+
+    Returns:
+        pd.DataFrame: One row per possession sequence with match_id, possession, possession_team.name,
+        n_events, time (s), length and progress (m), speed and direct_speed (m/s) and kept.
+    """
+
+    events = match_index.events
+
+    if offsets is None:
+        offsets = chain_offsets(events)
+    order, starts, stops = offsets
+
+    # Time and distance to the next event of the same match
+    same_match = match_index.event_positions[1:] == match_index.event_positions[:-1]
+
+    time = event_clock(events)
+    time_diff = np.full(len(events), np.nan)
+    time_diff[:-1] = np.where(same_match, time[1:] - time[:-1], np.nan)
+
+    ordinate = np.sqrt(events['x'].to_numpy(dtype=float)**2 + events['y'].to_numpy(dtype=float)**2)
+    distance = np.full(len(events), np.nan)
+    distance[:-1] = np.where(same_match, np.nan_to_num(np.abs(ordinate[1:] - ordinate[:-1])), np.nan)
+
+    x = events['x'].to_numpy(dtype=float)[order]
+
+    sequence_time = np.add.reduceat(np.nan_to_num(time_diff[order]), starts)
+    length = np.add.reduceat(np.nan_to_num(distance[order]), starts)
+    progress = x[stops - 1] - x[starts]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed = length / sequence_time
+        direct_speed = progress / sequence_time
+
+    first = order[starts]
+
+    return pd.DataFrame({
+        'match_id': events['match_id'].to_numpy()[first],
+        'possession': events['possession'].to_numpy()[first],
+        'possession_team.name': events['possession_team.name'].array[first],
+        'n_events': stops - starts,
+        'time': sequence_time,
+        'length': length,
+        'progress': progress,
+        'speed': speed,
+        'direct_speed': direct_speed,
+        'kept': ((stops - starts) >= 4) & (direct_speed >= 0) & ~np.isinf(direct_speed)
+    })
+
+
+def match_speed_metrics(match_index, offsets=None):
+    """
+    Sum the Speed and Direct Speed of the kept possession sequences of both teams in every match.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+        offsets (tuple, optional): ``chain_offsets`` of ``match_index.events``.
+
+    Returns:
+        pd.DataFrame: One row per match with home and away speed sums and sequence counts.
+    """
+
+    sequences = sequence_speeds(match_index, offsets)
+
+    positions = match_index.positions(sequences['match_id'])
+    sides = match_index.sides(positions, sequences['possession_team.name'])
+    keep = sequences['kept'].to_numpy()
+
+    home_speed, away_speed = match_index.side_totals(positions, sides, keep, sequences['speed'])
+    home_direct_speed, away_direct_speed = match_index.side_totals(positions, sides, keep, sequences['direct_speed'])
+    home_sequences, away_sequences = match_index.side_totals(positions, sides, keep)
+
+    return match_index.match_frame(
+        home_speed=home_speed,
+        away_speed=away_speed,
+        home_direct_speed=home_direct_speed,
+        away_direct_speed=away_direct_speed,
+        home_speed_sequences=home_sequences,
+        away_speed_sequences=away_sequences
+    )
+
+
+def aggregate_speed_metrics(speed_df):
+    """
+    Average the sequence speeds of every team over the season.
+
+    Args:
+        speed_df (pd.DataFrame): Output of ``match_speed_metrics``.
+
+    Returns:
+        pd.DataFrame: DataFrame with Speed and Direct Speed metrics.
+    """
+
+    columns = {'direct_speed': 'Direct Speed', 'speed': 'Speed', 'speed_sequences': 'Sequences'}
+
+    home_data = speed_df[['home_team'] + ['home_' + c for c in columns]].copy()
+    home_data.columns = ['Team'] + list(columns.values())
+
+    away_data = speed_df[['away_team'] + ['away_' + c for c in columns]].copy()
+    away_data.columns = ['Team'] + list(columns.values())
+
+    result = pd.concat([home_data, away_data], ignore_index = True)
+
+    a = result.groupby('Team')[list(columns.values())].sum()
+    a = a.loc[a['Sequences'] > 0]
+
+    a['Direct Speed'] = a['Direct Speed'] / a['Sequences']
+    a['Speed'] = a['Speed'] / a['Sequences']
+
+    a = a[['Direct Speed', 'Speed']].reset_index()
+
+    a.columns = ['Team', 'Direct Speed Upfield(m/s)', 'Speed']
+
+    return a
+
+
+def calculate_speed_metrics(df, match_index=None):
     """
     Calculate Speed and Direct Speed for each team.
-    
-    Speed: The speed of ball movement during a possession sequence. 
+
+    Speed: The speed of ball movement during a possession sequence.
     Direct Speed: The average speed of ball progression towards the opponent’s goal.
-    
+
     Args:
         df (pd.DataFrame): Processed J League events DataFrame.
-    
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+
     Returns:
         pd.DataFrame: DataFrame with Speed and Direct Speed metrics.
     """
 
-    # Fill missing values and replace None or NaN with "Complete"
-    df['pass.outcome.name'] = df['pass.outcome.name'].fillna("Complete").replace({None: "Complete"})
-
-    df_events = df.copy()
-
-    match_ids = df_events["match_id"].unique()
-
-    chains_data = []
-
-    for match_id in match_ids:
-        df_match = df_events[df_events["match_id"] == match_id]
-        
-        df_match['Time'] = df_match['minute'] * 60 + df_match['second']
-        df_match['Time_diff'] = df_match['Time'].diff()
-        df_match['Time_diff'].fillna(0, inplace = True)
-        df_match["Time_diff"] = df_match["Time_diff"].shift(-1)
-        
-        df_match['ordinate'] = np.sqrt(df_match['x']**2 + df['y']**2)
-        df_match['distance'] = np.abs(df_match['ordinate'].diff())
-        df_match['distance'].fillna(0, inplace = True)
-        df_match["distance"] = df_match["distance"].shift(-1)
-        
-        chains = pd.DataFrame()
-        for v in df_match.possession.unique():
-            chain = df_match.loc[df_match["possession"] == v]
-            chain['Sequence Time'] = chain['Time_diff'].sum()
-            
-            chain['Progress'] = chain.iloc[-1].x - chain.iloc[0].x
-            
-            chain['Length'] = chain['distance'].sum()
-            
-            
-            chain['Speed'] = chain['Length'] / chain['Sequence Time']
-            chain['Direct Speed'] = chain['Progress'] / chain['Sequence Time']
-            
-            
-            if chain.shape[0] >= 4:  
-                
-                chains = pd.concat([chains, chain], ignore_index=True)
-            
-        chains_data.append(chains)
-            
-    chains_data = pd.concat(chains_data) 
-
-    ch = chains_data.groupby(['match_id', 'possession', 'possession_team.name']).agg({
-    'Speed': 'first',           # Take the first value of speed for each group
-    'Direct Speed': 'first'     # Take the first value of direct_speed for each group
-    }).reset_index()
-
-    ch_pos = ch.loc[ch["Direct Speed"] >= 0]
-    pass_counts = chains_data[chains_data['type.name'] == 'Pass'].groupby(['possession','possession_team.name', 'match_id'])['type.name'].count().reset_index()
-    r = ch_pos.merge(pass_counts, on=['match_id', 'possession', 'possession_team.name'], how = 'left')
-    r_filter = r[~np.isinf(r['Direct Speed'])]
-    a = r_filter.groupby(['possession_team.name']).agg({
-        'Direct Speed': 'mean',           # Take the first value of speed for each group
-        'Speed': 'mean',
-    }).reset_index()
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
 
+    return aggregate_speed_metrics(match_speed_metrics(match_index))
 
-    a.columns = ['Team', 'Direct Speed Upfield(m/s)', 'Speed']
 
-    return a
+def calculate_sequence_speeds(df, match_index=None):
+    """
+    Calculate the speed records of every possession sequence.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+
+    Returns:
+        pd.DataFrame: One row per possession sequence, see ``sequence_speeds``.
+    """
+
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
 
+    return sequence_speeds(match_index)
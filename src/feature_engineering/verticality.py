@@ -1,44 +1,150 @@
 import pandas as pd
 import numpy as np
 
-def calculate_avg_verticality(df):
-    """
-    Calculate Average Verticality for each team.
+from src.feature_engineering.match_index import MatchIndex
+from src.feature_engineering.normalize import normalize_events
 
-    The ratio of forward progression to total pass distance, representing the directness of ball movement towards opponent’s goal.
+def pass_verticality(match_index):
+    """
+    Completed passes and the verticality of every event, shared by the team and player stages.
 
     Args:
-        df (pd.DataFrame): Processed J League events DataFrame.
-    
+        match_index (MatchIndex): Per-match partition of the normalized events.
+
     Returns:
-        pd.DataFrame: DataFrame with Average Verticality for each team.
+        tuple: Mask of the completed passes and the verticality of every event (0 without a distance).
     """
 
-    # Fill missing values and replace None or NaN with "Complete"
-    df['pass.outcome.name'] = df['pass.outcome.name'].fillna("Complete").replace({None: "Complete"})
+    events = match_index.events
 
-    df_events = df.copy()
+    passes = match_index.event_mask('type.name', 'Pass') & events['pass_complete'].to_numpy()
 
-    passes = df_events[(df_events['type.name'] == 'Pass') & (df_events['pass.outcome.name'] == 'Complete')]
+    x = events['x'].to_numpy(dtype=float)
+    y = events['y'].to_numpy(dtype=float)
+    pass_end_x = events['pass_end_x'].to_numpy(dtype=float)
+    pass_end_y = events['pass_end_y'].to_numpy(dtype=float)
 
     # Calculate forward progression and total distance of passes
-    passes['forward_progress'] = passes['pass_end_x'] - passes['x']  # Forward movement (x-direction)
-    passes['total_distance'] = np.sqrt((passes['pass_end_x'] - passes['x'])**2 + (passes['pass_end_y'] - passes['y'])**2)  # Euclidean distance
+    forward_progress = pass_end_x - x  # Forward movement (x-direction)
+    total_distance = np.sqrt((pass_end_x - x)**2 + (pass_end_y - y)**2)  # Euclidean distance
 
     # Calculate verticality as the ratio of forward progress to total distance
-    passes['verticality'] = passes['forward_progress'] / passes['total_distance']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        verticality = forward_progress / total_distance
 
     # Ensure no division by zero (in case of any total_distance being zero)
-    passes['verticality'] = passes['verticality'].fillna(0)
+    verticality = np.where(np.isnan(verticality), 0.0, verticality)
+
+    return passes, verticality
+
+
+def match_verticality(match_index):
+    """
+    Sum the verticality of the completed passes of both teams in every match.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+
+    Returns:
+        pd.DataFrame: One row per match with home and away verticality sums and pass counts.
+    """
+
+    passes, verticality = pass_verticality(match_index)
+
+    home_verticality, away_verticality = match_index.event_totals(passes, weights=verticality)
+    home_passes, away_passes = match_index.event_totals(passes)
+
+    return match_index.match_frame(
+        home_verticality=home_verticality,
+        away_verticality=away_verticality,
+        home_complete_passes=home_passes,
+        away_complete_passes=away_passes
+    )
+
+
+def match_player_verticality(match_index):
+    """
+    Sum the verticality of the completed passes of every player in every match.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+
+    Returns:
+        pd.DataFrame: One row per match, team and player with verticality sums and pass counts.
+    """
+
+    passes, verticality = pass_verticality(match_index)
+
+    return match_index.player_frame(
+        verticality=match_index.player_totals(passes, weights=verticality),
+        complete_passes=match_index.player_totals(passes)
+    )
+
+
+def aggregate_verticality(verticality_df):
+    """
+    Average the verticality of every team's completed passes over the season.
+
+    Args:
+        verticality_df (pd.DataFrame): Output of ``match_verticality``.
+
+    Returns:
+        pd.DataFrame: DataFrame with Average Verticality for each team.
+    """
+
+    home_data = verticality_df[['home_team', 'home_verticality', 'home_complete_passes']].copy()
+    home_data.columns = ['Team', 'verticality', 'passes']
+
+    away_data = verticality_df[['away_team', 'away_verticality', 'away_complete_passes']].copy()
+    away_data.columns = ['Team', 'verticality', 'passes']
 
     # Aggregate verticality by team
-    team_verticality = passes.groupby('team.name')['verticality'].mean().reset_index()
-    team_verticality.columns = ['team.name', 'average_verticality']
+    team_verticality = pd.concat([home_data, away_data], ignore_index = True).groupby('Team').sum()
+    team_verticality = team_verticality.loc[team_verticality['passes'] > 0]
+
+    team_verticality['average_verticality'] = team_verticality['verticality'] / team_verticality['passes']
 
-    team_verticality.rename(columns = {'team.name': 'Team'}, inplace = True)
+    team_verticality = team_verticality[['average_verticality']].reset_index()
 
     team_verticality['average_verticality'] = team_verticality['average_verticality'].round(3)
 
     team_verticality = team_verticality.sort_values(by='average_verticality', ascending=False)
-    
-    return team_verticality 
+
+    return team_verticality
+
+
+def aggregate_player_verticality(player_df):
+    """
+    Average the verticality of every player's completed passes over the season.
+
+    Args:
+        player_df (pd.DataFrame): Output of ``match_player_verticality``.
+
+    Returns:
+        pd.DataFrame: DataFrame with Average Verticality for each team and player (NaN without completed passes).
+    """
+
+    totals = player_df.groupby(['Team', 'Player'], sort=False)[['verticality', 'complete_passes']].sum()
+    average = totals['verticality'] / totals['complete_passes'].where(totals['complete_passes'] > 0)
+
+    return average.round(3).rename('average_verticality').reset_index()
+
+
+def calculate_avg_verticality(df, match_index=None):
+    """
+    Calculate Average Verticality for each team.
+
+    The ratio of forward progression to total pass distance, representing the directness of ball movement towards opponent’s goal.
+
+    Args:
+        df (pd.DataFrame): Processed J League events DataFrame.
+        match_index (MatchIndex, optional): Per-match partition of the normalized ``df``. Built from ``df`` when not given.
+
+    Returns:
+        pd.DataFrame: DataFrame with Average Verticality for each team.
+    """
+
+    if match_index is None:
+        match_index = MatchIndex(normalize_events(df))
+
+    return aggregate_verticality(match_verticality(match_index))
@@ -0,0 +1,185 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# One column of the windowed metrics table, read from the match table:
+# - name: column name (as in the season metrics table),
+# - home, away: match table columns with the value of the home and away team,
+# - reduction: 'mean' of the match values, 'ratio' of the summed values over the summed
+#   ``home_den``/``away_den`` columns, or 'sum' of the match values,
+# - match_decimals: rounding applied to every match value first (as the season aggregate does),
+# - decimals: rounding of the windowed value,
+# - required: (home, away) column pairs whose window sums must be positive for a value.
+WindowColumn = namedtuple(
+    'WindowColumn',
+    ['name', 'home', 'away', 'reduction', 'home_den', 'away_den', 'match_decimals', 'decimals', 'required'],
+    defaults=(None, None, None, None, ())
+)
+
+WINDOW_COLUMNS = [
+    WindowColumn('Possession', 'home_possession', 'away_possession', 'mean', decimals=2),
+    WindowColumn('PPDA', 'home_ppda', 'away_ppda', 'mean', match_decimals=3, decimals=3),
+    WindowColumn('Field_tilt', 'home_tilt', 'away_tilt', 'mean', decimals=2),
+    WindowColumn('Maintain (%)', 'home_maintain', 'away_maintain', 'mean', match_decimals=2, decimals=2),
+    WindowColumn('Buildup (%)', 'home_build', 'away_build', 'mean', match_decimals=2, decimals=2),
+    WindowColumn('Sustain (%)', 'home_sustain', 'away_sustain', 'mean', match_decimals=2, decimals=2),
+    WindowColumn('Direct Speed Upfield(m/s)', 'home_direct_speed', 'away_direct_speed', 'ratio',
+                 'home_speed_sequences', 'away_speed_sequences'),
+    WindowColumn('Speed', 'home_speed', 'away_speed', 'ratio', 'home_speed_sequences', 'away_speed_sequences'),
+    WindowColumn('Passes_per_sequence', 'home_possession_passes', 'away_possession_passes', 'ratio',
+                 'home_possession_chains', 'away_possession_chains', decimals=2,
+                 required=[('home_possession_passes', 'away_possession_passes')]),
+    WindowColumn('Att. Passes_per_sequence', 'home_shot_chain_passes', 'away_shot_chain_passes', 'ratio',
+                 'home_shot_chains', 'away_shot_chains', decimals=2,
+                 required=[('home_shot_chain_passes', 'away_shot_chain_passes')]),
+    WindowColumn('average_verticality', 'home_verticality', 'away_verticality', 'ratio',
+                 'home_complete_passes', 'away_complete_passes', decimals=3),
+    WindowColumn('Def Height', 'home_height', 'away_height', 'mean', decimals=3),
+    WindowColumn('Pressure', 'away_possession_home_pressure', 'home_possession_away_pressure', 'mean', decimals=2),
+    WindowColumn('Direct Attacks', 'home_direct_attacks', 'away_direct_attacks', 'sum',
+                 required=[('home_buildup_attacks', 'away_buildup_attacks'), ('home_direct_attacks', 'away_direct_attacks')]),
+    WindowColumn('Buildup Attacks', 'home_buildup_attacks', 'away_buildup_attacks', 'sum',
+                 required=[('home_buildup_attacks', 'away_buildup_attacks'), ('home_direct_attacks_10', 'away_direct_attacks_10')]),
+    WindowColumn('Direct Attacks_10', 'home_direct_attacks_10', 'away_direct_attacks_10', 'sum',
+                 required=[('home_buildup_attacks', 'away_buildup_attacks'), ('home_direct_attacks_10', 'away_direct_attacks_10')]),
+]
+
+
+def _with_field_tilt(match_table):
+    """Add the match Field Tilt of both teams, rounded as in ``aggregate_field_tilt``."""
+    attt = match_table['home_attt'] + match_table['away_attt']
+    return match_table.assign(
+        home_tilt=(match_table['home_attt'] / attt).round(2) * 100,
+        away_tilt=(match_table['away_attt'] / attt).round(2) * 100
+    )
+
+
+class _TeamWeekGrid:
+    """Dense (team, match week) grid the match values of both sides are summed into."""
+
+    def __init__(self, match_table):
+        teams = pd.concat([match_table['home_team'], match_table['away_team']], ignore_index=True)
+        self.team_codes, self.teams = pd.factorize(teams, sort=True)
+
+        weeks = pd.concat([match_table['Match Week'], match_table['Match Week']], ignore_index=True).to_numpy()
+        self.first_week = int(weeks.min())
+        self.weeks = np.arange(self.first_week, int(weeks.max()) + 1)
+        self.week_codes = weeks.astype(np.int64) - self.first_week
+
+    def sum(self, match_table, home, away, decimals=None, present=False):
+        """Sum the home and away values of every team in every match week (NaN counts as 0)."""
+        values = pd.concat([match_table[home], match_table[away]], ignore_index=True).to_numpy(dtype=float)
+        if decimals is not None:
+            values = np.round(values, decimals)
+        if present:
+            values = (~np.isnan(values)).astype(float)
+
+        grid = np.zeros((len(self.teams), len(self.weeks)))
+        np.add.at(grid, (self.team_codes, self.week_codes), np.nan_to_num(values))
+        return grid
+
+    def matches(self):
+        """Number of matches of every team in every match week."""
+        grid = np.zeros((len(self.teams), len(self.weeks)))
+        np.add.at(grid, (self.team_codes, self.week_codes), 1.0)
+        return grid
+
+
+def _last_n(cumulative, n):
+    """Sums over the last ``n`` match weeks from the cumulative sums along the week axis."""
+    shifted = np.zeros_like(cumulative)
+    shifted[:, n:] = cumulative[:, :-n]
+    return cumulative - shifted
+
+
+def _exponential(grid, decay):
+    """Exponentially decayed sums along the week axis, one recursion step per week."""
+    weighted = np.empty_like(grid)
+    running = np.zeros(grid.shape[0])
+    for week in range(grid.shape[1]):
+        running = running * decay + grid[:, week]
+        weighted[:, week] = running
+    return weighted
+
+
+def compute_windowed_team_metrics(match_table, last_n=(5,), halflife=3.0, names=None):
+    """
+    Turn the match table into per-team time series of every metric over the match weeks.
+
+    The home and away values of every metric are summed into a dense (team, match week)
+    grid once. Every window is derived from that grid in one pass:
+
+    - ``last_<n>``: the last ``n`` match weeks, a difference of cumulative sums.
+    - ``expanding``: all match weeks so far, the cumulative sums.
+    - ``ewm``: match weeks weighted by ``0.5 ** (age / halflife)``, a decayed running sum.
+
+    Mean metrics divide the window sum of the match values by the number of matches
+    with a value, ratio metrics divide the window sums of numerator and denominator,
+    and count metrics report the (decayed) window sum. The expanding window at the
+    last match week reproduces the season metrics table, up to floating point ties
+    when a value is rounded.
+
+    Args:
+        match_table (pd.DataFrame): Output of ``build_match_table``.
+        last_n (tuple): Lengths of the last-N match week windows.
+        halflife (float): Half-life, in match weeks, of the exponential weights.
+        names (list, optional): Names of the ``WINDOW_COLUMNS`` to compute (e.g. the outputs
+            of the metrics in ``match_table``), all of them when None.
+
+    Returns:
+        pd.DataFrame: One row per team, match week and window with every metric.
+    """
+
+    window_columns = [column for column in WINDOW_COLUMNS if names is None or column.name in names]
+
+    if 'home_attt' in match_table.columns:
+        match_table = _with_field_tilt(match_table)
+    grid = _TeamWeekGrid(match_table)
+
+    windows = [f"last_{n}" for n in last_n] + ['expanding', 'ewm']
+    decay = 0.5 ** (1 / halflife)
+
+    def windowed(values):
+        cumulative = np.cumsum(values, axis=1)
+        return [_last_n(cumulative, n) for n in last_n] + [cumulative, _exponential(values, decay)]
+
+    columns = {}
+    for column in window_columns:
+        numerator = windowed(grid.sum(match_table, column.home, column.away, column.match_decimals))
+
+        if column.reduction == 'mean':
+            denominator = windowed(grid.sum(match_table, column.home, column.away, present=True))
+        elif column.reduction == 'ratio':
+            denominator = windowed(grid.sum(match_table, column.home_den, column.away_den))
+        else:
+            denominator = None
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if denominator is None:
+                values = numerator
+            else:
+                values = [np.where(den > 0, num / den, np.nan) for num, den in zip(numerator, denominator)]
+
+        for home, away in column.required:
+            required = windowed(grid.sum(match_table, home, away))
+            values = [np.where(req > 0, value, np.nan) for value, req in zip(values, required)]
+
+        if column.decimals is not None:
+            values = [np.round(value, column.decimals) for value in values]
+
+        columns[column.name] = np.stack(values)
+
+    # Rows in (window, team, week) order, then only the weeks where a team has played
+    n_teams, n_weeks = len(grid.teams), len(grid.weeks)
+    windowed_df = pd.DataFrame({
+        'Team': np.tile(np.repeat(grid.teams, n_weeks), len(windows)),
+        'Match Week': np.tile(grid.weeks, n_teams * len(windows)),
+        'Window': np.repeat(windows, n_teams * n_weeks),
+        **{name: values.ravel() for name, values in columns.items()}
+    })
+
+    played = np.cumsum(grid.matches(), axis=1) > 0
+    windowed_df = windowed_df.loc[np.tile(played.ravel(), len(windows))].reset_index(drop=True)
+
+    return windowed_df
@@ -0,0 +1,141 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering.pitch_grid import in_range, in_region
+
+# A pitch zone of passes: the ranges (``pd.Interval``, closed as declared) the start
+# (x, y) and end (pass_end_x, pass_end_y) coordinates must fall in, and the named
+# ``pitch_grid.REGIONS`` the start (region) and end (end_region) location must be in.
+# None is any value.
+Zone = namedtuple(
+    'Zone',
+    ['name', 'start_x', 'end_x', 'start_y', 'end_y', 'start_region', 'end_region'],
+    defaults=(None, None, None, None, None, None)
+)
+
+# A family of zones evaluated together:
+# - name: name of the family total (all passes),
+# - zones: the ``Zone`` rules of the family,
+# - side_column: team column the passes are credited to,
+# - weight: event column summed per team, None to count the passes.
+ZoneFamily = namedtuple('ZoneFamily', ['name', 'zones', 'side_column', 'weight'])
+
+MAINTAIN_BUILDUP_SUSTAIN = ZoneFamily(
+    'pass_duration',
+    [
+        Zone('maintain', start_region='own_half', end_region='own_half'),
+        Zone('build', start_region='opponent_half', end_x=pd.Interval(-np.inf, 102.0, closed='neither')),
+        Zone('sustain', start_x=pd.Interval(90.0, np.inf, closed='neither'), end_x=pd.Interval(90.0, np.inf, closed='neither')),
+    ],
+    side_column='possession_team.name',
+    weight='duration'
+)
+
+FIELD_TILT = ZoneFamily(
+    'passes',
+    [Zone('attt', end_region='attacking_third')],
+    side_column='team.name',
+    weight=None
+)
+
+# Zone families computed in the shared zone pass of the metrics engine
+ZONE_FAMILIES = [FIELD_TILT, MAINTAIN_BUILDUP_SUSTAIN]
+
+
+def pass_locations(match_index, passes):
+    """
+    Coordinates and region IDs of passes, keyed by the ``Zone`` fields they are tested against.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+        passes (np.ndarray): Positions of the passes in ``match_index.events``.
+
+    Returns:
+        tuple: Dicts of the start and end coordinates and of the start and end region IDs.
+    """
+
+    events = match_index.events
+
+    coordinates = {
+        field: events[column].to_numpy(dtype=float)[passes]
+        for field, column in [('start_x', 'x'), ('end_x', 'pass_end_x'), ('start_y', 'y'), ('end_y', 'pass_end_y')]
+    }
+    regions = {'start_region': events['region'].to_numpy()[passes], 'end_region': events['end_region'].to_numpy()[passes]}
+
+    return coordinates, regions
+
+
+def zone_mask(zone, coordinates, regions):
+    """Mask of the passes in ``zone``, from their ``pass_locations``."""
+    mask = np.ones(len(next(iter(coordinates.values()))), dtype=bool)
+    for field, values in coordinates.items():
+        interval = getattr(zone, field)
+        if interval is not None:
+            mask &= in_range(values, interval)
+    for field, ids in regions.items():
+        name = getattr(zone, field)
+        if name is not None:
+            mask &= in_region(ids, name)
+    return mask
+
+
+def zone_totals(match_index, families=ZONE_FAMILIES):
+    """
+    Count (or sum the weight of) the passes of both teams in every zone of every match.
+
+    The coordinates and region IDs of all passes are read once, and every zone rule is
+    evaluated as a vectorized mask over the passes of all matches, so a new zone or zone family
+    adds a mask and a bincount but no pass over the events.
+
+    Args:
+        match_index (MatchIndex): Per-match partition of the normalized events.
+        families (list): ``ZoneFamily`` configurations to evaluate.
+
+    Returns:
+        pd.DataFrame: One row per match with ``home_<zone>``/``away_<zone>`` totals of every zone
+        and ``home_<family>``/``away_<family>`` totals of all passes of every family.
+    """
+
+    events = match_index.events
+
+    passes = np.flatnonzero(match_index.event_mask('type.name', 'Pass'))
+    positions = match_index.event_positions[passes]
+
+    coordinates, regions = pass_locations(match_index, passes)
+
+    columns = {}
+    for family in families:
+        sides = match_index.event_sides(family.side_column)[passes]
+        weights = None if family.weight is None else events[family.weight].to_numpy(dtype=float)[passes]
+
+        columns[f"home_{family.name}"], columns[f"away_{family.name}"] = match_index.side_totals(positions, sides, weights=weights)
+
+        for zone in family.zones:
+            mask = zone_mask(zone, coordinates, regions)
+            columns[f"home_{zone.name}"], columns[f"away_{zone.name}"] = match_index.side_totals(positions, sides, mask, weights)
+
+    return match_index.match_frame(**columns)
+
+
+def zone_shares(totals, family):
+    """
+    Turn the zone totals of a family into shares (%) of the family total of both teams.
+
+    Args:
+        totals (pd.DataFrame): Output of ``zone_totals``.
+        family (ZoneFamily): Family of the zones.
+
+    Returns:
+        dict: ``home_<zone>``/``away_<zone>`` shares of every zone of the family.
+    """
+
+    total = totals[f"home_{family.name}"].to_numpy() + totals[f"away_{family.name}"].to_numpy()
+
+    shares = {}
+    for zone in family.zones:
+        for side in ('home', 'away'):
+            shares[f"{side}_{zone.name}"] = totals[f"{side}_{zone.name}"].to_numpy() / total * 100
+
+    return shares
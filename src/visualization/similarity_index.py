@@ -0,0 +1,327 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from src.feature_engineering.results_store import read_results, read_results_metadata, write_results
+
+# Columns identifying a row of a metrics table (competition and season only in batch outputs,
+# Player only in player-level outputs)
+KEY_COLUMNS = ['competition', 'season', 'Team', 'Player']
+
+# Numeric columns describing a row rather than its style (matches played in the player table), never compared
+NON_FEATURE_COLUMNS = ['Matches']
+
+# Files of a persisted index
+VECTORS_FILE = 'vectors.npy'
+KEYS_FILE = 'keys.arrow'
+
+
+class SimilarityIndex:
+    """
+    Top-k cosine similarity index over team (or team-season) metric vectors.
+
+    Every metric is standardized with the mean and scale of the table the index was
+    built from, and every vector is then scaled to unit length, once; the cosine
+    similarity of two rows is the dot product of their normalized vectors. Queries
+    scan the normalized matrix in blocks of ``block_size`` rows with one matrix
+    product per block, keeping only the running top-k, so memory stays bounded by
+    the block and not by the catalogue squared.
+
+    ``add`` normalizes new rows with the stored mean and scale, so the existing
+    vectors are never recomputed; ``build`` a new index to refit them when the
+    catalogue has drifted.
+
+    Args:
+        keys (pd.DataFrame): Key columns of every row (see ``KEY_COLUMNS``).
+        vectors (np.ndarray): Normalized vectors, one row per key.
+        features (list): Metric columns of the vectors.
+        mean (np.ndarray): Mean of every metric.
+        scale (np.ndarray): Standard deviation of every metric (1 for constant metrics).
+        block_size (int): Rows of the matrix scanned per matrix product.
+    """
+
+    def __init__(self, keys, vectors, features, mean, scale, block_size=4096):
+        self.keys = keys.reset_index(drop=True)
+        self.vectors = vectors
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.block_size = block_size
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, metrics, features=None, block_size=4096):
+        """
+        Build an index from a metrics table.
+
+        Args:
+            metrics (pd.DataFrame): Team metrics, one row per team (or competition, season and team).
+            features (list, optional): Metric columns to compare, every numeric column but the
+                ``KEY_COLUMNS`` and ``NON_FEATURE_COLUMNS`` when None.
+            block_size (int): Rows of the matrix scanned per matrix product.
+
+        Returns:
+            SimilarityIndex: The index of every row of ``metrics``.
+        """
+
+        key_columns = [column for column in KEY_COLUMNS if column in metrics.columns]
+        if features is None:
+            features = [
+                column for column in metrics.select_dtypes(include='number').columns
+                if column not in key_columns + NON_FEATURE_COLUMNS
+            ]
+
+        values = metrics[features].to_numpy(dtype=np.float64)
+        mean = np.nanmean(values, axis=0)
+        scale = np.nanstd(values, axis=0)
+        scale[~(scale > 0)] = 1.0
+
+        index = cls(metrics[key_columns].iloc[:0], np.empty((0, len(features)), dtype=np.float32),
+                    features, mean, scale, block_size)
+        index.add(metrics)
+        return index
+
+    def normalize(self, metrics):
+        """Standardize the metric columns of ``metrics`` with the index statistics and scale every row to unit length."""
+        missing = [column for column in self.features if column not in metrics.columns]
+        if missing:
+            raise ValueError(f"Metrics miss the indexed columns {', '.join(missing)}.")
+
+        # Missing metrics sit at the index mean, they do not move the similarity
+        standardized = np.nan_to_num((metrics[self.features].to_numpy(dtype=np.float64) - self.mean) / self.scale)
+        norms = np.linalg.norm(standardized, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (standardized / norms).astype(np.float32)
+
+    def add(self, metrics, replace=False):
+        """
+        Add the rows of a metrics table to the index, e.g. a new team-season.
+
+        Args:
+            metrics (pd.DataFrame): Rows with the key columns of the index and its metric columns.
+            replace (bool): Replace rows whose key is already indexed instead of failing.
+
+        Raises:
+            ValueError: If ``metrics`` misses a key column of the index, or a key is already
+                indexed and ``replace`` is False.
+        """
+
+        missing = [column for column in self.keys.columns if column not in metrics.columns]
+        if missing:
+            raise ValueError(f"Metrics miss the key columns {', '.join(missing)} of the index.")
+
+        keys = metrics[list(self.keys.columns)].reset_index(drop=True)
+        if keys.duplicated().any():
+            raise ValueError("Metrics have duplicate keys.")
+
+        existing = self._positions(keys)
+        if (existing >= 0).any() and not replace:
+            duplicates = keys.loc[existing >= 0].astype(str).agg(' '.join, axis=1).tolist()
+            raise ValueError(f"Already indexed: {', '.join(duplicates)}.")
+
+        vectors = self.normalize(metrics)
+        kept = existing < 0
+        self.vectors = np.asarray(self.vectors)
+        if not kept.all():
+            self.vectors = self.vectors.copy()
+            self.vectors[existing[~kept]] = vectors[~kept]
+
+        self.keys = pd.concat([self.keys, keys.loc[kept]], ignore_index=True)
+        self.vectors = np.concatenate([self.vectors, vectors[kept]])
+
+    def _positions(self, keys):
+        """Row of every key in the index, -1 when not indexed."""
+        if not len(self.keys):
+            return np.full(len(keys), -1)
+        indexed = pd.MultiIndex.from_frame(self.keys.astype(str))
+        return indexed.get_indexer(pd.MultiIndex.from_frame(keys[list(self.keys.columns)].astype(str)))
+
+    def locate(self, **key):
+        """
+        Row of the index matching the given key values, e.g. ``locate(Team='Team A', season='2024')``.
+
+        Raises:
+            ValueError: If no row or more than one row matches.
+        """
+
+        mask = np.ones(len(self.keys), dtype=bool)
+        for column, value in key.items():
+            if value is not None:
+                mask &= self.keys[column].astype(str).to_numpy() == str(value)
+
+        rows = np.flatnonzero(mask)
+        if len(rows) != 1:
+            found = 'No' if not len(rows) else f"{len(rows)}"
+            raise ValueError(f"{found} indexed rows match {key}, give more of {', '.join(self.keys.columns)}.")
+        return int(rows[0])
+
+    def search(self, queries, k=10, exclude=None):
+        """
+        The ``k`` most similar indexed rows of every query vector, by blocked matrix products.
+
+        Args:
+            queries (np.ndarray): Normalized query vectors (``normalize``), one per row.
+            k (int): Number of neighbours per query.
+            exclude (np.ndarray, optional): Index row to leave out of the results of every query
+                (the query itself), -1 for none.
+
+        Returns:
+            tuple: (rows, scores), both queries x k arrays sorted by decreasing similarity.
+        """
+
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, len(self) - (exclude is not None))
+        n_queries = len(queries)
+        if k < 1:
+            return np.empty((n_queries, 0), dtype=np.int64), np.empty((n_queries, 0), dtype=np.float32)
+
+        best_scores = np.full((n_queries, 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((n_queries, 0), dtype=np.int64)
+
+        for start in range(0, len(self), self.block_size):
+            block = np.asarray(self.vectors[start:start + self.block_size])
+            scores = queries @ block.T
+            rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+
+            if exclude is not None:
+                scores = np.where(rows == np.asarray(exclude)[:, None], -np.inf, scores)
+
+            # Running top-k: merge the block with the best rows so far and keep k
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_scores, best_rows = scores, rows
+
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def most_similar(self, k=10, **key):
+        """
+        The ``k`` indexed rows most similar to an indexed row.
+
+        Args:
+            k (int): Number of neighbours.
+            **key: Key values of the row, e.g. ``Team='Team A', season='2024'``.
+
+        Returns:
+            pd.DataFrame: Keys of the neighbours with their cosine ``similarity``, most similar first.
+        """
+
+        row = self.locate(**key)
+        rows, scores = self.search(self.vectors[row:row + 1], k, exclude=np.array([row]))
+        return self.keys.iloc[rows[0]].assign(similarity=scores[0]).reset_index(drop=True)
+
+    def save(self, index_dir):
+        """
+        Persist the index: the normalized matrix as ``vectors.npy`` (memory-mapped by ``load``)
+        and the keys with the features, mean and scale in ``keys.arrow``.
+
+        Files are written to temporary names and renamed, so neither file is ever partial;
+        ``keys.arrow`` also stores the row count, so ``load`` detects a ``vectors.npy`` of
+        another save (a load between the two renames) instead of returning wrong rows.
+        """
+
+        os.makedirs(index_dir, exist_ok=True)
+
+        vectors_path = os.path.join(index_dir, VECTORS_FILE)
+        with open(f"{vectors_path}.part", 'wb') as file:
+            np.save(file, np.asarray(self.vectors, dtype=np.float32))
+
+        keys_path = os.path.join(index_dir, KEYS_FILE)
+        write_results(self.keys, f"{keys_path}.part.arrow", {
+            'table': 'similarity_index', 'rows': len(self), 'features': self.features,
+            'mean': self.mean.tolist(), 'scale': self.scale.tolist()
+        })
+
+        os.replace(f"{vectors_path}.part", vectors_path)
+        os.replace(f"{keys_path}.part.arrow", keys_path)
+
+    @classmethod
+    def load(cls, index_dir, block_size=4096):
+        """
+        Load a persisted index, the normalized matrix is memory-mapped rather than read.
+
+        Raises:
+            ValueError: If the vectors and keys come from different saves (e.g. a save in progress).
+        """
+
+        keys_path = os.path.join(index_dir, KEYS_FILE)
+        metadata = read_results_metadata(keys_path)
+        vectors = np.load(os.path.join(index_dir, VECTORS_FILE), mmap_mode='r')
+        if len(vectors) != metadata.get('rows', len(vectors)):
+            raise ValueError(f"{index_dir} has {len(vectors)} vectors for {metadata['rows']} keys, "
+                             f"it is being saved; load it again.")
+        return cls(read_results(keys_path), vectors, metadata['features'], metadata['mean'], metadata['scale'],
+                   block_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, extend and query the top-k team style similarity index.")
+    parser.add_argument("--index-dir",
+                        help="Directory of the index. Defaults to paths.similarity_index in the config, "
+                             "or data/processed/similarity_index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build the index from a metrics table (replaces the index).")
+    build.add_argument("--metrics", help="Metrics table. Defaults to paths.metrics_results in the config.")
+
+    add = commands.add_parser("add", help="Add the rows of a metrics table, e.g. a new team-season.")
+    add.add_argument("metrics", help="Metrics table with the new rows.")
+    add.add_argument("--replace", action="store_true", help="Replace rows that are already indexed.")
+    add.add_argument("--season", help="Season of every row, for a single-season table without a season column.")
+    add.add_argument("--competition",
+                     help="Competition of every row, for a single-competition table without a competition column.")
+
+    query = commands.add_parser("query", help="Print the teams most similar to a team.")
+    query.add_argument("team", help="Team name.")
+    query.add_argument("--season", help="Season of the team, when the index has several.")
+    query.add_argument("--competition", help="Competition of the team, when the index has several.")
+    query.add_argument("--player", help="Player of the team, for an index of player metrics.")
+    query.add_argument("-k", type=int, default=10, help="Number of similar teams.")
+    args = parser.parse_args()
+
+    # Load configuration from config.yaml
+    with open("config/config.yaml", "r") as file:
+        config = yaml.safe_load(file)
+
+    index_dir = args.index_dir or config["paths"].get("similarity_index", "data/processed/similarity_index")
+
+    try:
+        if args.command == "build":
+            metrics_file = args.metrics or config["paths"].get("metrics_results", "data/processed/j_league_metrics.arrow")
+            index = SimilarityIndex.build(read_results(metrics_file))
+            index.save(index_dir)
+            print(f"✅ Similarity index of {len(index)} rows over {len(index.features)} metrics saved to {index_dir}")
+        elif args.command == "add":
+            index = SimilarityIndex.load(index_dir)
+            n_before = len(index)
+            metrics = read_results(args.metrics)
+            for column, value in (('competition', args.competition), ('season', args.season)):
+                if value is not None:
+                    if column in metrics.columns:
+                        parser.error(f"--{column}: {args.metrics} already has a {column} column")
+                    metrics[column] = value
+            index.add(metrics, args.replace)
+            index.save(index_dir)
+            print(f"✅ {len(index) - n_before} rows added, {len(index)} rows in {index_dir}")
+        else:
+            if args.k < 1:
+                parser.error("-k must be at least 1")
+            index = SimilarityIndex.load(index_dir)
+            key = {'Team': args.team, 'season': args.season, 'competition': args.competition, 'Player': args.player}
+            key = {column: value for column, value in key.items() if column in index.keys.columns and value is not None}
+            print(index.most_similar(args.k, **key).to_string(index=False))
+    except ValueError as error:
+        parser.error(str(error))
+
+
+if __name__ == "__main__":
+    main()
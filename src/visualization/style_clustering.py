@@ -0,0 +1,254 @@
+# Scalable PCA and KMeans clustering of playing styles, for player-level and multi-league metric tables
+
+import argparse
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import yaml
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+from sklearn.preprocessing import MinMaxScaler
+
+from src.feature_engineering.results_store import iter_results, results_schema, write_results_chunks
+
+# Columns identifying a row of a metrics table (competition and season only in batch outputs,
+# Player only in player-level outputs); they are carried to the clusters and never clustered
+KEY_COLUMNS = ['competition', 'season', 'Team', 'Player']
+
+# Numeric columns describing a row rather than its style (matches played in the player table), never clustered
+NON_FEATURE_COLUMNS = ['Matches']
+
+# Version of the persisted model layout, checked when a model is loaded
+MODEL_VERSION = 1
+
+
+def style_features(path):
+    """Numeric columns of a metrics file (its key and non-feature columns excluded), from the schema only."""
+    return [
+        field.name for field in results_schema(path)
+        if field.name not in KEY_COLUMNS + NON_FEATURE_COLUMNS
+        and (pa.types.is_integer(field.type) or pa.types.is_floating(field.type))
+    ]
+
+
+def _chunks(path, columns, batch_size, min_rows):
+    """
+    Chunks of a metrics file with at least ``min_rows`` rows each (unless the file has fewer).
+
+    IncrementalPCA and MiniBatchKMeans cannot fit a chunk smaller than their number of
+    components and clusters, so a short chunk (the tail of the file, or the end of a
+    Parquet row group) is merged into the chunk before it.
+    """
+
+    pending = None
+    for chunk in iter_results(path, columns, batch_size):
+        if pending is None:
+            pending = chunk
+        elif len(chunk) < min_rows:
+            pending = pd.concat([pending, chunk], ignore_index=True)
+        else:
+            yield pending
+            pending = chunk
+    if pending is not None:
+        yield pending
+
+
+def _scaled(model, chunk):
+    """Min-max scaled metrics of a chunk, missing metrics at the mean of the fitted table."""
+    scaled = model['scaler'].transform(chunk[model['features']].to_numpy(dtype=np.float64))
+    return np.where(np.isnan(scaled), model['fill'], scaled)
+
+
+def fit_style_clustering(path, features=None, n_components=2, n_clusters=6, batch_size=65536, epochs=3,
+                         random_state=42):
+    """
+    Fit the playing style model on a metrics file, one chunk at a time.
+
+    The same model as ``fit_style_model`` of ``visualize.py`` (min-max scaling, a
+    two-dimensional PCA and KMeans in the PCA plane), fitted out of core: the
+    scaler is fitted in a first pass over the chunks, ``IncrementalPCA`` in a
+    second and ``MiniBatchKMeans`` in ``epochs`` more, so memory stays flat in
+    the number of teams, team-seasons or players and only depends on
+    ``batch_size``. The chunks are memory-mapped slices of Arrow files (or
+    Parquet batches), so the extra passes do not read the file again from disk.
+
+    Args:
+        path (str): Metrics file (``.arrow`` or ``.parquet``), one row per team, team-season or player.
+        features (list, optional): Metric columns to cluster on, every numeric column but the
+            ``KEY_COLUMNS`` and ``NON_FEATURE_COLUMNS`` when None.
+        n_components (int): Number of PCA dimensions.
+        n_clusters (int): Number of KMeans clusters (at most the number of rows).
+        batch_size (int): Rows per chunk.
+        epochs (int): Passes of MiniBatchKMeans over the chunks.
+        random_state (int): Seed of KMeans.
+
+    Returns:
+        dict: The fitted model: ``features``, ``scaler``, ``fill`` (scaled mean of every
+        metric, used for missing values), ``pca``, ``kmeans``, ``n_rows`` and ``version``.
+
+    Raises:
+        ValueError: If the file has fewer rows than PCA components or no metric columns.
+    """
+
+    features = list(features) if features is not None else style_features(path)
+    if not features:
+        raise ValueError(f"{path} has no numeric metric columns.")
+
+    min_rows = max(n_components, n_clusters)
+
+    # Pass 1: range of every metric, and its mean for the missing values
+    scaler = MinMaxScaler()
+    sums, counts, n_rows = np.zeros(len(features)), np.zeros(len(features)), 0
+    for chunk in _chunks(path, features, batch_size, min_rows):
+        values = chunk[features].to_numpy(dtype=np.float64)
+        scaler.partial_fit(values)
+        sums += np.nansum(values, axis=0)
+        counts += (~np.isnan(values)).sum(axis=0)
+        n_rows += len(values)
+
+    if n_rows < n_components:
+        raise ValueError(f"{path} has {n_rows} rows, at least {n_components} are needed for the PCA.")
+
+    means = np.divide(sums, counts, out=np.zeros(len(features)), where=counts > 0)
+    model = {
+        'version': MODEL_VERSION, 'features': features, 'scaler': scaler,
+        'fill': np.nan_to_num(scaler.transform(means[None, :])[0]), 'n_rows': n_rows
+    }
+
+    # Pass 2: principal components
+    pca = IncrementalPCA(n_components=n_components)
+    for chunk in _chunks(path, features, batch_size, min_rows):
+        pca.partial_fit(_scaled(model, chunk))
+    model['pca'] = pca
+
+    # Passes 3+: cluster centres in the PCA plane
+    kmeans = MiniBatchKMeans(n_clusters=min(n_clusters, n_rows), random_state=random_state, n_init=3)
+    for _ in range(epochs):
+        for chunk in _chunks(path, features, batch_size, min_rows):
+            kmeans.partial_fit(pca.transform(_scaled(model, chunk)))
+    model['kmeans'] = kmeans
+
+    return model
+
+
+def assign_styles(model, path, batch_size=65536):
+    """
+    PCA coordinates and cluster of every row of a metrics file, with a fitted model.
+
+    The output columns match the ``reduced`` table of ``visualize.StyleModel`` (``x``,
+    ``y``, ``cluster`` and the ``name`` label of the scatter plot), after the key
+    columns of the file; ``name`` is the player, or the team, followed by the season
+    when the file has several.
+
+    Args:
+        model (dict): Output of ``fit_style_clustering`` or ``load_style_clustering``.
+        path (str): Metrics file with the model's metric columns (e.g. a new season).
+        batch_size (int): Rows per chunk.
+
+    Yields:
+        pd.DataFrame: The assignments of the next chunk of rows.
+    """
+
+    names = results_schema(path).names
+    missing = [column for column in model['features'] if column not in names]
+    if missing:
+        raise ValueError(f"{path} misses the metrics of the model: {', '.join(missing)}.")
+    key_columns = [column for column in KEY_COLUMNS if column in names]
+
+    for chunk in iter_results(path, key_columns + model['features'], batch_size):
+        coordinates = model['pca'].transform(_scaled(model, chunk))
+
+        assigned = chunk[key_columns].reset_index(drop=True)
+        # The scatter plot reads the plane as x and y, other PCA sizes are numbered
+        n_components = coordinates.shape[1]
+        columns = ['x', 'y'] if n_components == 2 else [f"pc{i + 1}" for i in range(n_components)]
+        for dimension, column in enumerate(columns):
+            assigned[column] = coordinates[:, dimension]
+        assigned['cluster'] = model['kmeans'].predict(coordinates).astype(np.int32)
+
+        label = chunk['Player'] if 'Player' in chunk else chunk['Team']
+        assigned['name'] = label.astype(str) + (' ' + chunk['season'].astype(str) if 'season' in chunk else '')
+        yield assigned
+
+
+def save_style_clustering(model, path):
+    """Persist a fitted model with joblib, written to a temporary name and renamed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    joblib.dump(model, f"{path}.part")
+    os.replace(f"{path}.part", path)
+
+
+def load_style_clustering(path):
+    """
+    Load a model persisted by ``save_style_clustering``.
+
+    Raises:
+        ValueError: If the file was written with another model layout.
+    """
+
+    model = joblib.load(path)
+    if not isinstance(model, dict) or model.get('version') != MODEL_VERSION:
+        raise ValueError(f"{path} is not a style clustering model of version {MODEL_VERSION}, fit it again.")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster playing styles of large metric tables (players, many seasons) "
+                                                 "with incremental PCA and mini-batch KMeans.")
+    parser.add_argument("--model",
+                        help="Persisted model. Defaults to paths.style_model in the config, "
+                             "or data/processed/style_model.joblib.")
+    parser.add_argument("--output",
+                        help="Clusters table (.arrow or .parquet). Defaults to paths.style_clusters in the config, "
+                             "or data/processed/style_clusters.arrow.")
+    parser.add_argument("--batch-size", type=int, default=65536, help="Rows read and fitted per chunk.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fit = commands.add_parser("fit", help="Fit and persist the model on a metrics table, then assign its rows.")
+    fit.add_argument("--metrics", help="Metrics table. Defaults to paths.metrics_results in the config.")
+    fit.add_argument("--clusters", type=int, default=6, help="Number of KMeans clusters.")
+    fit.add_argument("--epochs", type=int, default=3, help="Passes of mini-batch KMeans over the table.")
+
+    assign = commands.add_parser("assign", help="Assign the rows of a metrics table with the persisted model.")
+    assign.add_argument("metrics", help="Metrics table with the metrics of the model, e.g. a new season.")
+    args = parser.parse_args()
+
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.command == "fit" and (args.clusters < 1 or args.epochs < 1):
+        parser.error("--clusters and --epochs must be at least 1")
+
+    # Load configuration from config.yaml
+    with open("config/config.yaml", "r") as file:
+        config = yaml.safe_load(file)
+
+    model_file = args.model or config["paths"].get("style_model", "data/processed/style_model.joblib")
+    output_file = args.output or config["paths"].get("style_clusters", "data/processed/style_clusters.arrow")
+
+    try:
+        if args.command == "fit":
+            metrics_file = args.metrics or config["paths"].get("metrics_results", "data/processed/j_league_metrics.arrow")
+            model = fit_style_clustering(metrics_file, n_clusters=args.clusters, batch_size=args.batch_size,
+                                         epochs=args.epochs)
+            save_style_clustering(model, model_file)
+            print(f"✅ Style model over {len(model['features'])} metrics fitted on {model['n_rows']} rows, "
+                  f"saved to {model_file}")
+        else:
+            metrics_file = args.metrics
+            model = load_style_clustering(model_file)
+
+        n_rows = write_results_chunks(assign_styles(model, metrics_file, args.batch_size), output_file, {
+            'table': 'style_clusters', 'metrics': metrics_file, 'model': model_file, 'features': model['features']
+        })
+        print(f"✅ Clusters of {n_rows} rows saved to {output_file}")
+    except ValueError as error:
+        parser.error(str(error))
+
+
+if __name__ == "__main__":
+    main()
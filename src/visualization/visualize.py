@@ -0,0 +1,342 @@
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+import matplotlib
+matplotlib.use("Agg")  # Headless rendering, figures are only saved
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+import yaml
+from adjustText import adjust_text
+from sklearn import preprocessing
+from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA
+from sklearn.metrics.pairwise import cosine_similarity
+
+from src.feature_engineering.results_store import read_results
+
+CREDIT = "Data via STATSBOMB | Twitter: @DataAnalyticEPL |"
+BACKGROUND = "#F5F5F5"
+AXES_BACKGROUND = "#FAF9F6"
+
+# Rows of the style plane labelled by name, larger tables (players, many seasons) label the
+# rows nearest to each cluster centre only
+MAX_STYLE_LABELS = 24
+
+# Rows of the cosine similarity heatmap, the figure is skipped for larger tables
+MAX_SIMILARITY_ROWS = 300
+
+# Scaler, PCA and KMeans fitted once on the team metrics, shared by every figure:
+# - teams: team names, in table order,
+# - reduced: DataFrame of the 2-D PCA coordinates (x, y), the cluster and the team name,
+# - similarity: cosine similarity of the teams in the PCA plane (teams x teams DataFrame), None when
+#   it is computed only by the heatmap (``style_model_from_clusters``).
+StyleModel = namedtuple('StyleModel', ['teams', 'reduced', 'similarity'])
+
+# A figure of the visualization pipeline:
+# - name: file name (without extension) under the output directory,
+# - render: function(data, model, ax, **options) drawing the figure,
+# - columns: metric columns the figure needs, it is skipped when one is missing,
+# - options: keyword arguments of ``render``,
+# - size: figure size in inches.
+Figure = namedtuple('Figure', ['name', 'render', 'columns', 'options', 'size'], defaults=({}, (12, 10)))
+
+
+def load_metrics(path):
+    """Load the team metrics table (memory-mapped Arrow, Parquet or an older Excel output)."""
+    return read_results(path)
+
+
+def fit_style_model(data, n_clusters=6, random_state=42):
+    """
+    Fit the playing style model of the teams once.
+
+    The numeric metrics are min-max scaled, reduced to two PCA dimensions and the
+    teams are clustered with KMeans in that plane, as the clustering scripts did;
+    the cosine similarity of the teams in the plane is computed with it. Missing
+    metrics are filled with the scaled mean of their column.
+
+    Args:
+        data (pd.DataFrame): Team metrics, one row per team with a ``Team`` column.
+        n_clusters (int): Number of KMeans clusters.
+        random_state (int): Seed of KMeans.
+
+    Returns:
+        StyleModel: The fitted coordinates, clusters and similarities.
+    """
+
+    features = data.select_dtypes(include=['float64', 'int64'])
+    x_scaled = preprocessing.MinMaxScaler().fit_transform(features.values)
+
+    # Missing metrics (e.g. a team without attacks of a kind) sit at the column mean, as in style_clustering
+    x_scaled = pd.DataFrame(x_scaled)
+    x_scaled = x_scaled.fillna(x_scaled.mean().fillna(0.0)).to_numpy()
+
+    pca = PCA(n_components=2)
+    reduced = pd.DataFrame(pca.fit_transform(x_scaled), columns=['x', 'y'])
+
+    kmeans = KMeans(n_clusters=min(n_clusters, len(reduced)), random_state=random_state, n_init=10).fit(reduced)
+
+    teams = data['Team'].tolist()
+    reduced['cluster'] = kmeans.labels_
+    reduced['name'] = teams
+
+    similarity = pd.DataFrame(cosine_similarity(reduced[['x', 'y']]), index=teams, columns=teams)
+
+    return StyleModel(teams, reduced, similarity)
+
+
+def style_model_from_clusters(clusters):
+    """
+    Style model of precomputed clusters, e.g. of ``style_clustering.py`` for players or many seasons.
+
+    The similarity matrix is quadratic in the rows, so it is not computed here but by
+    the heatmap, which is only rendered up to ``MAX_SIMILARITY_ROWS`` rows.
+
+    Args:
+        clusters (pd.DataFrame): Table with the ``x``, ``y``, ``cluster`` and ``name`` columns.
+
+    Returns:
+        StyleModel: The clusters as the model of the style figures.
+    """
+
+    reduced = clusters[['x', 'y', 'cluster', 'name']].reset_index(drop=True)
+    return StyleModel(reduced['name'].tolist(), reduced, None)
+
+
+def _labelled_rows(reduced, limit=MAX_STYLE_LABELS):
+    """Rows of the style plane to label: all of them, or the ones nearest to each cluster centre beyond ``limit``."""
+    if len(reduced) <= limit:
+        return reduced
+
+    per_cluster = max(1, limit // reduced['cluster'].nunique())
+    centres = reduced.groupby('cluster')[['x', 'y']].transform('mean')
+    distance = np.hypot(reduced['x'] - centres['x'], reduced['y'] - centres['y'])
+    nearest = distance.groupby(reduced['cluster']).rank(method='first') <= per_cluster
+    return reduced.loc[nearest]
+
+
+def _decorate(fig, ax, title):
+    """Background, title and data credit shared by the figures."""
+    fig.set_facecolor(BACKGROUND)
+    ax.set_facecolor(AXES_BACKGROUND)
+    ax.set_title(title, fontsize=20, weight='bold', pad=20)
+    ax.text(0.99, 0.02, CREDIT, transform=ax.transAxes, ha='right', va='bottom', fontsize=11, color='#7B1E3A')
+
+
+def bar_chart(data, model, ax, column, title, xlabel):
+    """Horizontal bars of one metric for every team, sorted by value."""
+    ranked = data[['Team', column]].dropna().sort_values(column)
+    bars = ax.barh(ranked['Team'], ranked[column], color='lavender', edgecolor='black')
+    ax.bar_label(bars, labels=[f"{value:g}" for value in ranked[column].round(2)], padding=8, fontsize=11, weight='bold')
+    ax.grid(axis='x', linestyle='--', alpha=0.7)
+    ax.set_xlabel(xlabel, fontsize=15, weight='bold')
+    ax.set_ylabel("Team Name", fontsize=15, weight='bold')
+    sns.despine(ax=ax)
+
+
+def scatter_chart(data, model, ax, x, y, title, xlabel, ylabel):
+    """Scatter of two metrics for every team, with the league averages as reference lines."""
+    points = data[['Team', x, y]].dropna()
+    ax.scatter(points[x], points[y], s=150, color='lightgrey', edgecolor='black', zorder=3)
+    for _, row in points.iterrows():
+        ax.annotate(row['Team'], (row[x], row[y]), xytext=(6, 6), textcoords='offset points', fontsize=10, weight='bold')
+
+    ax.axvline(points[x].mean(), color='grey', linestyle='--')
+    ax.axhline(points[y].mean(), color='grey', linestyle='--')
+    ax.grid(linestyle='--', alpha=0.5)
+    ax.set_xlabel(xlabel, fontsize=15, weight='bold')
+    ax.set_ylabel(ylabel, fontsize=15, weight='bold')
+    sns.despine(ax=ax)
+
+
+def style_clusters(data, model, ax, title):
+    """Teams in the PCA plane of the style model, coloured by KMeans cluster (large tables label a sample, see ``_labelled_rows``)."""
+    sns.scatterplot(x="x", y="y", hue="cluster", data=model.reduced, palette="Spectral", s=150, ax=ax, legend=False)
+
+    texts = [
+        ax.text(row['x'], row['y'], row['name'], fontsize=10, color='black',
+                bbox=dict(facecolor="white", edgecolor="black", boxstyle="round,pad=0.2"))
+        for _, row in _labelled_rows(model.reduced).iterrows()
+    ]
+    adjust_text(texts, ax=ax, arrowprops=dict(arrowstyle="->", color='grey', lw=0.8),
+                expand_points=(1.4, 1.6), expand_text=(1.4, 1.6))
+
+    ax.set_ylim(-2, 2)
+    ax.set_xlim(-2.5, 2.5)
+    ax.set_xlabel("Team Characteristics - Dimension 1", fontsize=15, labelpad=10)
+    ax.set_ylabel("Team Characteristics - Dimension 2", fontsize=15, labelpad=10)
+    ax.tick_params(labelsize=12)
+
+
+def similarity_heatmap(data, model, ax, title):
+    """Cosine similarity of the teams in the PCA plane of the style model."""
+    similarity = model.similarity
+    if similarity is None:
+        similarity = pd.DataFrame(cosine_similarity(model.reduced[['x', 'y']]), index=model.teams, columns=model.teams)
+    sns.heatmap(similarity, cmap="Greens", cbar=True, linewidths=0, xticklabels=True, yticklabels=True, ax=ax)
+
+
+def _bar(name, column, title, xlabel):
+    return Figure(name, bar_chart, [column], {'column': column, 'title': title, 'xlabel': xlabel})
+
+
+def _scatter(name, x, y, title, xlabel, ylabel):
+    return Figure(name, scatter_chart, [x, y], {'x': x, 'y': y, 'title': title, 'xlabel': xlabel, 'ylabel': ylabel})
+
+
+# Figures rendered by ``run-visualization --all``
+FIGURES = [
+    Figure('Playing_style', style_clusters, [], {'title': "Playing Styles for Teams (J League)"}),
+    Figure('cosine', similarity_heatmap, [], {'title': "Cosine Similarity Matrix"}, (10, 8)),
+    _bar('Avg_possession', 'Possession', "Average Possession for Each Team", "Average Possession (%)"),
+    _bar('Avg_ppda', 'PPDA', "Average PPDA for Each Team", "Average PPDA"),
+    _bar('Avg_FT', 'Field_tilt', "Average Field Tilt for Each Team", "Average Field Tilt (%)"),
+    _bar('Avg_maintain', 'Maintain (%)', "Average Maintain for Each Team", "Maintain (%)"),
+    _bar('Avg_buildup', 'Buildup (%)', "Average Buildup for Each Team", "Buildup (%)"),
+    _bar('Avg_sustain', 'Sustain (%)', "Average Sustain for Each Team", "Sustain (%)"),
+    _bar('Avg_verticality', 'average_verticality', "Average Verticality for Each Team", "Average Verticality"),
+    _bar('Avg_pressure', 'Pressure', "Average OOP Pressure for Each Team", "Avg. No. of OOP pressure"),
+    _bar('Avg_def_height', 'Def Height', "Average Defensive Height for Each Team", "Defensive Height (m)"),
+    _scatter('poss_vs_press', 'Pressure', 'Possession', "OOP pressure vs possession",
+             "Avg. No. of OOP pressure", "Avg. possession (%)"),
+    _scatter('poss_vs_vert', 'average_verticality', 'Possession', "Verticality vs possession",
+             "Avg. verticality", "Avg. possession (%)"),
+    _scatter('def_vs_verticality', 'average_verticality', 'Def Height', "Defensive height vs verticality",
+             "Avg. verticality", "Avg. defensive height (m)"),
+    _scatter('TS_speed_ds', 'Speed', 'Direct Speed Upfield(m/s)', "Speed vs direct speed upfield",
+             "Speed (m/s)", "Direct speed upfield (m/s)"),
+    _scatter('PPS', 'Passes_per_sequence', 'Att. Passes_per_sequence', "Passes per sequence",
+             "Passes per sequence", "Passes per attacking sequence"),
+    _scatter('Buildup vs Direct', 'Direct Attacks', 'Buildup Attacks', "Buildup vs direct attacks",
+             "Direct attacks", "Buildup attacks"),
+    _scatter('Buildup vs Direct less than 10', 'Direct Attacks_10', 'Buildup Attacks',
+             "Buildup vs direct attacks (under 10 passes)", "Direct attacks (under 10 passes)", "Buildup attacks"),
+]
+
+# Inputs shared by the figures of a worker process, set once by ``_init_worker``
+_WORKER_INPUTS = {}
+
+
+def _init_worker(data, model, output_dir, dpi):
+    _WORKER_INPUTS.update(data=data, model=model, output_dir=output_dir, dpi=dpi)
+
+
+def render_figure(figure, data, model, path, dpi=300):
+    """
+    Draw one figure and save it to ``path``.
+
+    Returns:
+        str: Path of the saved figure.
+    """
+
+    fig, ax = plt.subplots(figsize=figure.size)
+    _decorate(fig, ax, figure.options['title'])
+    figure.render(data, model, ax, **figure.options)
+
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return path
+
+
+def figure_path(figure, output_dir):
+    """PNG file of a figure in the output directory."""
+    return os.path.join(output_dir, f"{figure.name}.png")
+
+
+def _render_in_worker(figure):
+    inputs = _WORKER_INPUTS
+    return render_figure(figure, inputs['data'], inputs['model'], figure_path(figure, inputs['output_dir']), inputs['dpi'])
+
+
+def render_figures(figures, data, model, output_dir, dpi=300, workers=1):
+    """
+    Render independent figures, in parallel over ``workers`` processes.
+
+    The metrics and the fitted style model are sent to every worker once, when
+    it starts, not with every figure.
+
+    Args:
+        figures (list): ``Figure`` entries to render.
+        data (pd.DataFrame): Team metrics.
+        model (StyleModel): Output of ``fit_style_model``.
+        output_dir (str): Directory of the PNG files.
+        dpi (int): Resolution of the PNG files.
+        workers (int): Number of worker processes.
+
+    Returns:
+        list: Paths of the saved figures, in ``figures`` order.
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    if workers == 1 or len(figures) < 2:
+        return [render_figure(figure, data, model, figure_path(figure, output_dir), dpi) for figure in figures]
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(figures)), initializer=_init_worker, initargs=(data, model, output_dir, dpi)
+    ) as executor:
+        return list(executor.map(_render_in_worker, figures))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the visualizations of the team metrics.")
+    parser.add_argument("--all", action="store_true", help="Render every figure of the pipeline.")
+    parser.add_argument("--figures", nargs="+", metavar="NAME",
+                        help="Render only these figures: " + ", ".join(figure.name for figure in FIGURES) + ".")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes the figures are rendered in.")
+    parser.add_argument("--output-dir",
+                        help="Directory of the figures. Defaults to paths.visualizations in the config, "
+                             "or data/visualizations.")
+    parser.add_argument("--dpi", type=int, default=300, help="Resolution of the saved figures.")
+    parser.add_argument("--style-clusters", metavar="FILE",
+                        help="Draw the style figures from the clusters of style_clustering.py instead of "
+                             "fitting the team model.")
+    args = parser.parse_args()
+
+    if args.all == bool(args.figures):
+        parser.error("give either --all or --figures")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    unknown = sorted(set(args.figures or []) - {figure.name for figure in FIGURES})
+    if unknown:
+        parser.error(f"unknown figures: {', '.join(unknown)}")
+
+    # Load configuration from config.yaml
+    with open("config/config.yaml", "r") as file:
+        config = yaml.safe_load(file)
+
+    input_file = config["paths"].get("metrics_results", "data/processed/j_league_metrics.arrow")
+    output_dir = args.output_dir or config["paths"].get("visualizations", "data/visualizations")
+
+    start = time.perf_counter()
+
+    # Metrics loaded and the style model fitted once, for every figure
+    data = load_metrics(input_file)
+    if args.style_clusters:
+        model = style_model_from_clusters(read_results(args.style_clusters))
+    else:
+        model = fit_style_model(data)
+
+    figures = [figure for figure in FIGURES if args.all or figure.name in args.figures]
+    if len(model.teams) > MAX_SIMILARITY_ROWS and any(figure.name == 'cosine' for figure in figures):
+        figures = [figure for figure in figures if figure.name != 'cosine']
+        print(f"⚠️ Skipped cosine: {len(model.teams)} rows, the heatmap is drawn up to {MAX_SIMILARITY_ROWS}")
+    skipped = [figure.name for figure in figures if not set(figure.columns) <= set(data.columns)]
+    figures = [figure for figure in figures if figure.name not in skipped]
+    if skipped:
+        print(f"⚠️ Skipped (metrics not in {input_file}): {', '.join(skipped)}")
+
+    paths = render_figures(figures, data, model, output_dir, args.dpi, args.workers)
+    print(f"✅ {len(paths)} figures saved to {output_dir} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
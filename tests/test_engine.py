@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_events import generate_events
+from src.feature_engineering.engine import compute_team_metrics
+from src.feature_engineering.metrics import calculate_metrics_separately
+
+
+@pytest.fixture(scope='module')
+def events():
+    """Processed events of one synthetic match."""
+    return generate_events(1)
+
+
+@pytest.mark.parametrize('metrics', [None, ['ppda', 'field_tilt', 'passes_per_sequence']])
+def test_fused_engine_matches_separate_functions(events, metrics):
+    fused = compute_team_metrics(events.copy(), metrics=metrics)
+    separate = calculate_metrics_separately(events.copy(), metrics=metrics)
+
+    assert len(fused) == 2
+    pd.testing.assert_frame_equal(
+        fused.sort_values('Team').reset_index(drop=True),
+        separate.sort_values('Team').reset_index(drop=True)
+    )
@@ -0,0 +1,167 @@
+import hashlib
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+
+import pytest
+
+from src.data_processing.fetch_statsbomb import StatsBombFetcher
+
+COMPETITION_ID, SEASON_ID = 43, 106
+MATCHES_PATH = f"matches/{COMPETITION_ID}/{SEASON_ID}.json"
+MATCH_IDS = [101, 102, 103]
+
+
+class StandInHandler(SimpleHTTPRequestHandler):
+    """Serves the data directory over keep-alive connections with ETags, recording every request."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(self.path.lstrip('/'))
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        with open(path, 'rb') as file:
+            body = file.read()
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+
+
+def publish_matches(data_dir, last_updated):
+    """Write the match list, ``last_updated`` maps every match id to its version."""
+    write_json(os.path.join(data_dir, *MATCHES_PATH.split('/')), [
+        {'match_id': match_id, 'last_updated': last_updated[match_id], 'match_status': 'available',
+         'home_team': {'home_team_name': 'Home FC'}, 'away_team': {'away_team_name': 'Away FC'}}
+        for match_id in MATCH_IDS
+    ])
+
+
+@pytest.fixture
+def server(tmp_path):
+    """A local stand-in of the StatsBomb data directory, one match list and the events of its matches."""
+    data_dir = str(tmp_path / 'open-data')
+    publish_matches(data_dir, {match_id: '2024-01-01T00:00:00' for match_id in MATCH_IDS})
+    for match_id in MATCH_IDS:
+        write_json(os.path.join(data_dir, 'events', f"{match_id}.json"), [
+            {'id': f"{match_id}-{i}", 'type': {'id': 30, 'name': 'Pass'}, 'minute': i} for i in range(3)
+        ])
+
+    httpd = ThreadingHTTPServer(
+        ('127.0.0.1', 0), lambda *args: StandInHandler(*args, directory=data_dir)
+    )
+    httpd.data_dir = data_dir
+    httpd.requests = []
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def fetch_season(server, cache_dir, refresh=False):
+    """Fetch the match list and events of the season with a new fetcher, returning the fetcher."""
+    with StatsBombFetcher(cache_dir, server.base_url, workers=2) as fetcher:
+        matches = fetcher.fetch_matches(COMPETITION_ID, SEASON_ID, refresh)
+        fetcher.fetch_events(matches)
+    return fetcher
+
+
+def test_first_fetch_downloads_match_list_and_events(server, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    fetcher = fetch_season(server, cache_dir)
+
+    assert fetcher.stats['requests'] == len(MATCH_IDS) + 1
+    assert fetcher.stats['downloaded'] == len(MATCH_IDS) + 1
+    assert sorted(server.requests) == sorted([MATCHES_PATH] + [f"events/{match_id}.json" for match_id in MATCH_IDS])
+
+    with open(os.path.join(cache_dir, 'events', '101.json'), 'r', encoding='utf-8') as file:
+        assert [event['id'] for event in json.load(file)] == ['101-0', '101-1', '101-2']
+
+
+def test_refetch_of_unchanged_season_sends_no_requests(server, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    fetch_season(server, cache_dir)
+    server.requests.clear()
+
+    fetcher = fetch_season(server, cache_dir)
+
+    assert fetcher.stats['requests'] == 0
+    assert fetcher.stats['cached'] == len(MATCH_IDS) + 1
+    assert server.requests == []
+
+
+def test_updated_match_is_the_only_one_refetched(server, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    fetch_season(server, cache_dir)
+    server.requests.clear()
+
+    publish_matches(server.data_dir, {101: '2024-01-01T00:00:00', 102: '2024-02-01T00:00:00',
+                                      103: '2024-01-01T00:00:00'})
+    fetcher = fetch_season(server, cache_dir, refresh=True)
+
+    assert server.requests == [MATCHES_PATH, 'events/102.json']
+    assert fetcher.stats['downloaded'] == 2
+    assert fetcher.stats['cached'] == len(MATCH_IDS) - 1
+
+
+def test_interrupted_fetch_resumes_with_the_missing_files(server, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    fetch_season(server, cache_dir)
+    server.requests.clear()
+
+    # Interrupted while writing the events of 102, before reaching those of 103
+    events_dir = os.path.join(cache_dir, 'events')
+    os.remove(os.path.join(events_dir, '102.json'))
+    os.replace(os.path.join(events_dir, '102.json.meta'), os.path.join(events_dir, '102.json.meta.part'))
+    with open(os.path.join(events_dir, '102.json.part'), 'w') as file:
+        file.write('[{"id": "102-0", "ty')
+    os.remove(os.path.join(events_dir, '103.json'))
+    os.remove(os.path.join(events_dir, '103.json.meta'))
+
+    fetcher = fetch_season(server, cache_dir)
+
+    assert sorted(server.requests) == ['events/102.json', 'events/103.json']
+    assert fetcher.stats['downloaded'] == 2
+    assert not [name for name in os.listdir(events_dir) if name.endswith('.part')]
+    with open(os.path.join(events_dir, '102.json'), 'r', encoding='utf-8') as file:
+        assert len(json.load(file)) == 3
+
+
+def test_refresh_revalidates_match_list_with_etag(server, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    fetch_season(server, cache_dir)
+    server.requests.clear()
+
+    fetcher = fetch_season(server, cache_dir, refresh=True)
+
+    assert server.requests == [MATCHES_PATH]
+    assert fetcher.stats['requests'] == 1
+    assert fetcher.stats['not_modified'] == 1
+    assert fetcher.stats['downloaded'] == 0